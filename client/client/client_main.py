@@ -1,10 +1,15 @@
+import argparse
 from tkinter import *
 
 from client.client.external_processes import SubProcessesBase
 from client.client.login_window import LoginWindow
 from client.client.main_window import MainWindow
 
+parser = argparse.ArgumentParser(description='The rally client')
+parser.add_argument("--in_process", action="store_true", help="Open the windows of the seat in this program instead of in programs of their own, the videos still get their own programs", required=False)
+
 if __name__ == '__main__':
+    args = parser.parse_args()
     running_as_exe = SubProcessesBase.detect_if_running_as_exe(sys.argv)
     if running_as_exe:
         print("Running the program as an executable, this will affect how the sub clients are started")
@@ -27,6 +32,6 @@ if __name__ == '__main__':
     rally_config = login_window.get_rally_config()
 
     # NOW we are LOGGED IN!
-    main_window = MainWindow(rally_config, server_connection, running_as_exe)
+    main_window = MainWindow(rally_config, server_connection, running_as_exe, args.in_process)
     main_window.run()
     login_window.stop()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import argparse
 import os
 import subprocess
 import sys
@@ -9,15 +10,19 @@ class ProcessTemplateBase:
         self.title = title
         self.program = program
 
+    def get_working_dir(self):
+        if self.running_as_exe:
+            return os.getcwd()
+        return os.path.dirname(os.path.abspath(os.path.join(os.getcwd(), self.program)))
+
     def start_process(self):
         if self.running_as_exe:
             parts = self.program.split("/")
             program = parts[-1].replace(".py", ".exe")
             args = [program]
-            working_dir = os.getcwd()
         else:
             args = [sys.executable, self.program]
-            working_dir = os.path.dirname(os.path.abspath(os.path.join(os.getcwd(), self.program)))
+        working_dir = self.get_working_dir()
 
         self.build_arguments(args)
         self.adjust_arguments(args)
@@ -34,9 +39,11 @@ class ProcessTemplateBase:
 
 
 class ProcessTemplate(ProcessTemplateBase):
-    def __init__(self, running_as_exe, client_udp_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats):
+    def __init__(self, running_as_exe, client_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats, open_window=None):
+        """ open_window(args, rally_configuration, parent, working_dir) opens the window in this process instead """
         ProcessTemplateBase.__init__(self, running_as_exe, title, program)
-        self.client_udp_port = client_udp_port
+        self.open_window = open_window
+        self.client_port = client_port
         self.rally_conf = rally_conf
         self.data_path = data_path
         self.user_id = user_id
@@ -46,8 +53,19 @@ class ProcessTemplate(ProcessTemplateBase):
     def shall_be_started_for_seat(self, seat_index):
         return seat_index in self.valid_seats
 
+    def open_in_process(self, subprocess_communicator, rally_configuration, parent):
+        """ Returns the opened window, it has a close() method """
+        print("Opening window: {0}".format(self.title))
+        args = argparse.Namespace(port=self.client_port,
+                                  client_index=self.my_index,
+                                  user_id=self.user_id,
+                                  rally_configuration=self.rally_conf,
+                                  data_path=self.data_path,
+                                  subprocess_communicator=subprocess_communicator)
+        return self.open_window(args, rally_configuration, parent, self.get_working_dir())
+
     def build_arguments(self, args):
-        args.extend(["-p", str(self.client_udp_port),
+        args.extend(["-p", str(self.client_port),
                      "-c", str(self.my_index),
                      "-u", str(self.user_id),
                      "-r", self.rally_conf,
@@ -55,8 +73,8 @@ class ProcessTemplate(ProcessTemplateBase):
 
 
 class PhotoSheetTemplate(ProcessTemplate):
-    def __init__(self, running_as_exe, client_udp_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats, index):
-        ProcessTemplate.__init__(self, running_as_exe, client_udp_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats)
+    def __init__(self, running_as_exe, client_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats, index):
+        ProcessTemplate.__init__(self, running_as_exe, client_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats)
         self.index = index
 
     def adjust_arguments(self, args):
@@ -65,8 +83,8 @@ class PhotoSheetTemplate(ProcessTemplate):
 
 
 class VideoProcessTemplate(ProcessTemplate):
-    def __init__(self, running_as_exe, client_udp_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats, direction):
-        ProcessTemplate.__init__(self, running_as_exe, client_udp_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats)
+    def __init__(self, running_as_exe, client_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats, direction):
+        ProcessTemplate.__init__(self, running_as_exe, client_port, rally_conf, data_path, user_id, my_index, title, program, valid_seats)
         self.direction = direction
 
     def adjust_arguments(self, args):
@@ -75,8 +93,8 @@ class VideoProcessTemplate(ProcessTemplate):
 
 
 class ExtraTasksProcessTemplate(ProcessTemplate):
-    def __init__(self, running_as_exe, client_udp_port, rally_configuration, rally_conf_file, data_path, user_id, my_index, title, program, valid_seats):
-        ProcessTemplate.__init__(self, running_as_exe, client_udp_port, rally_conf_file, data_path, user_id, my_index, title, program, valid_seats)
+    def __init__(self, running_as_exe, client_port, rally_configuration, rally_conf_file, data_path, user_id, my_index, title, program, valid_seats, open_window=None):
+        ProcessTemplate.__init__(self, running_as_exe, client_port, rally_conf_file, data_path, user_id, my_index, title, program, valid_seats, open_window)
         self.rally_configuration = rally_configuration
 
     def shall_be_started_for_seat(self, seat_index):
@@ -96,6 +114,7 @@ class SubProcessesBase:
 
     def __init__(self):
         self.started_processes = []
+        self.opened_windows = []
         self.process_templates = []
 
     def __del__(self):
@@ -115,39 +134,72 @@ class SubProcessesBase:
         for proc in self.started_processes:
             proc.terminate()
         self.started_processes = []
+        for window in self.opened_windows:
+            window.close()
+        self.opened_windows = []
+
+
+def open_steering(args, rally_configuration, parent, working_dir):
+    from client.steering.steering import SteeringWindow
+    window = SteeringWindow(args, rally_configuration.track_information, parent, working_dir)
+    window.start()
+    return window
+
+
+def open_fishbone(args, rally_configuration, parent, working_dir):
+    from client.fishbone.fishbone import RebusWindow
+    return RebusWindow(args, rally_configuration.track_information, parent)
+
+
+def open_solve_rebus(args, rally_configuration, parent, working_dir):
+    from client.solve_rebus.solve_rebus import SolveRebusWindow
+    return SolveRebusWindow(args, rally_configuration.track_information, parent)
+
+
+def open_extra_puzzles(args, rally_configuration, parent, working_dir):
+    from client.extra_puzzles.extra_puzzles import ExtraPuzzles
+    window = ExtraPuzzles(args, rally_configuration, parent)
+    window.start()
+    return window
 
 
 class SubProcesses(SubProcessesBase):
-    def __init__(self, subprocess_communicator, rally_configuration, running_as_exe, config_file):
+    def __init__(self, subprocess_communicator, rally_configuration, running_as_exe, config_file, in_process=False):
+        """ With in_process the windows that can are opened in this process, sharing its rally configuration.
+            The videos always get their own processes, since they decode the videos. """
         SubProcessesBase.__init__(self)
         self.subprocess_communicator = subprocess_communicator
+        self.in_process = in_process
         self.running_as_exe = running_as_exe
         self.rally_configuration = rally_configuration
         data_path = rally_configuration.data_path
-        udp_port = subprocess_communicator.udp_port
+        port = subprocess_communicator.port
         user_id = self.subprocess_communicator.server_connection.status_information.user_id
         self.process_templates = [
-            ProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 1, "Steering wheel", "../steering/steering.py", [1]),
-            VideoProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 2, "Front video", "../out_the_window/movie_window.py", [1, 2, 3, 5, 8], "front"),
-            VideoProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 3, "Left video", "../out_the_window/movie_window.py", [4, 7], "left"),
-            VideoProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 4, "Right video", "../out_the_window/movie_window.py", [6, 9], "right"),
-            ProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 10, "Rebus list", "../fishbone/fishbone.py", [5]),
-            ProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 13, "Solve rebus", "../solve_rebus/solve_rebus.py", [5]),
-            ExtraTasksProcessTemplate(running_as_exe, udp_port, self.rally_configuration, config_file, data_path, user_id, 13, "Extra puzzles", "../extra_puzzles/extra_puzzles.py", [5])
-            #ProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 11, "Photo Answers", "../photo_report/photo_report.py", [5]),
-            #ProcessTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 12, "Rebus Answers", "../rebus_answers/rebus_answers.py", [5]),
-            # PhotoSheetTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 5, "Photo sheet front", "../photo_sheet/photosheet.py", [1, 2, 3], 1),
-            # PhotoSheetTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 6, "Photo sheet middle1", "../photo_sheet/photosheet.py", [4, 5, 6], 2),
-            # PhotoSheetTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 7, "Photo sheet middle2", "../photo_sheet/photosheet.py", [4, 5, 6], 3),
-            # PhotoSheetTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 8, "Photo sheet back1", "../photo_sheet/photosheet.py", [7, 8, 9], 4),
-            # PhotoSheetTemplate(running_as_exe, udp_port, config_file, data_path, user_id, 9, "Photo sheet back2", "../photo_sheet/photosheet.py", [7, 8, 9], 5),
+            ProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 1, "Steering wheel", "../steering/steering.py", [1], open_steering),
+            VideoProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 2, "Front video", "../out_the_window/movie_window.py", [1, 2, 3, 5, 8], "front"),
+            VideoProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 3, "Left video", "../out_the_window/movie_window.py", [4, 7], "left"),
+            VideoProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 4, "Right video", "../out_the_window/movie_window.py", [6, 9], "right"),
+            ProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 10, "Rebus list", "../fishbone/fishbone.py", [5], open_fishbone),
+            ProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 13, "Solve rebus", "../solve_rebus/solve_rebus.py", [5], open_solve_rebus),
+            ExtraTasksProcessTemplate(running_as_exe, port, self.rally_configuration, config_file, data_path, user_id, 13, "Extra puzzles", "../extra_puzzles/extra_puzzles.py", [5], open_extra_puzzles)
+            #ProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 11, "Photo Answers", "../photo_report/photo_report.py", [5]),
+            #ProcessTemplate(running_as_exe, port, config_file, data_path, user_id, 12, "Rebus Answers", "../rebus_answers/rebus_answers.py", [5]),
+            # PhotoSheetTemplate(running_as_exe, port, config_file, data_path, user_id, 5, "Photo sheet front", "../photo_sheet/photosheet.py", [1, 2, 3], 1),
+            # PhotoSheetTemplate(running_as_exe, port, config_file, data_path, user_id, 6, "Photo sheet middle1", "../photo_sheet/photosheet.py", [4, 5, 6], 2),
+            # PhotoSheetTemplate(running_as_exe, port, config_file, data_path, user_id, 7, "Photo sheet middle2", "../photo_sheet/photosheet.py", [4, 5, 6], 3),
+            # PhotoSheetTemplate(running_as_exe, port, config_file, data_path, user_id, 8, "Photo sheet back1", "../photo_sheet/photosheet.py", [7, 8, 9], 4),
+            # PhotoSheetTemplate(running_as_exe, port, config_file, data_path, user_id, 9, "Photo sheet back2", "../photo_sheet/photosheet.py", [7, 8, 9], 5),
         ]
 
     def stop_processes(self):
         self.subprocess_communicator.clear_clients()
         SubProcessesBase.stop_processes(self)
 
-    def start_processes(self, seat_index):
+    def start_processes(self, seat_index, parent=None):
         for template in self.process_templates:
             if template.shall_be_started_for_seat(seat_index):
-                SubProcessesBase.start_process(self, template)
+                if self.in_process and parent is not None and template.open_window is not None:
+                    self.opened_windows.append(template.open_in_process(self.subprocess_communicator, self.rally_configuration, parent))
+                else:
+                    SubProcessesBase.start_process(self, template)
@@ -9,7 +9,7 @@ from rally.protocol import clientprotocol_pb2
 
 
 class MainWindow:
-    def __init__(self, rally_configuration, server_conn, running_as_exe):
+    def __init__(self, rally_configuration, server_conn, running_as_exe, in_process=False):
         self.running_as_exe = running_as_exe
         self.subprocess_communicator = SubProcessCommunicator(server_conn)
         self.subprocess_communicator.start()
@@ -17,7 +17,7 @@ class MainWindow:
         # server_conn.report_lost_connection = self.on_lost_connection
         # server_conn.message_receiver = self.on_message_received
         self.rally_configuration = rally_configuration
-        self.sub_processes = SubProcesses(self.subprocess_communicator, self.rally_configuration, self.running_as_exe, self.server_connection.temporary_config_file)
+        self.sub_processes = SubProcesses(self.subprocess_communicator, self.rally_configuration, self.running_as_exe, self.server_connection.temporary_config_file, in_process)
         self.positions_map = {"Utanför bussen": 0,
                               "Förare": 1,
                               "Kartläsare": 2,
@@ -127,7 +127,7 @@ class MainWindow:
 
     def on_select_placing(self):
         self.sub_processes.stop_processes()
-        self.sub_processes.start_processes(self.server_connection.status_information.get_my_seat())
+        self.sub_processes.start_processes(self.server_connection.status_information.get_my_seat(), self.main_window)
 
     def on_search_for_rebus(self):
         client_to_server = clientprotocol_pb2.ClientToServer()
@@ -12,6 +12,8 @@ from rally.protocol import serverprotocol_pb2, clientprotocol_pb2
 
 
 class ServerConnection(threading.Thread):
+    FULL_STATUS_REQUEST_INTERVAL = 2 # seconds
+
     def __init__(self, server_host, server_port, team_name, password, username, report_login_result, report_lost_connection, difficulty):
         threading.Thread.__init__(self)
         self.connection = None
@@ -27,10 +29,13 @@ class ServerConnection(threading.Thread):
         self.message_receiver = None
         self.terminate = False
         self.counter = 1
+        # The messages to the server come from the sub process communicator as well as from the client loop and the windows
+        self.send_lock = threading.Lock()
         self.status_information = StatusInformation()
         self.enter_client_loop = False
         self.logged_in = False
         self.temporary_config_file = None
+        self.latest_full_status_request = None
 
     def stop(self):
         self.terminate = True
@@ -43,9 +48,17 @@ class ServerConnection(threading.Thread):
         self.enter_client_loop = True
 
     def send_message_to_server(self, client_to_server):
-        client_to_server.counter = self.counter
-        self.counter += 1
-        protobuf_utils.protobuf_send(self.connection, client_to_server)
+        with self.send_lock:
+            client_to_server.counter = self.counter
+            self.counter += 1
+            protobuf_utils.protobuf_send(self.connection, client_to_server)
+
+    def send_packed_message_to_server(self, packed):
+        """ Sends a ClientToServer that was serialized without its counter, see protobuf_utils.pack_without_counter() """
+        with self.send_lock:
+            counter = protobuf_utils.pack_varint_field(1, self.counter) # ClientToServer.counter
+            self.counter += 1
+            protobuf_utils.protobuf_send_packed(self.connection, packed, counter)
 
     def get_current_speed(self):
         if self.status_information is not None:
@@ -59,10 +72,20 @@ class ServerConnection(threading.Thread):
         self.status_information.update_seating(seating_update)
 
     def update_status(self, su_message):
-        if su_message.HasField("pos_update"):
-            self.update_status_pos(su_message.pos_update)
-        if su_message.HasField("bus_seating"):
-            self.update_status_seating(su_message.bus_seating)
+        """ The main client keeps the whole status, since it is published to the sub clients on the status bus """
+        self.status_information.update_status(su_message)
+        if self.status_information.needs_full_status:
+            self.request_full_status()
+
+    def request_full_status(self):
+        now = time.monotonic()
+        if self.latest_full_status_request is not None and now - self.latest_full_status_request < ServerConnection.FULL_STATUS_REQUEST_INTERVAL:
+            return
+        self.latest_full_status_request = now
+        client_to_server = clientprotocol_pb2.ClientToServer()
+        client_to_server.request_full_status.SetInParent()
+        client_to_server.request_full_status.client_index = 0
+        self.send_message_to_server(client_to_server)
 
     def _receive_data(self, size):
         while not self.terminate:
@@ -183,7 +206,7 @@ class ServerConnection(threading.Thread):
                     if server_to_client.HasField("status_update"):
                         su_message = server_to_client.status_update
                         self.update_status(su_message)
-                        self.subprocess_communicator.send_to_sub_clients(server_to_client)
+                        self.subprocess_communicator.send_to_sub_clients(server_to_client, self.status_information)
 
                 else:
                     print("Unable to unpack message, quitting to be sure")
@@ -1,67 +1,268 @@
 # Receive data from sub clients and send to the server, possibly listening in on the communication
+import select
 import socket
 import threading
 
+import rally.common.protobuf_utils as protobuf_utils
+from rally.common.status_bus import StatusBus
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.protocol import clientprotocol_pb2
 
 
+class SubClient:
+    """ The stream to one sub client. The messages to it are queued, and all that are queued go in the same send. """
+
+    # A sub client that doesn't read its messages gets no more until it has caught up. It then notices the missing
+    # status versions and asks for a full status.
+    MAX_PENDING = 4 * 1024 * 1024
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.port = connection.getpeername()[1]
+        self.registered = False
+        self.uses_status_bus = False
+        self.subscriptions = StatusSubscriptions.ALL
+        # The last status version sent, the trimmed updates continue from it
+        self.sent_version = None
+        self.received = bytearray()
+        self.pending = bytearray()
+        self.dropping = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def queue(self, data):
+        """ Returns False if data was dropped """
+        with self.lock:
+            if len(self.pending) + len(data) > SubClient.MAX_PENDING:
+                if not self.dropping:
+                    print("Subclient {0} isn't reading its messages, dropping them".format(self.port))
+                self.dropping = True
+                return False
+            self.dropping = False
+            self.pending += data
+            self._flush()
+            return True
+
+    def ring_doorbell(self):
+        with self.lock:
+            # The sub client reads the latest status from the bus, so one doorbell that it hasn't got yet is enough
+            if len(self.pending) == 0:
+                self.pending += StatusBus.DOORBELL
+                self._flush()
+
+    def has_pending(self):
+        with self.lock:
+            return len(self.pending) > 0
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        """ Sends as much as the socket takes without blocking. NOT mutex protected. """
+        if len(self.pending) == 0 or self.closed:
+            return
+        try:
+            sent = self.connection.send(self.pending)
+            del self.pending[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+
+class LocalSubClient:
+    """ A window in the main client's process, it gets the status updates as they are instead of packed """
+
+    def __init__(self, communicator):
+        self.communicator = communicator
+        self.uses_status_bus = False
+        self.subscriptions = StatusSubscriptions.ALL
+        if communicator.subscriptions is not None:
+            self.subscriptions = communicator.subscriptions
+        self.sent_version = None
+
+    def queue_message(self, server_to_client):
+        return self.communicator.queue_message(server_to_client)
+
+
 class SubProcessCommunicator(threading.Thread):
-    UDP_IP = "127.0.0.1"
+    IP = "127.0.0.1"
+    SELECT_TIMEOUT = 0.1 # seconds
 
     def __init__(self, server_connection):
         threading.Thread.__init__(self)
-        self.udp_sock = socket.socket(socket.AF_INET,  # Internet
-                                      socket.SOCK_DGRAM)  # UDP
-        self.udp_sock.settimeout(1)
-        self.udp_sock.bind((SubProcessCommunicator.UDP_IP, 0))
-        self.udp_port = self.udp_sock.getsockname()[1]
-        print("Opened UDP port {0} for clients to communicate with".format(self.udp_port))
+        self.listen_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listen_sock.bind((SubProcessCommunicator.IP, 0))
+        self.listen_sock.listen()
+        self.listen_sock.setblocking(False)
+        self.port = self.listen_sock.getsockname()[1]
+        print("Opened port {0} for clients to communicate with".format(self.port))
 
         self.clients = []
+        self.local_clients = []
+        self.clients_lock = threading.Lock()
         self.terminate = False
         self.server_connection = server_connection
+        # Closing the bus waits for a write that is in progress
+        self.status_bus_lock = threading.Lock()
+        self.status_bus = StatusBus.create(self.port)
 
     def clear_clients(self):
-        # TODO mutex?
-        self.clients = []
+        with self.clients_lock:
+            for client in self.clients:
+                client.closed = True
 
     def stop(self):
         self.terminate = True
+        with self.status_bus_lock:
+            if self.status_bus is not None:
+                self.status_bus.close()
+                self.status_bus = None
 
     def run(self):
         while not self.terminate:
+            with self.clients_lock:
+                for client in [client for client in self.clients if client.closed]:
+                    print("Lost connection to sub process {0}".format(client.port))
+                    client.close()
+                    self.clients.remove(client)
+                clients = self.clients.copy()
+            readers = [self.listen_sock] + [client.connection for client in clients]
+            writers = [client.connection for client in clients if client.has_pending()]
             try:
-                data, addr = self.udp_sock.recvfrom(65536)
-                # print("Received data to proxy: {0}".format(data))
-                size = int.from_bytes(data[0:4], "big")
-                if len(data) != size + 4:
-                    print("Invalid subprocess data: {0}".format(data))
-                    continue
-                # Send message on to the server
-                # TODO: not really needed that we unpack the message and then pack it again...
-                client_to_server = clientprotocol_pb2.ClientToServer()
-                unpack_result = client_to_server.ParseFromString(data[4:])
-                if unpack_result > 0:
-                    if client_to_server.HasField("sub_client_register"):
-                        # TODO: mutex?
-                        print("Subclient {0} registered".format(client_to_server.sub_client_register.udp_port))
-                        self.clients.append(client_to_server.sub_client_register.udp_port)
-                    else:
-                        self.server_connection.send_message_to_server(client_to_server)
-            except socket.timeout:
-                continue
-            except (ConnectionResetError, ConnectionAbortedError):
-                print("Lost connection to a sub process")
+                readable, writable, _ = select.select(readers, writers, [], SubProcessCommunicator.SELECT_TIMEOUT)
+            except (OSError, ValueError):
+                # A sub client was closed from another thread
                 continue
+
+            if self.listen_sock in readable:
+                self.accept_client()
+            for client in clients:
+                if client.connection in writable:
+                    client.flush()
+                if client.connection in readable:
+                    self.receive_from_client(client)
+        with self.clients_lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+        self.listen_sock.close()
+
+    def accept_client(self):
+        try:
+            connection, _addr = self.listen_sock.accept()
+        except (BlockingIOError, OSError):
+            return
+        connection.setblocking(False)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.clients_lock:
+            self.clients.append(SubClient(connection))
+
+    def receive_from_client(self, client):
+        try:
+            data = client.connection.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            client.closed = True
+            return
+        # All the messages that have arrived are handled together
+        client.received += data
+        for control, frame in protobuf_utils.take_frames(client.received):
+            try:
+                if control:
+                    register = clientprotocol_pb2.SubClientRegister()
+                    if register.ParseFromString(frame) > 0:
+                        self.register_client(client, register)
+                else:
+                    # A ClientToServer without the counter, it is sent on to the server without unpacking it
+                    self.server_connection.send_packed_message_to_server(frame)
             except Exception as e:
                 print("Sub process communications error: {0}".format(e))
+
+    def register_client(self, client, register):
+        client.uses_status_bus = register.status_bus and self.status_bus is not None
+        if register.HasField("subscriptions"):
+            client.subscriptions = register.subscriptions
+        if register.HasField("client_id"):
+            client.port = register.client_id
+        client.registered = True
+        print("Subclient {0} registered{1}".format(client.port, " on the status bus" if client.uses_status_bus else ""))
+        if client.uses_status_bus:
+            # Reads what is already on the bus
+            client.ring_doorbell()
+
+    def add_local_client(self, communicator):
+        with self.clients_lock:
+            self.local_clients.append(LocalSubClient(communicator))
+        print("Subclient {0} opened in this process".format(communicator.client_index))
+
+    def remove_local_client(self, communicator):
+        with self.clients_lock:
+            self.local_clients = [client for client in self.local_clients if client.communicator is not communicator]
+
+    def send_to_sub_clients(self, server_to_client, status_information):
+        """ The status is published once on the status bus, the sub clients reading it only get a doorbell.
+            A sub client only gets the updates that have a part it has subscribed to. """
+        with self.clients_lock:
+            clients = [client for client in self.clients if client.registered and not client.closed]
+            local_clients = self.local_clients.copy()
+        status_update = server_to_client.status_update
+        parts = StatusSubscriptions.parts(status_update)
+        with self.status_bus_lock:
+            if self.status_bus is not None:
+                status_changed = status_update.full_state or (parts & ~StatusSubscriptions.POSITION) != 0
+                self.status_bus.write(status_information, status_update.HasField("pos_update"), status_changed)
+        # (subscriptions, sent_version) -> message and frame, the sub clients that want the same get the same bytes
+        messages = {}
+        frames = {}
+        for client in clients + local_clients:
+            wanted = parts & client.subscriptions
+            if wanted == 0 and not status_update.full_state:
+                continue
+            if client.uses_status_bus:
+                client.ring_doorbell()
                 continue
+            key = (client.subscriptions, client.sent_version)
+            if key not in messages:
+                messages[key] = self.trim_for_client(server_to_client, client)
+            if isinstance(client, LocalSubClient):
+                queued = client.queue_message(messages[key])
+            else:
+                if key not in frames:
+                    frames[key] = protobuf_utils.pack_frame(messages[key].SerializeToString())
+                queued = client.queue(frames[key])
+            if not queued:
+                # The sub client must notice the missing versions
+                client.sent_version = None
+            elif status_update.full_state or (wanted & ~StatusSubscriptions.POSITION) != 0:
+                client.sent_version = status_update.version
 
-    def send_to_sub_clients(self, server_to_client):
-        packed = server_to_client.SerializeToString()
-        size = len(packed)
-        data = size.to_bytes(4, "big") + packed
-        clients = self.clients.copy()
-        for subclient_port in clients:
-            # print("Send to client at {0}".format(subclient_port))
-            self.udp_sock.sendto(data, ("127.0.0.1", subclient_port))
+    @staticmethod
+    def trim_for_client(server_to_client, client):
+        """ Trims the update to what client has subscribed to. The updates that were skipped for it had nothing that
+            it wanted, so the update continues from the last version it was sent. """
+        if client.subscriptions == StatusSubscriptions.ALL:
+            return server_to_client
+        status_update = server_to_client.status_update
+        trimmed = clientprotocol_pb2.ServerToClient()
+        trimmed.counter = server_to_client.counter
+        trimmed.status_update.CopyFrom(StatusSubscriptions.trim(status_update, client.subscriptions))
+        if status_update.HasField("version") and not status_update.full_state and client.sent_version is not None:
+            if (StatusSubscriptions.parts(trimmed.status_update) & ~StatusSubscriptions.POSITION) != 0:
+                if status_update.HasField("base_version"):
+                    trimmed.status_update.base_version = client.sent_version
+            else:
+                trimmed.status_update.version = client.sent_version
+                trimmed.status_update.ClearField("base_version")
+        return trimmed
@@ -1,19 +1,24 @@
 import argparse
 import tkinter
 from functools import partial
-from tkinter import Tk, Frame, Label, Text, END, DISABLED, NORMAL, Button, W, messagebox
+from tkinter import Tk, Toplevel, Frame, Label, Text, END, DISABLED, NORMAL, Button, W, messagebox
 import tkinter.font
 
 from client.common.client_config import ClientRallyConfig
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 from rally.protocol import clientprotocol_pb2
 
 
 class ExtraPuzzles:
-    def __init__(self, args):
+    def __init__(self, args, rally_configuration=None, parent=None):
+        """ With a parent the window is opened in the main client, it then shares its rally configuration """
         self.client_index = args.client_index
-        self.rally_configuration = ClientRallyConfig(args.rally_configuration, args.data_path)
+        if rally_configuration is None:
+            rally_configuration = ClientRallyConfig(args.rally_configuration, args.data_path)
+        self.rally_configuration = rally_configuration
         self.track_information = self.rally_configuration.track_information
+        self.parent = parent
 
         self.window = None
         self.latest_status_information = None
@@ -24,16 +29,30 @@ class ExtraPuzzles:
 
         self.layout()
 
-        self.sub_client_communicator = SubClientCommunicator(args, status_receiver=self.on_status_updates)
+        self.sub_client_communicator = SubClientCommunicator.create(args, window=self.window, status_receiver=self.on_status_updates, subscriptions=StatusSubscriptions.EXTRA_PUZZLES)
 
     def run(self):
-        self.sub_client_communicator.start()
+        self.start()
         self.window.mainloop()
         self.terminate = True
         self.sub_client_communicator.stop()
 
+    def start(self):
+        self.sub_client_communicator.start()
+
+    def close(self):
+        if self.terminate:
+            return
+        self.terminate = True
+        self.sub_client_communicator.stop()
+        self.window.destroy()
+
     def layout(self):
-        self.window = Tk()
+        if self.parent is None:
+            self.window = Tk()
+        else:
+            self.window = Toplevel(self.parent)
+            self.window.protocol("WM_DELETE_WINDOW", self.close)
         self.window.title("Extrauppgifter")
 
         messages_text = Text(self.window, height=2, width=80)
@@ -106,12 +125,13 @@ class ExtraPuzzles:
 
 
 parser = argparse.ArgumentParser(description='Show extra puzzles to the user')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 parser.add_argument("-r", "--rally_configuration", type=str, help="Path to the rally configuration to use", required=False)
 parser.add_argument("-d", "--data_path", type=str, help="Path to root of where rally data is stored", required=True)
-args = parser.parse_args()
 
-extra_puzzles = ExtraPuzzles(args)
-extra_puzzles.run()
+if __name__ == '__main__':
+    args = parser.parse_args()
+    extra_puzzles = ExtraPuzzles(args)
+    extra_puzzles.run()
@@ -3,21 +3,18 @@ from tkinter import *
 from tkinter import messagebox as messagebox
 
 from client.common.client_config import ClientRallyConfig
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 from rally.protocol import clientprotocol_pb2
 
 
 parser = argparse.ArgumentParser(description='The fish bone GUI')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 parser.add_argument("-r", "--rally_configuration", type=str, help="Path to the rally configuration to use", required=False)
 parser.add_argument("-d", "--data_path", type=str, help="Path to root of where rally data is stored",
                     required=True)
-args = parser.parse_args()
-
-rally_configuration = ClientRallyConfig(args.rally_configuration, args.data_path)
-track_information = rally_configuration.track_information
 
 
 class Rebus:
@@ -114,21 +111,36 @@ class Rebus:
 
 
 class RebusWindow:
-    def __init__(self):
+    def __init__(self, args, track_information, parent=None):
+        """ With a parent the window is opened in the main client, run() is then not used """
+        self.args = args
+        self.track_information = track_information
         self.terminate = False
         self.all_rebuses = []
 
-        self.window = Tk()
+        if parent is None:
+            self.window = Tk()
+        else:
+            self.window = Toplevel(parent)
+            self.window.protocol("WM_DELETE_WINDOW", self.close)
         self.window.title("Rebusar och fiskben")
         self.layout()
 
-        self.sub_client_communicator = SubClientCommunicator(args, status_receiver=self.on_status_updates)
+        self.sub_client_communicator = SubClientCommunicator.create(args, window=self.window, status_receiver=self.on_status_updates, subscriptions=StatusSubscriptions.REBUS_LIST)
         self.sub_client_communicator.start()
 
+    def run(self):
         self.window.mainloop()
         self.terminate = True
         self.sub_client_communicator.stop()
 
+    def close(self):
+        if self.terminate:
+            return
+        self.terminate = True
+        self.sub_client_communicator.stop()
+        self.window.destroy()
+
     def layout(self):
         messages_text = Text(self.window, height=5, width=80)
         messages_text.insert(END,
@@ -140,7 +152,7 @@ class RebusWindow:
         messages_text.grid(row=0, column=0)
 
         rest = Frame(self.window)
-        for section_number in track_information.get_all_section_numbers():
+        for section_number in self.track_information.get_all_section_numbers():
             rebus_frame = Frame(rest, pady=3, padx=3)
             rebus_frame.grid(row=section_number, column=0)
             rebus = Rebus(rebus_frame, section_number, Rebus.NORMAL, self)
@@ -181,11 +193,10 @@ class RebusWindow:
                     rebus.set_text(txt)
 
     def request_a_solution(self, section, rebus_type):
-        global args
         client_to_server = clientprotocol_pb2.ClientToServer()
-        client_to_server.counter = args.client_index
+        client_to_server.counter = self.args.client_index
         client_to_server.open_rebus_solution.SetInParent()
-        client_to_server.open_rebus_solution.user_id = args.user_id
+        client_to_server.open_rebus_solution.user_id = self.args.user_id
         client_to_server.open_rebus_solution.section = section
         if rebus_type == Rebus.HELP:
             client_to_server.open_rebus_solution.open_help = True
@@ -194,4 +205,8 @@ class RebusWindow:
         self.sub_client_communicator.send(client_to_server)
 
 
-rebus_window = RebusWindow()
+if __name__ == '__main__':
+    args = parser.parse_args()
+    rally_configuration = ClientRallyConfig(args.rally_configuration, args.data_path)
+    rebus_window = RebusWindow(args, rally_configuration.track_information)
+    rebus_window.run()
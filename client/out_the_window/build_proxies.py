@@ -0,0 +1,117 @@
+import argparse
+import os
+import shutil
+import subprocess
+
+import cv2
+
+from client.out_the_window.proxy_videos import PROXY_HEIGHTS, proxy_file
+from server.server_config import ServerRallyConfig
+
+parser = argparse.ArgumentParser(description='Builds lower resolution copies of the videos, for computers that can\'t decode the full resolution fast enough')
+parser.add_argument("-r", "--rally_configuration", type=str, help="Path to the rally configuration to use", required=True)
+parser.add_argument("--heights", type=int, nargs="+", default=PROXY_HEIGHTS, help="Heights of the copies to build")
+parser.add_argument("-f", "--force", action="store_true", help="Rebuild copies that already exist")
+args = parser.parse_args()
+
+
+def passthrough_option(ffmpeg):
+    """ -fps_mode came in ffmpeg 5.1, the older versions only have -vsync, which the newer ones have deprecated """
+    try:
+        result = subprocess.run([ffmpeg, "-hide_banner", "-h", "full"], capture_output=True, text=True)
+        if "-fps_mode" in result.stdout:
+            return "-fps_mode"
+    except OSError:
+        pass
+    return "-vsync"
+
+
+def build_with_ffmpeg(ffmpeg, source, target, height, fps):
+    # Every source frame is kept with its timestamp, only the size changes. One keyframe per second makes seeking cheap.
+    command = [ffmpeg, "-y", "-v", "error", "-i", source, "-map", "0:v:0", "-an",
+               "-vf", "scale=-2:{0}".format(height), ffmpeg_passthrough, "passthrough",
+               "-c:v", "libx264", "-preset", "medium", "-crf", "23", "-g", str(int(round(fps))), target]
+    subprocess.run(command, check=True)
+
+
+def build_with_opencv(source, target, height):
+    vid = cv2.VideoCapture(source)
+    fps = vid.get(cv2.CAP_PROP_FPS)
+    width = int(round(vid.get(cv2.CAP_PROP_FRAME_WIDTH) * height / vid.get(cv2.CAP_PROP_FRAME_HEIGHT) / 2)) * 2
+    writer = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    while True:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        writer.write(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+    writer.release()
+    vid.release()
+
+
+def check_proxy(video, source, target):
+    """ The proxy must have the same frames as the source, the configured frame offsets are used for both """
+    source_vid = cv2.VideoCapture(source)
+    target_vid = cv2.VideoCapture(target)
+    source_frames = source_vid.get(cv2.CAP_PROP_FRAME_COUNT)
+    target_frames = target_vid.get(cv2.CAP_PROP_FRAME_COUNT)
+    target_fps = target_vid.get(cv2.CAP_PROP_FPS)
+    source_vid.release()
+    target_vid.release()
+    if abs(target_fps - video.fps) > 0.01:
+        return "the frame rate is {0}, {1} is configured".format(target_fps, video.fps)
+    if source_frames != target_frames:
+        return "it has {0} frames, the source has {1}".format(target_frames, source_frames)
+    if video.end_frame is not None and target_frames < video.end_frame:
+        return "it has {0} frames, the end frame is {1}".format(target_frames, video.end_frame)
+    return None
+
+
+def build_proxies(video, ffmpeg):
+    source = video.movie_file
+    if not os.path.exists(source):
+        print("Missing video {0}".format(source))
+        return
+    vid = cv2.VideoCapture(source)
+    source_height = vid.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    vid.release()
+    for height in args.heights:
+        if height >= source_height:
+            continue
+        target = proxy_file(source, height)
+        if os.path.exists(target) and not args.force:
+            print("{0} already exists".format(target))
+            continue
+        print("Building {0}".format(target))
+        # Built under another name, so a client never picks up a half written proxy
+        base, ext = os.path.splitext(target)
+        tmp_target = base + ".tmp" + ext
+        try:
+            if ffmpeg is not None:
+                build_with_ffmpeg(ffmpeg, source, tmp_target, height, video.fps)
+            else:
+                build_with_opencv(source, tmp_target, height)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print("ERROR! Unable to build {0}: {1}".format(target, e))
+            if os.path.exists(tmp_target):
+                os.remove(tmp_target)
+            continue
+        error = check_proxy(video, source, tmp_target)
+        if error is not None:
+            print("ERROR! Not using {0}, {1}".format(target, error))
+            os.remove(tmp_target)
+            continue
+        os.replace(tmp_target, target)
+
+
+rally_configuration = ServerRallyConfig(args.rally_configuration)
+ffmpeg = shutil.which("ffmpeg")
+if ffmpeg is None:
+    print("ffmpeg isn't installed, building the proxies with OpenCV")
+else:
+    ffmpeg_passthrough = passthrough_option(ffmpeg)
+built = set()
+for section in rally_configuration.track_information.sections.values():
+    for video in section.videos.values():
+        if video.movie_file not in built:
+            built.add(video.movie_file)
+            build_proxies(video, ffmpeg)
@@ -0,0 +1,86 @@
+import bisect
+import json
+import os
+import shutil
+import subprocess
+
+
+class KeyframeIndex:
+    """ The times of the keyframes in a video. Seeking to a keyframe is cheap, seeking anywhere else means decoding
+        from the keyframe before. The index is built once with ffprobe and cached in a file next to the video. """
+
+    SUFFIX = ".keyframes.json"
+
+    def __init__(self, keyframes_ms):
+        self.keyframes_ms = keyframes_ms
+
+    def find_keyframe_at_or_after(self, ms):
+        """ Returns the time of the first keyframe at or after ms, or None if there isn't any """
+        i = bisect.bisect_left(self.keyframes_ms, ms)
+        if i < len(self.keyframes_ms):
+            return self.keyframes_ms[i]
+        return None
+
+    def find_keyframe_before(self, ms):
+        """ Returns the time of the last keyframe at or before ms, this is where the decoding starts when seeking to ms """
+        i = bisect.bisect_right(self.keyframes_ms, ms)
+        if i > 0:
+            return self.keyframes_ms[i - 1]
+        return None
+
+    @staticmethod
+    def load(movie_file):
+        """ Returns the index of the video, from the cache if it is up to date. None if it can't be built. """
+        try:
+            stat = os.stat(movie_file)
+        except OSError:
+            return None
+        cache_file = movie_file + KeyframeIndex.SUFFIX
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.loads(f.read())
+            if cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+                return KeyframeIndex(cached["keyframes_ms"])
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        keyframes_ms = KeyframeIndex.probe_keyframes(movie_file)
+        if keyframes_ms is None:
+            return None
+        try:
+            with open(cache_file, "w") as f:
+                f.write(json.dumps({"size": stat.st_size, "mtime": stat.st_mtime, "keyframes_ms": keyframes_ms}))
+        except (IOError, OSError) as e:
+            # The videos may be on a read only disk, the index is still used for this run
+            print("Unable to cache the keyframes of {0}: {1}".format(movie_file, e))
+        return KeyframeIndex(keyframes_ms)
+
+    @staticmethod
+    def probe_keyframes(movie_file):
+        """ Lists the keyframes from the packet flags, without decoding the video """
+        ffprobe = shutil.which("ffprobe")
+        if ffprobe is None:
+            print("ffprobe isn't installed, seeking without a keyframe index")
+            return None
+        args = [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", movie_file]
+        try:
+            output = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode("utf-8", "replace")
+        except (OSError, subprocess.CalledProcessError) as e:
+            print("Unable to list the keyframes of {0}: {1}".format(movie_file, e))
+            return None
+
+        keyframes = []
+        first_pts = None
+        for line in output.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) < 2 or parts[0] == "N/A":
+                continue
+            pts = float(parts[0])
+            if first_pts is None or pts < first_pts:
+                first_pts = pts
+            if "K" in parts[1]:
+                keyframes.append(pts)
+        if len(keyframes) == 0:
+            return None
+        # OpenCV counts the time from the start of the stream
+        return sorted([round((pts - first_pts) * 1000.0, 3) for pts in keyframes])
@@ -9,7 +9,9 @@ import time
 import argparse
 
 from client.common.client_config import ClientRallyConfig
+from client.out_the_window.proxy_videos import ProxySelector
 from client.out_the_window.video_capture import MyVideoCapture
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 
 #https://stackoverflow.com/questions/56534609/hardware-accelerated-decoding-with-opencv-and-python-on-windows-msmt-intelmfx
@@ -18,7 +20,7 @@ from rally.common.track_information import Video
 direction_translator = {"front": "framåt", "left": "till vänster", "right": "till höger"}
 
 parser = argparse.ArgumentParser(description='The steering GUI')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 parser.add_argument("-r", "--rally_configuration", type=str, help="Path to the rally configuration to use", required=True)
@@ -26,6 +28,10 @@ parser.add_argument("-d", "--data_path", type=str, help="Path to root of where r
 parser.add_argument("-v", "--view_direction", type=str, help="View direction (left, front, right)", required=True)
 parser.add_argument("-m", "--disallow_moving_direction", action="append", help="Disallow video to be shown for specified view (left, front, right) when the bus is moving", required=False)
 parser.add_argument("-s", "--disallow_stopped_direction", action="append", help="Disallow video to be shown for specified view (left, front, right) when the bus is stopped", required=False)
+parser.add_argument("-w", "--warm_views", type=int, default=2, help="Number of other view directions to keep open, for switching views without delay", required=False)
+parser.add_argument("--warm_sync_seconds", type=float, default=1.0, help="How often the views that aren't shown follow the bus", required=False)
+parser.add_argument("--video_tier", type=str, default=ProxySelector.AUTO, choices=ProxySelector.tier_names(), help="Video resolution to play, auto chooses from how fast this computer decodes", required=False)
+parser.add_argument("--prefetch_distance", type=float, default=200.0, help="Distance in meters before a turn to start opening the video of the next section", required=False)
 args = parser.parse_args()
 #print(args)
 
@@ -65,16 +71,20 @@ class App:
         self.pos_time = None
         self.delay = int(1.0/30.0) # Mostly we are dealing with 30fps video, so set a default delay based on that
         self.last_frame_time_shown = -1
+        self.warm_synced = 0.0
+        self.photo = None
+        self.canvas_image = None
+        self.proxy_selector = ProxySelector(args.video_tier)
 
         self.buttons = {}
         self.button_states = {Video.LEFT: False, Video.FRONT: False, Video.RIGHT: False}
 
-        self.sub_client_communicator = SubClientCommunicator(args, pos_receiver=self.on_pos_updates)
+        self.sub_client_communicator = SubClientCommunicator(args, pos_receiver=self.on_pos_updates, subscriptions=StatusSubscriptions.POSITION)
         self.sub_client_communicator.start()
 
         # open video source (by default this will try to open the computer webcam)
         self.view_video_caps = {Video.LEFT: None, Video.FRONT: None, Video.RIGHT: None}
-        self.view_video_caps[self.viewing_direction] = MyVideoCapture(self.track_information, self.viewing_direction)
+        self.view_video_caps[self.viewing_direction] = MyVideoCapture(self.track_information, self.viewing_direction, self.proxy_selector)
 
         self.window = window
         self.window.title(window_title)
@@ -87,6 +97,9 @@ class App:
 
         self.window.mainloop()
         self.terminate = True
+        for vid_cap in self.view_video_caps.values():
+            if vid_cap is not None:
+                vid_cap.stop(wait=True)
 
     def current_video_cap(self):
         # TODO: make sure there is an object here!
@@ -95,12 +108,9 @@ class App:
     def change_video(self):
         self.reconfiguring = True
 
-        # Forget about the videos that aren't shown
         vid_cap = self.current_video_cap()
-        self.view_video_caps = {Video.LEFT: None, Video.FRONT: None, Video.RIGHT: None}
-        self.view_video_caps[self.viewing_direction] = vid_cap
-
         vid_cap.change_section(self.current_section, self.distance)
+        self.update_warm_views(True)
         self.force_update = True
         if self.canvas is None:
             # Create a canvas that can fit the above video source size
@@ -152,10 +162,66 @@ class App:
         if self.viewing_direction != direction:
             self.viewing_direction = direction
             if self.view_video_caps[direction] is None:
-                self.view_video_caps[direction] = MyVideoCapture(self.track_information, self.viewing_direction)
+                self.view_video_caps[direction] = MyVideoCapture(self.track_information, self.viewing_direction, self.proxy_selector)
                 self.view_video_caps[direction].change_section(self.current_section, self.distance)
+            self.view_video_caps[direction].set_warm(False)
+            self.update_warm_views(False)
             self.force_update = True
 
+    def update_warm_views(self, section_changed):
+        """ Keeps the videos of the other view directions open, as many as allowed, preferring the main direction """
+        section = self.track_information.get_section(self.current_section)
+        wanted = []
+        for direction in [self.main_direction, Video.LEFT, Video.FRONT, Video.RIGHT]:
+            if direction != self.viewing_direction and direction not in wanted and section.get_video(direction) is not None:
+                wanted.append(direction)
+        wanted = wanted[:max(0, args.warm_views)]
+
+        for direction in self.view_video_caps:
+            if direction == self.viewing_direction:
+                continue
+            vid_cap = self.view_video_caps[direction]
+            if direction in wanted:
+                if vid_cap is None:
+                    vid_cap = MyVideoCapture(self.track_information, direction, self.proxy_selector)
+                    vid_cap.set_warm(True)
+                    vid_cap.change_section(self.current_section, self.distance)
+                    self.view_video_caps[direction] = vid_cap
+                else:
+                    vid_cap.set_warm(True)
+                    if section_changed:
+                        vid_cap.change_section(self.current_section, self.distance)
+            elif vid_cap is not None:
+                vid_cap.stop()
+                self.view_video_caps[direction] = None
+
+    def prepare_next_section(self, section, distance):
+        """ Opens the videos of the next section when the bus gets close to the turn, if the turns are known """
+        turn = section.get_correct_turn()
+        if turn is None:
+            return
+        turn_distance = section.get_correct_turn_distance()
+        # The turn is taken up to 100 meters after the turn frame
+        if turn_distance - args.prefetch_distance <= distance <= turn_distance + 100:
+            for vid_cap in self.view_video_caps.values():
+                if vid_cap is not None:
+                    vid_cap.prepare_section(turn.next_section)
+
+    def sync_warm_views(self, distance):
+        """ Moves the views that aren't shown to where the bus is, not more often than allowed """
+        now = time.monotonic()
+        if now - self.warm_synced < args.warm_sync_seconds:
+            return
+        self.warm_synced = now
+        section = self.track_information.get_section(self.current_section)
+        for direction, vid_cap in self.view_video_caps.items():
+            if vid_cap is None or direction == self.viewing_direction or vid_cap.is_seeking():
+                continue
+            target_ms = section.calculate_other_video_second_from_distance(distance, direction) * 1000
+            first_ms, last_ms = vid_cap.get_buffered_range()
+            if first_ms is None or abs(first_ms - target_ms) > vid_cap.one_frame_ms:
+                vid_cap.seek_ms(target_ms)
+
     def update_view_buttons(self):
         if self.terminate:
             return
@@ -192,13 +258,26 @@ class App:
         self.update_view_buttons()
 
     def seek(self, vid_cap, video_target_msecs, video_speed):
-        # TODO: calculate how far into the future we should seek based on average seek time
-        seek_time_ms = 1000
-        # How many frame would be shown in one realtime second with the current speed?
-        seek_extra_frames = vid_cap.fps * self.speed / video_speed
-        # How much time does that correspond to in the video?
-        seek_extra_ms = seek_extra_frames / vid_cap.fps
-        vid_cap.seek_ms(video_target_msecs + seek_extra_ms)
+        # The bus keeps moving while seeking, so seek to where it will be when the seek is done
+        seek_time_ms = vid_cap.get_seek_latency_ms()
+        seek_extra_ms = 0.0
+        if video_speed > 0.0:
+            # How much video time passes during the seek with the current speed?
+            seek_extra_ms = seek_time_ms * self.speed / video_speed
+        # Landing on a keyframe makes the seek cheap
+        vid_cap.seek_ms(vid_cap.find_seek_target(video_target_msecs + seek_extra_ms))
+
+    def show_frame(self, frame):
+        """ The same PhotoImage and canvas item are used for all frames, as long as the size stays the same """
+        image = PIL.Image.fromarray(frame)
+        if self.photo is None or self.photo.width() != image.width or self.photo.height() != image.height:
+            self.photo = PIL.ImageTk.PhotoImage(image=image)
+            if self.canvas_image is None:
+                self.canvas_image = self.canvas.create_image(0, 0, image=self.photo, anchor=tkinter.NW)
+            else:
+                self.canvas.itemconfig(self.canvas_image, image=self.photo)
+        else:
+            self.photo.paste(image)
 
     def update(self):
         delay = self._update()
@@ -232,43 +311,31 @@ class App:
         video_target_secs = self.track_information.get_section(self.current_section).calculate_other_video_second_from_distance(interpolated_distance, self.viewing_direction)
         video_target_msecs = video_target_secs * 1000
 
-        wait = 1
-        if self.speed < 0.0:
-            # We are backing, no fancy methods to handle this, simply seek always when we need a new frame
-            if abs(video_target_msecs - self.last_frame_time_shown) < vid_cap.one_frame_ms:
-                # We are still close to what we last displayed
-                ret, frame, frame_time = vid_cap.get_frame(self.force_update)
-                wait = vid_cap.one_frame_ms
+        # The decoder works ahead of the playback, with a buffer that follows the speed of the bus
+        playback_rate = 0.0
+        if video_speed > 0.0:
+            playback_rate = self.speed / video_speed
+        vid_cap.set_playback_rate(playback_rate)
+
+        # The frames are decoded in the background, so this only decides when the decoder has to start over somewhere else
+        if not vid_cap.is_seeking():
+            first_ms, last_ms = vid_cap.get_buffered_range()
+            if self.speed < 0.0:
+                # We are backing, the decoder fills the buffer backwards, so only seek when it is far behind
+                if first_ms is None or video_target_msecs < first_ms - 1000 or video_target_msecs > last_ms + 1000:
+                    vid_cap.seek_ms(video_target_msecs)
             else:
-                # We are backing and need a new frame, so seek and force the next frame
-                vid_cap.seek_ms(video_target_msecs)
-                ret, frame, frame_time = vid_cap.get_frame(True)
-                wait = 1 # Draw as quickly as possible
-        else:
-            # Either standing still or moving forward
-            if abs(video_target_msecs - self.last_frame_time_shown) < vid_cap.one_frame_ms:
-                # We are still close to what we last displayed
-                ret, frame, frame_time = vid_cap.get_frame(self.force_update)
-                wait = vid_cap.one_frame_ms
-            else:
-                # We need to show a new frame
-                diff_ms = video_target_msecs - self.last_frame_time_shown
-                if diff_ms > 0.0:
-                    behind = diff_ms
-                    # We are behind what we should show
-                    if behind > 1000:
-                        # We are more than one second behind than what should be shown
-                        # Seek to a time that is a bit into the future
-                        self.seek(vid_cap, video_target_msecs, video_speed)
-                        ret, frame, frame_time = vid_cap.get_frame(True)
-                        wait = 1 # Not sure, but should probably try do display again as soon as possible, to find out where we stand
-                    else:
-                        # Hope that we can catch up with the video soon
-                        ret, frame, frame_time = vid_cap.get_frame(True)
-                        wait = 1 # We are behind, so don't wait around to show the next frame
-                elif diff_ms < 0.0:
+                # Either standing still or moving forward
+                decoded_ms = self.last_frame_time_shown
+                if last_ms is not None:
+                    decoded_ms = max(decoded_ms, last_ms)
+                if video_target_msecs - decoded_ms > 1000:
+                    # The decoder is more than one second behind than what should be shown
+                    # Seek to a time that is a bit into the future
+                    self.seek(vid_cap, video_target_msecs, video_speed)
+                elif self.last_frame_time_shown - video_target_msecs > vid_cap.one_frame_ms:
                     # We are ahead of what we should show
-                    ahead_ms = -diff_ms
+                    ahead_ms = self.last_frame_time_shown - video_target_msecs
 
                     # How long would it take for the bus to arrive at the same time with the current speed?
                     if abs(self.speed) > 0.01:
@@ -279,22 +346,26 @@ class App:
                         t_ms = 10000
                     if t_ms > 3000:
                         # It would take more than three wall clock seconds for the bus to catch up with the
-                        # video, so seek and force a frame update
+                        # video, so seek
                         self.seek(vid_cap, video_target_msecs, video_speed)
-                        ret, frame, frame_time = vid_cap.get_frame(True)
-                        wait = 1
-                    else:
-                        # In not too long we could possibly catch up with the video
-                        # TODO: should probably return a new frame here every now and then, to not make the video too jumpy
-                        ret, frame, frame_time = vid_cap.get_frame(False)
-                        wait = vid_cap.one_frame_ms
 
-        self.force_update = False
-        self.last_frame_time_shown = frame_time
+        self.sync_warm_views(interpolated_distance)
+        if section is not None:
+            self.prepare_next_section(section, interpolated_distance)
+
+        # Pick the buffered frame closest to where the bus is, the frame pacing doesn't depend on the decoding
+        ret, frame, frame_time = vid_cap.get_frame(video_target_msecs)
 
-        if ret:
-            self.photo = PIL.ImageTk.PhotoImage(image=PIL.Image.fromarray(frame))
-            self.canvas.create_image(0, 0, image=self.photo, anchor=tkinter.NW)
+        wait = vid_cap.one_frame_ms
+        if playback_rate > 1.0:
+            wait = vid_cap.one_frame_ms / playback_rate
+        if vid_cap.is_seeking():
+            wait = 1 # Show the new position as soon as it has been decoded
+
+        if ret and (self.force_update or frame_time != self.last_frame_time_shown):
+            self.show_frame(frame)
+            self.last_frame_time_shown = frame_time
+        self.force_update = False
         if self.debug:
             self.frame_label["text"] = str(vid_cap.frame_number)
 
@@ -0,0 +1,92 @@
+import os
+import time
+from threading import Lock
+
+import cv2
+
+# The heights of the lower resolution copies (proxies) of the videos, built with build_proxies.py
+PROXY_HEIGHTS = [720, 540, 360]
+
+
+def proxy_file(movie_file, height):
+    """ The proxy of a video lies next to it, movie.mp4 -> movie.proxy540.mp4 """
+    base, ext = os.path.splitext(movie_file)
+    return "{0}.proxy{1}{2}".format(base, height, ext)
+
+
+def measure_decode_fps(video_file, seconds):
+    """ Returns how many frames per second this computer decodes and converts from the video """
+    vid = cv2.VideoCapture(video_file)
+    if not vid.isOpened():
+        return 0.0
+    frames = 0
+    image = None
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if image is None:
+            ret, image = vid.read()
+        else:
+            ret, image = vid.read(image)
+        if not ret:
+            break
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    vid.release()
+    if frames == 0 or elapsed <= 0.0:
+        return 0.0
+    return frames / elapsed
+
+
+class ProxySelector:
+    """ Chooses which version of the videos to play: the source or one of the proxies.
+        With AUTO the versions are tried from the highest resolution and the first one that this computer can decode
+        fast enough is used. That is decided once, on the first video, since all the videos of a rally are recorded
+        the same way. A proxy has the same frames as its source, so the frame and time calculations still hold. """
+
+    AUTO = "auto"
+    SOURCE = "source"
+
+    MEASURE_SECONDS = 0.5
+    # Several windows decode at the same time, and the bus can drive faster than the video was recorded
+    DECODE_MARGIN = 3.0
+
+    def __init__(self, tier=AUTO):
+        self.tier = tier
+        self.lock = Lock()
+
+    @staticmethod
+    def tier_names():
+        return [ProxySelector.AUTO, ProxySelector.SOURCE] + [str(height) for height in PROXY_HEIGHTS]
+
+    def select(self, movie_file):
+        """ Returns the file to play for movie_file """
+        with self.lock:
+            if self.tier == ProxySelector.AUTO:
+                self.tier = self._choose_tier(movie_file)
+            tier = self.tier
+        if tier != ProxySelector.SOURCE:
+            proxy = proxy_file(movie_file, tier)
+            if os.path.exists(proxy):
+                return proxy
+        return movie_file
+
+    def _choose_tier(self, movie_file):
+        candidates = [(ProxySelector.SOURCE, movie_file)]
+        for height in PROXY_HEIGHTS:
+            proxy = proxy_file(movie_file, height)
+            if os.path.exists(proxy):
+                candidates.append((str(height), proxy))
+        if len(candidates) == 1:
+            return ProxySelector.SOURCE
+
+        vid = cv2.VideoCapture(movie_file)
+        needed_fps = vid.get(cv2.CAP_PROP_FPS) * ProxySelector.DECODE_MARGIN
+        vid.release()
+        for tier, video_file in candidates:
+            decode_fps = measure_decode_fps(video_file, ProxySelector.MEASURE_SECONDS)
+            print("Decoding {0} at {1:.0f} fps, {2:.0f} fps needed".format(video_file, decode_fps, needed_fps))
+            if decode_fps >= needed_fps:
+                return tier
+        # Nothing is fast enough, use the lowest resolution
+        return candidates[-1][0]
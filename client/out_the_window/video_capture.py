@@ -1,91 +1,616 @@
-from threading import Lock
+import math
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
 
 import cv2
 
+from client.out_the_window.keyframe_index import KeyframeIndex
+from client.out_the_window.proxy_videos import ProxySelector
+
+
+class DecodedFrame:
+    def __init__(self, frame_time, frame_number, image):
+        self.frame_time = frame_time
+        self.frame_number = frame_number
+        self.image = image
+
+
+class FrameDecoder(Thread):
+    """ Decodes the frames of one video in a thread of its own, into a bounded ring buffer ahead of the playback position.
+        The buffer is sized after the playback rate, and when the video is played faster than real time only the
+        frames that can be shown are converted. The UI thread only picks frames from the buffer and never waits for
+        the decoder. Seeks are handed over to the decoder and the buffer is refilled from the new position.
+        The time from a seek until its first frame is decoded is measured, as a running average.
+        Videos can only be decoded forward, so when playing backwards chunks of frames (from a keyframe when possible)
+        are decoded before the buffered ones and served in reverse, within a memory budget.
+        The frames are decoded into the arrays of frames that have been dropped, and converted to RGB in place. """
+
+    LOOKAHEAD_SECONDS = 1.0 # Wall clock time to decode ahead of the playback
+    MIN_FRAMES = 4
+    MAX_FRAMES = 60 # A decoded 1080p frame is about 6MB
+    MAX_REVERSE_CACHE_BYTES = 256 * 1024 * 1024
+    REVERSE_CHUNK_MS = 1000.0 # Video time decoded at a time when playing backwards, unless the keyframes say otherwise
+    SEEK_LATENCY_WEIGHT = 0.3 # Weight of the latest seek in the running average
+    MAX_FREE_IMAGES = 8 # Arrays kept for decoding new frames into
+
+    def __init__(self, vid, fps, movie_file, seek_latency_ms):
+        Thread.__init__(self)
+        self.daemon = True
+        self.vid = vid
+        self.fps = fps
+        self.one_frame_ms = 1.0 / fps * 1000
+        self.frame_bytes = max(1, int(vid.get(cv2.CAP_PROP_FRAME_WIDTH) * vid.get(cv2.CAP_PROP_FRAME_HEIGHT) * 3))
+        self.movie_file = movie_file
+        self.keyframe_index = None
+        self.seek_latency_ms = seek_latency_ms
+        self.seek_started = None
+        self.condition = Condition()
+        self.frames = deque() # Sorted on the frame time
+        self.taken = None # The frame that was last returned by take_frame(), it may still be shown
+        self.free_images = []
+        self.rate = 1.0 # Video seconds per wall clock second, negative when playing backwards
+        self.position_ms = None # Where the playback is
+        self.last_read_ms = None # The latest frame read from the video, where forward decoding continues
+        self.reverse_gap_ms = 0.0
+        self.seek_target_ms = None
+        self.seeking = False
+        self.at_end = False
+        self.at_start = False
+        self.warm = False # Only keeps the frame at the position, for a view that isn't shown
+        self.terminate = False
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify_all()
+
+    def seek_ms(self, ms):
+        with self.condition:
+            self.seek_target_ms = ms
+            self.seeking = True
+            for decoded_frame in self.frames:
+                self._recycle(decoded_frame)
+            self.frames.clear()
+            self.condition.notify_all()
+
+    def is_seeking(self):
+        with self.condition:
+            return self.seeking
+
+    def set_playback_rate(self, rate):
+        with self.condition:
+            if rate != self.rate:
+                self.rate = rate
+                self.condition.notify_all()
+
+    def set_warm(self, warm):
+        with self.condition:
+            self.warm = warm
+            if warm:
+                self.rate = 0.0
+            self.condition.notify_all()
+
+    def get_buffered_range(self):
+        """ Returns the times of the first and the last decoded frame, or (None, None) if there is none """
+        with self.condition:
+            if len(self.frames) == 0:
+                return None, None
+            return self.frames[0].frame_time, self.frames[-1].frame_time
+
+    def take_frame(self, target_ms):
+        """ Returns the decoded frame closest to target_ms, or None if nothing is decoded yet.
+            The frames that have been passed will never be shown and are dropped to make room for new ones. """
+        with self.condition:
+            self.position_ms = target_ms
+            dropped = False
+            if self.rate >= 0.0:
+                while len(self.frames) >= 2 and abs(self.frames[1].frame_time - target_ms) <= abs(self.frames[0].frame_time - target_ms):
+                    self._recycle(self.frames.popleft())
+                    dropped = True
+            else:
+                while len(self.frames) >= 2 and abs(self.frames[-2].frame_time - target_ms) <= abs(self.frames[-1].frame_time - target_ms):
+                    self._recycle(self.frames.pop())
+                    dropped = True
+            if dropped:
+                self.condition.notify_all()
+            if len(self.frames) == 0:
+                return None
+            previous = self.taken
+            if self.rate >= 0.0:
+                self.taken = self.frames[0]
+            else:
+                self.taken = self.frames[-1]
+            # The caller is done with the previous frame when it asks for a new one
+            if previous is not None and previous is not self.taken and previous not in self.frames:
+                self._recycle(previous)
+            return self.taken
+
+    # NOT protected by the condition
+    def _recycle(self, decoded_frame):
+        # The frame that was taken last may still be on its way to the screen
+        if decoded_frame is not self.taken and len(self.free_images) < FrameDecoder.MAX_FREE_IMAGES:
+            self.free_images.append(decoded_frame.image)
+
+    def _read(self):
+        """ Reads the next frame into a recycled array if there is one """
+        with self.condition:
+            image = None
+            if len(self.free_images) > 0:
+                image = self.free_images.pop()
+        if image is None:
+            return self.vid.read()
+        return self.vid.read(image)
+
+    def _frame_step(self):
+        # Every step'th frame is enough when playing faster than the video
+        return max(1, int(abs(self.rate)))
+
+    def _capacity(self):
+        wanted = math.ceil(FrameDecoder.LOOKAHEAD_SECONDS * self.fps * max(self.rate, 0.0) / self._frame_step())
+        return min(FrameDecoder.MAX_FRAMES, max(FrameDecoder.MIN_FRAMES, wanted + 1))
+
+    def _reverse_capacity(self):
+        return max(2 * FrameDecoder.MIN_FRAMES, FrameDecoder.MAX_REVERSE_CACHE_BYTES // self.frame_bytes)
+
+    def _needs_decoding(self):
+        if self.warm:
+            return not self.at_end and len(self.frames) == 0
+        if self.rate >= 0.0:
+            return not self.at_end and len(self.frames) < self._capacity()
+        if self.at_start:
+            return False
+        if len(self.frames) == 0:
+            return True
+        # Only start on a new chunk when there is room for it
+        if len(self.frames) > self._reverse_capacity() // 2:
+            return False
+        position_ms = self.position_ms
+        if position_ms is None:
+            position_ms = self.frames[-1].frame_time
+        return position_ms - self.frames[0].frame_time < FrameDecoder.LOOKAHEAD_SECONDS * 1000 * max(-self.rate, 0.1)
+
+    def get_seek_latency_ms(self):
+        with self.condition:
+            return self.seek_latency_ms
+
+    def get_keyframe_index(self):
+        with self.condition:
+            return self.keyframe_index
+
+    def _seek_done(self):
+        latency_ms = (time.monotonic() - self.seek_started) * 1000.0
+        self.seek_started = None
+        self.seek_latency_ms += FrameDecoder.SEEK_LATENCY_WEIGHT * (latency_ms - self.seek_latency_ms)
+
+    def _aborted(self):
+        # Read without the lock, it is only a hint to stop decoding frames that won't be used
+        return self.terminate or self.seek_target_ms is not None
+
+    def run(self):
+        # Building the index the first time a video is used takes a while, so it is done here instead of in the UI
+        keyframe_index = KeyframeIndex.load(self.movie_file)
+        with self.condition:
+            self.keyframe_index = keyframe_index
+
+        while True:
+            with self.condition:
+                while not self.terminate and self.seek_target_ms is None and not self._needs_decoding():
+                    self.condition.wait()
+                if self.terminate:
+                    break
+                seek_target_ms = self.seek_target_ms
+                self.seek_target_ms = None
+                if seek_target_ms is not None:
+                    self.seek_started = time.monotonic()
+                    self.at_end = False
+                    self.at_start = False
+                step = self._frame_step()
+                reverse = self.rate < 0.0
+                if reverse:
+                    if seek_target_ms is not None:
+                        chunk_end_ms = seek_target_ms + self.one_frame_ms / 2
+                    elif len(self.frames) > 0:
+                        chunk_end_ms = self.frames[0].frame_time
+                    else:
+                        chunk_end_ms = self.position_ms or self.last_read_ms or 0.0
+                else:
+                    resume_after_ms = None
+                    if seek_target_ms is None and len(self.frames) > 0 and self.last_read_ms != self.frames[-1].frame_time:
+                        # The video was read somewhere else while playing backwards
+                        resume_after_ms = self.frames[-1].frame_time
+
+            # Decode outside of the lock, so the UI thread never waits for the decoder
+            if reverse:
+                self._decode_reverse_chunk(chunk_end_ms, step, seek_target_ms is not None)
+            else:
+                self._decode_forward(seek_target_ms, resume_after_ms, step)
+
+        self.vid.release()
+
+    def _decode_forward(self, seek_target_ms, resume_after_ms, step):
+        if seek_target_ms is not None:
+            self.vid.set(cv2.CAP_PROP_POS_MSEC, seek_target_ms)
+        elif resume_after_ms is not None:
+            self.vid.set(cv2.CAP_PROP_POS_MSEC, resume_after_ms + self.one_frame_ms / 2)
+        frame = None
+        while True:
+            for i in range(step - 1):
+                self.vid.grab()
+            if frame is None:
+                ret, frame = self._read()
+            else:
+                ret, frame = self.vid.read(frame)
+            frame_time = self.vid.get(cv2.CAP_PROP_POS_MSEC)
+            frame_number = self.vid.get(cv2.CAP_PROP_POS_FRAMES)
+            self.last_read_ms = frame_time
+            # The seek may land before the frames that are already buffered
+            if not ret or resume_after_ms is None or frame_time > resume_after_ms + 0.5 or self._aborted():
+                break
+        decoded_frame = None
+        if ret:
+            decoded_frame = DecodedFrame(frame_time, frame_number, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame))
+
+        with self.condition:
+            if decoded_frame is not None and (self.seek_target_ms is not None or self.rate < 0.0):
+                # Seeking again or playing backwards, this frame is from the wrong place
+                self._recycle(decoded_frame)
+                decoded_frame = None
+            if self.seek_target_ms is not None:
+                return
+            self.at_end = not ret
+            self.at_start = False
+            if self.seek_started is not None:
+                self._seek_done()
+            self.seeking = False
+            if decoded_frame is not None:
+                self.frames.append(decoded_frame)
+            self.condition.notify_all()
+
+    def _decode_reverse_chunk(self, chunk_end_ms, step, seeking):
+        # Decode at most half the memory budget at a time, the other half is for the frames that are being shown
+        max_chunk_ms = (self._reverse_capacity() // 2) * step * self.one_frame_ms
+        start_ms = chunk_end_ms - min(FrameDecoder.REVERSE_CHUNK_MS, max_chunk_ms)
+        if self.keyframe_index is not None:
+            # Start the chunk on a keyframe, so nothing is decoded only to be thrown away
+            keyframe_ms = self.keyframe_index.find_keyframe_before(chunk_end_ms - self.one_frame_ms)
+            if keyframe_ms is not None and chunk_end_ms - keyframe_ms <= max_chunk_ms:
+                start_ms = keyframe_ms
+        start_ms = max(0.0, start_ms - self.reverse_gap_ms)
+
+        decoded = []
+        if chunk_end_ms > 0.0:
+            self.vid.set(cv2.CAP_PROP_POS_MSEC, start_ms)
+            count = 0
+            frame = None # The array to read into, until a frame is kept
+            while not self._aborted() and self.rate < 0.0:
+                if frame is None:
+                    ret, frame = self._read()
+                else:
+                    ret, frame = self.vid.read(frame)
+                if not ret:
+                    break
+                frame_time = self.vid.get(cv2.CAP_PROP_POS_MSEC)
+                self.last_read_ms = frame_time
+                if frame_time >= chunk_end_ms - 0.5:
+                    break
+                if count % step == 0:
+                    decoded.append(DecodedFrame(frame_time, self.vid.get(cv2.CAP_PROP_POS_FRAMES), cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)))
+                    frame = None
+                count += 1
+
+        with self.condition:
+            if self.seek_target_ms is not None or self.rate >= 0.0:
+                for decoded_frame in decoded:
+                    self._recycle(decoded_frame)
+                return
+            if seeking:
+                # Only forward seeks are measured, those are the ones that are planned ahead
+                self.seek_started = None
+                self.seeking = False
+            self.at_end = False
+            self.at_start = start_ms <= 0.0
+            if len(decoded) == 0:
+                # The video didn't end up before the chunk end, try further back the next time
+                self.reverse_gap_ms += FrameDecoder.REVERSE_CHUNK_MS
+            else:
+                self.reverse_gap_ms = 0.0
+            for decoded_frame in reversed(decoded):
+                if len(self.frames) == 0 or decoded_frame.frame_time < self.frames[0].frame_time - 0.5:
+                    self.frames.appendleft(decoded_frame)
+                else:
+                    self._recycle(decoded_frame)
+
+            # Evict the frames that have already been shown first, then the ones furthest away
+            capacity = self._reverse_capacity()
+            while len(self.frames) > capacity and self.position_ms is not None and self.frames[-1].frame_time > self.position_ms + self.one_frame_ms:
+                self._recycle(self.frames.pop())
+            while len(self.frames) > capacity:
+                self._recycle(self.frames.popleft())
+            self.condition.notify_all()
+
+
+class PreparedVideo(Thread):
+    """ Opens the video of a section in a thread of its own and decodes the frame where the bus enters the section,
+        so that a capture can switch to it without waiting for the file to be opened """
+
+    def __init__(self, section_number, video_file, start_ms, seek_latency_ms):
+        Thread.__init__(self)
+        self.daemon = True
+        self.section_number = section_number
+        self.video_file = video_file
+        self.start_ms = start_ms
+        self.seek_latency_ms = seek_latency_ms
+        self.width = 0
+        self.height = 0
+        self.fps = 0
+        self.lock = Lock()
+        self.decoder = None
+        self.failed = False
+        self.cancelled = False
+
+    def run(self):
+        print("Preparing video: {}".format(self.video_file))
+        vid = cv2.VideoCapture(self.video_file)
+        if not vid.isOpened():
+            print("Unable to open video source {0}".format(self.video_file))
+            with self.lock:
+                self.failed = True
+            return
+        self.width = vid.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = vid.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.fps = vid.get(cv2.CAP_PROP_FPS)
+        decoder = FrameDecoder(vid, self.fps, self.video_file, self.seek_latency_ms)
+        decoder.set_warm(True)
+        if self.start_ms > 0:
+            decoder.seek_ms(self.start_ms)
+        with self.lock:
+            if self.cancelled:
+                vid.release()
+                return
+            self.decoder = decoder
+            decoder.start()
+
+    def is_ready(self):
+        """ True when the first frame is decoded, or when the video couldn't be opened """
+        with self.lock:
+            if self.failed:
+                return True
+            return self.decoder is not None and self.decoder.get_buffered_range()[0] is not None
+
+    def take(self):
+        """ Hands over the decoder, None if the video couldn't be opened """
+        with self.lock:
+            decoder = self.decoder
+            self.decoder = None
+            self.cancelled = True
+            return decoder
+
+    def cancel(self):
+        decoder = self.take()
+        if decoder is not None:
+            decoder.stop()
+
 
 class MyVideoCapture:
-    def __init__(self, track_information, view_direction):
+    INITIAL_SEEK_LATENCY_MS = 1000.0 # Until a seek has been measured
+    MAX_KEYFRAME_SNAP_MS = 500.0 # How much further than asked to seek, to land on a keyframe
+
+    def __init__(self, track_information, view_direction, proxy_selector=None):
         self.frame_number = 0
         self.frame_time = 0.0
-        self.vid = None
+        self.decoder = None
         self.width = 0
         self.height = 0
         self.fps = 0
         self.one_frame_ms = 1.0 / 30.0 * 1000
+        self.seek_latency_ms = MyVideoCapture.INITIAL_SEEK_LATENCY_MS
         self.mutex = Lock()
         self.track_information = track_information
         self.view_direction = view_direction
+        if proxy_selector is None:
+            proxy_selector = ProxySelector(ProxySelector.SOURCE)
+        self.proxy_selector = proxy_selector
         self.latest_image = None
+        self.warm = False
+        self.next_video = None # PreparedVideo
+        self.switching = False # Switches to next_video as soon as it is ready
+        self.switch_distance = 0.0
 
-    def change_section(self, new_section, distance_in_new_section):
+    def prepare_section(self, section_number):
+        """ Starts opening the video of a section that the bus will soon drive into """
         with self.mutex:
-            if self.vid is not None:
-                if self.vid.isOpened():
-                    self.vid.release()
+            if self.next_video is not None and self.next_video.section_number == section_number:
+                return
+            if self.switching:
+                return
+            self._prepare_section(section_number, 0.0)
 
-            section = self.track_information.get_section(new_section)
-            video_obj = section.get_video(self.view_direction)
-            if video_obj is None:
+    def change_section(self, new_section, distance_in_new_section):
+        with self.mutex:
+            if self.decoder is None and self.next_video is None:
+                # The first video is opened right away, the window is sized after it
+                self._open_section(new_section, distance_in_new_section)
                 return
-            video_file = video_obj.movie_file
-
-            self.latest_image = None
-
-            # Open the video source
-            print("Changing video to: {}".format(video_file))
-            self.vid = cv2.VideoCapture(video_file)
-            if not self.vid.isOpened():
-                raise ValueError("Unable to open video source")
-
-            # Get video source width and height
-            self.width = self.vid.get(cv2.CAP_PROP_FRAME_WIDTH)
-            self.height = self.vid.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            self.fps = self.vid.get(cv2.CAP_PROP_FPS)
-            self.one_frame_ms = 1.0 / self.fps * 1000
-            self.frame_number = 0
-            self.frame_time = 0.0
-
-            if distance_in_new_section > 0:
-                offset_sec = section.calculate_other_video_second_from_distance(distance_in_new_section, self.view_direction)
-                offset_ms = offset_sec * 1000
-                self._seek_ms(offset_ms)
-                self.frame_time = offset_ms
-                self.frame_number = section.calculate_other_video_frame_from_distance(distance_in_new_section, self.view_direction)
+
+            # The old decoder releases its video when it stops, no need to wait for that
+            self._stop_decoder()
+            if self.next_video is None or self.next_video.section_number != new_section:
+                self._prepare_section(new_section, distance_in_new_section)
+                self.switch_distance = 0.0
+            else:
+                self.switch_distance = distance_in_new_section
+            # Until the new video has been opened, the latest frame of the old one is shown
+            self.switching = self.next_video is not None
+            self._finish_switch()
+
+    # NOT mutex protected
+    def _prepare_section(self, section_number, distance):
+        self._cancel_next_video()
+        section = self.track_information.get_section(section_number)
+        video_obj = section.get_video(self.view_direction)
+        if video_obj is None:
+            return
+        start_ms = 0.0
+        if distance > 0:
+            start_ms = section.calculate_other_video_second_from_distance(distance, self.view_direction) * 1000
+        self.next_video = PreparedVideo(section_number, self.proxy_selector.select(video_obj.movie_file), start_ms, self.seek_latency_ms)
+        self.next_video.start()
+
+    # NOT mutex protected
+    def _finish_switch(self):
+        if not self.switching or not self.next_video.is_ready():
+            return
+        next_video = self.next_video
+        self.next_video = None
+        self.switching = False
+        decoder = next_video.take()
+        if decoder is None:
+            return
+        print("Changing video to: {}".format(next_video.video_file))
+        self.width = next_video.width
+        self.height = next_video.height
+        self.fps = next_video.fps
+        self.one_frame_ms = 1.0 / self.fps * 1000
+        self.frame_number = 0
+        self.frame_time = next_video.start_ms
+        self.decoder = decoder
+        self.decoder.set_warm(self.warm)
+        if self.switch_distance > 0:
+            section = self.track_information.get_section(next_video.section_number)
+            self._seek_to_distance(section, self.switch_distance)
+
+    # NOT mutex protected
+    def _open_section(self, new_section, distance_in_new_section):
+        section = self.track_information.get_section(new_section)
+        video_obj = section.get_video(self.view_direction)
+        if video_obj is None:
+            return
+        video_file = self.proxy_selector.select(video_obj.movie_file)
+
+        self.latest_image = None
+
+        # Open the video source
+        print("Changing video to: {}".format(video_file))
+        vid = cv2.VideoCapture(video_file)
+        if not vid.isOpened():
+            raise ValueError("Unable to open video source")
+
+        # Get video source width and height
+        self.width = vid.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = vid.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.fps = vid.get(cv2.CAP_PROP_FPS)
+        self.one_frame_ms = 1.0 / self.fps * 1000
+        self.frame_number = 0
+        self.frame_time = 0.0
+
+        self.decoder = FrameDecoder(vid, self.fps, video_file, self.seek_latency_ms)
+        if distance_in_new_section > 0:
+            self._seek_to_distance(section, distance_in_new_section)
+        self.decoder.set_warm(self.warm)
+        self.decoder.start()
+
+    # NOT mutex protected
+    def _seek_to_distance(self, section, distance):
+        offset_sec = section.calculate_other_video_second_from_distance(distance, self.view_direction)
+        offset_ms = offset_sec * 1000
+        self.decoder.seek_ms(offset_ms)
+        self.frame_time = offset_ms
+        self.frame_number = section.calculate_other_video_frame_from_distance(distance, self.view_direction)
 
     # Mutex protected
     def seek_ms(self, ms):
+        """ Returns right away, the frames from the new position are decoded in the background """
         with self.mutex:
-            self._seek_ms(ms)
+            if self.decoder is not None:
+                self.decoder.seek_ms(ms)
 
-    # NOT mutex protected
-    def _seek_ms(self, ms):
-        self.latest_image = None
-        self.vid.set(cv2.CAP_PROP_POS_MSEC, ms)
+    def is_seeking(self):
+        """ Also True while switching to another video """
+        with self.mutex:
+            self._finish_switch()
+            if self.switching:
+                return True
+            return self.decoder is not None and self.decoder.is_seeking()
 
-    def get_frame(self, catch_new=True):
-        if not catch_new:
-            if self.latest_image is not None:
-                return True, self.latest_image, self.frame_time
+    def get_seek_latency_ms(self):
+        """ The average time from a seek until its first frame can be shown """
+        with self.mutex:
+            if self.decoder is not None:
+                self.seek_latency_ms = self.decoder.get_seek_latency_ms()
+            return self.seek_latency_ms
 
+    def find_seek_target(self, ms):
+        """ Returns a keyframe a little after ms if there is one, seeking there doesn't decode frames before it """
         with self.mutex:
-            if self.vid is None:
-                return False, None, -1
-            if self.vid.isOpened():
-                ret, frame = self.vid.read()
-                self.frame_time = self.vid.get(cv2.CAP_PROP_POS_MSEC)
-                self.frame_number = self.vid.get(cv2.CAP_PROP_POS_FRAMES)
-                if ret:
-                    # Return a boolean success flag and the current frame converted to BGR
-                    self.latest_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    return ret, self.latest_image, self.frame_time
-                else:
-                    # TODO: what does it mean that we return the latest image here?
-                    return ret, self.latest_image, self.frame_time
-            else:
+            if self.decoder is None:
+                return ms
+            keyframe_index = self.decoder.get_keyframe_index()
+        if keyframe_index is None:
+            return ms
+        keyframe_ms = keyframe_index.find_keyframe_at_or_after(ms)
+        if keyframe_ms is not None and keyframe_ms - ms <= MyVideoCapture.MAX_KEYFRAME_SNAP_MS:
+            return keyframe_ms
+        return ms
+
+    def set_playback_rate(self, rate):
+        with self.mutex:
+            if self.decoder is not None:
+                self.decoder.set_playback_rate(rate)
+
+    def set_warm(self, warm):
+        """ A warm capture keeps its video open and one decoded frame, so the view can be switched to right away """
+        with self.mutex:
+            self.warm = warm
+            if self.decoder is not None:
+                self.decoder.set_warm(warm)
+
+    def get_buffered_range(self):
+        with self.mutex:
+            self._finish_switch()
+            if self.decoder is None:
+                return None, None
+            return self.decoder.get_buffered_range()
+
+    def get_frame(self, target_ms):
+        """ Returns the decoded frame closest to target_ms, or the latest frame if no new frame has been decoded yet """
+        with self.mutex:
+            self._finish_switch()
+            if self.decoder is not None:
+                decoded_frame = self.decoder.take_frame(target_ms)
+                if decoded_frame is not None:
+                    self.latest_image = decoded_frame.image
+                    self.frame_time = decoded_frame.frame_time
+                    self.frame_number = decoded_frame.frame_number
+            if self.latest_image is None:
                 return False, None, -1
+            return True, self.latest_image, self.frame_time
+
+    def stop(self, wait=False):
+        """ wait makes sure that the video has been released, which must happen before the program exits """
+        with self.mutex:
+            decoder = self.decoder
+            self._stop_decoder()
+            self._cancel_next_video()
+        if wait and decoder is not None:
+            decoder.join(1.0)
+
+    # NOT mutex protected
+    def _cancel_next_video(self):
+        if self.next_video is not None:
+            self.next_video.cancel()
+            self.next_video = None
+        self.switching = False
+
+    # NOT mutex protected
+    def _stop_decoder(self):
+        if self.decoder is not None:
+            # The measured seek latency is kept for the next video
+            self.seek_latency_ms = self.decoder.get_seek_latency_ms()
+            self.decoder.stop()
+            self.decoder = None
 
     # Release the video source when the object is destroyed
     def __del__(self):
-        if self.vid is not None:
-            if self.vid.isOpened():
-                self.vid.release()
+        self._stop_decoder()
+        self._cancel_next_video()
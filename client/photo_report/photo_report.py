@@ -4,12 +4,13 @@ from functools import partial
 from tkinter import Tk, Frame, Label, StringVar, Entry, Text, END, W, DISABLED, messagebox
 
 from rally.common.rally_config import RallyConfiguration
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 from rally.protocol import clientprotocol_pb2
 
 
 parser = argparse.ArgumentParser(description='The steering GUI')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 args = parser.parse_args()
@@ -166,7 +167,7 @@ def photo_text_changed(section, index, variable, entry, *args, **kwargs):
     send_photo_answer(section, index, i)
 
 
-sub_client_communicator = SubClientCommunicator(args, status_receiver=on_status_updates)
+sub_client_communicator = SubClientCommunicator(args, status_receiver=on_status_updates, subscriptions=StatusSubscriptions.POSITION | StatusSubscriptions.PHOTO_ANSWERS | StatusSubscriptions.PLATE_ANSWERS)
 sub_client_communicator.start()
 
 window = Tk()
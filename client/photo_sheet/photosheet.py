@@ -6,7 +6,7 @@ from PIL import ImageTk,Image
 import argparse
 
 parser = argparse.ArgumentParser(description='Shows a photo sheet')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 parser.add_argument("-i", "--index", type=int, help="Index of this photo sheet instance", required=True)
@@ -4,12 +4,13 @@ from functools import partial
 from tkinter import Tk, Frame, Label, StringVar, Entry, Text, END, W, DISABLED, messagebox
 
 from rally.common.rally_config import RallyConfiguration
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 from rally.protocol import clientprotocol_pb2
 
 
 parser = argparse.ArgumentParser(description='Rebus report sheet')
-parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
 parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
 parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
 args = parser.parse_args()
@@ -41,7 +42,7 @@ def on_status_updates(status_information):
                 txt_entry.insert(END, answer)
 
 
-sub_client_communicator = SubClientCommunicator(args, status_receiver=on_status_updates)
+sub_client_communicator = SubClientCommunicator(args, status_receiver=on_status_updates, subscriptions=StatusSubscriptions.REBUS_ANSWERS)
 sub_client_communicator.start()
 
 
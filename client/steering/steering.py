@@ -1,5 +1,6 @@
 import argparse
 import datetime
+import os
 from functools import partial
 from tkinter import *
 from tkinter import messagebox
@@ -7,6 +8,7 @@ from tkinter import messagebox
 from PIL import ImageTk, Image
 
 from client.common.client_config import ClientRallyConfig
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.common.subclient_communicator import SubClientCommunicator
 from rally.protocol import clientprotocol_pb2
 
@@ -16,9 +18,14 @@ class SteeringWindow:
     LEFT = 1
     RIGHT = 2
 
-    def __init__(self, client_index, track_information):
+    def __init__(self, args, track_information, parent=None, image_dir=""):
+        """ With a parent the window is opened in the main client, see start() and close() """
         self.debug_mode = False
-        self.my_client_index = client_index
+        self.args = args
+        self.my_client_index = args.client_index
+        self.parent = parent
+        self.image_dir = image_dir
+        self.terminate = False
         self.connected = False
         self.speed = 0.0
         self.distance = 0.0
@@ -56,7 +63,7 @@ class SteeringWindow:
 
         self.layout()
 
-        self.sub_client_communicator = SubClientCommunicator(args, pos_receiver=self.on_pos_update)
+        self.sub_client_communicator = SubClientCommunicator.create(self.args, window=self.window, pos_receiver=self.on_pos_update, subscriptions=StatusSubscriptions.POSITION | StatusSubscriptions.DRIVING_MESSAGE)
         self.sub_client_communicator.start()
 
     def is_locked(self):
@@ -77,8 +84,15 @@ class SteeringWindow:
             return True, "Ni har redan gått i mål!"
         return False, None
 
+    def image(self, file_name):
+        return ImageTk.PhotoImage(Image.open(os.path.join(self.image_dir, file_name)), master=self.window)
+
     def layout(self):
-        self.window = Tk()
+        if self.parent is None:
+            self.window = Tk()
+        else:
+            self.window = Toplevel(self.parent)
+            self.window.protocol("WM_DELETE_WINDOW", self.close)
         self.window.title("Dedicated driver")
 
         # w = self.image1.width()
@@ -99,18 +113,18 @@ class SteeringWindow:
 
         self.f_indicators = Frame(self.window)
 
-        self.speed_indicator_image = ImageTk.PhotoImage(Image.open('speed_frame.png'))
+        self.speed_indicator_image = self.image('speed_frame.png')
         # TODO: frame around the value?
         self.speed_label = Label(self.f_indicators, text="0", font=("Arial Bold", 50), width=3)
         self.speed_variable = StringVar()
         self.speed_label["textvariable"] = self.speed_variable
 
         self.turn_indicator_images[SteeringWindow.LEFT] = \
-            {True: ImageTk.PhotoImage(Image.open('blinkers_left_on_70.png')),
-             False: ImageTk.PhotoImage(Image.open('blinkers_left_off_70.png'))}
+            {True: self.image('blinkers_left_on_70.png'),
+             False: self.image('blinkers_left_off_70.png')}
         self.turn_indicator_images[SteeringWindow.RIGHT] = \
-            {True: ImageTk.PhotoImage(Image.open('blinkers_right_on_70.png')),
-             False: ImageTk.PhotoImage(Image.open('blinkers_right_off_70.png'))}
+            {True: self.image('blinkers_right_on_70.png'),
+             False: self.image('blinkers_right_off_70.png')}
 
         lbl = Label(self.f_indicators, image=self.turn_indicator_images[SteeringWindow.LEFT][False], text="11")
         lbl.bind("<Button-1>", self.left_indicator_clicket)
@@ -124,7 +138,7 @@ class SteeringWindow:
 
         self.f_indicators.grid(row=1, column=0)
 
-        self.pedals_image = ImageTk.PhotoImage(Image.open('gas_and_brake.png'))
+        self.pedals_image = self.image('gas_and_brake.png')
         self.pedals_label = Label(self.window, image=self.pedals_image)
         self.pedals_label.grid(row=2, column=0)
         # https://effbot.org/tkinterbook/tkinter-events-and-bindings.htm
@@ -132,7 +146,7 @@ class SteeringWindow:
         self.pedals_label.bind("<B1-Motion>", self.mouse_event)
         self.pedals_label.bind("<ButtonRelease-1>", self.release_mouse)
 
-        self.backup_image = ImageTk.PhotoImage(Image.open('backup.png'))
+        self.backup_image = self.image('backup.png')
         self.backup_label = Label(self.window, image=self.backup_image)
         self.backup_label.grid(row=3, column=0)
         self.backup_label.bind("<Button-1>", self.backup_clicked)
@@ -167,12 +181,26 @@ class SteeringWindow:
         self.speed_locked = None
 
     def run(self):
+        self.start()
+        self.window.mainloop()
+        self.terminate = True
+        self.sub_client_communicator.stop()
+
+    def start(self):
         self.window.after(1, self.update_speed)
         self.window.after(100, self.send_to_client)
-        self.window.mainloop()
+
+    def close(self):
+        """ Closes a window that was opened with a parent """
+        if self.terminate:
+            return
+        self.terminate = True
         self.sub_client_communicator.stop()
+        self.window.destroy()
 
     def on_pos_update(self, status_information):
+        if self.terminate:
+            return
         self.stopped = status_information.stopped or status_information.looking_for_rebus
         self.distance = status_information.distance
 
@@ -214,6 +242,8 @@ class SteeringWindow:
                 self.notice_label.place_forget()
 
     def send_to_client(self):
+        if self.terminate:
+            return
         if not self.connected:
             self.window.after(1000, self.send_to_client)
             return
@@ -337,6 +367,8 @@ class SteeringWindow:
         self.gas_pedal(event, False)
 
     def update_speed(self):
+        if self.terminate:
+            return
         if self.looking_for_rebus or not self.connected:
             self.window.after(100, self.update_speed)
             return
@@ -416,7 +448,7 @@ class SteeringWindow:
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='The steering GUI')
-    parser.add_argument("-p", "--port", type=int, help="UDP port of the main client", required=True)
+    parser.add_argument("-p", "--port", type=int, help="Port of the main client", required=True)
     parser.add_argument("-c", "--client_index", type=int, help="Client index, used in communication", required=True)
     parser.add_argument("-u", "--user_id", type=int, help="User ID", required=True)
     parser.add_argument("-r", "--rally_configuration", type=str, help="Path to the rally configuration to use",
@@ -428,5 +460,5 @@ if __name__ == '__main__':
     rally_configuration = ClientRallyConfig(args.rally_configuration, args.data_path)
     track_information = rally_configuration.track_information
 
-    steering_gui = SteeringWindow(args.client_index, track_information)
+    steering_gui = SteeringWindow(args, track_information)
     steering_gui.run()
@@ -5,6 +5,8 @@
 # def int_from_bytes(xbytes: bytes) -> int:
 #     return int.from_bytes(xbytes, 'big')
 
+import google.protobuf.message
+
 def protobuf_send(connection, message):
     try:
         data = message.SerializeToString()
@@ -15,6 +17,43 @@ def protobuf_send(connection, message):
     except Exception as e:
         return False, e
 
+def protobuf_send_packed(connection, data, trailer=b""):
+    """ Sends an already serialized message, possibly followed by a trailer with extra fields, like the counter """
+    try:
+        size = len(data) + len(trailer)
+        connection.sendall(b"".join((size.to_bytes(4, "big"), data, trailer)))
+        return True, None
+    except Exception as e:
+        return False, e
+
+def pack_without_counter(message):
+    """ Serializes everything but the (required) counter field, message itself isn't changed.
+        Protobuf fields can come in any order, so the counter can be added afterwards with pack_varint_field().
+        Like SerializeToString() it raises EncodeError if any other required field is missing. """
+    without_counter = type(message)()
+    without_counter.CopyFrom(message)
+    without_counter.ClearField("counter")
+    missing = [field for field in without_counter.FindInitializationErrors() if field != "counter"]
+    if len(missing) > 0:
+        raise google.protobuf.message.EncodeError("Message {0} is missing required fields: {1}".format(message.DESCRIPTOR.full_name, ",".join(missing)))
+    return without_counter.SerializePartialToString()
+
+def pack_varint_field(field_number, value):
+    """ Encodes a non-negative integer field (int32, int64, bool, enum) the same way SerializeToString() would """
+    return encode_varint((field_number << 3) | 0) + encode_varint(value) # wire type 0 = varint
+
+def pack_message_field(field_number, data):
+    """ Encodes an already serialized sub message (or string/bytes) as a field, the same way SerializeToString() would """
+    return encode_varint((field_number << 3) | 2) + encode_varint(len(data)) + data # wire type 2 = length delimited
+
+def encode_varint(value):
+    data = bytearray()
+    while value > 0x7f:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
 def protobuf_sendto(socket, dest_port, message):
     try:
         data = message.SerializeToString()
@@ -24,6 +63,31 @@ def protobuf_sendto(socket, dest_port, message):
     except Exception as e:
         return False, e
 
+# Set in the size of a frame between the sub clients and the main client, for messages that the main client handles
+# itself. The other frames are ClientToServer messages without the counter, that are forwarded to the server as they are.
+CONTROL_FRAME = 0x80000000
+
+def pack_frame(data, control=False):
+    size = len(data)
+    if control:
+        size |= CONTROL_FRAME
+    return size.to_bytes(4, "big") + data
+
+def take_frames(buffer):
+    """ Removes the complete frames from the start of the bytearray buffer, returns them as (control, data) """
+    frames = []
+    pos = 0
+    while len(buffer) - pos >= 4:
+        size = int.from_bytes(buffer[pos:pos + 4], "big")
+        control = (size & CONTROL_FRAME) != 0
+        size &= ~CONTROL_FRAME
+        if len(buffer) - pos - 4 < size:
+            break
+        frames.append((control, bytes(buffer[pos + 4:pos + 4 + size])))
+        pos += 4 + size
+    del buffer[:pos]
+    return frames
+
 
 # def protobuf_unpack(buffer, target_proto):
 #     if len(buffer) < 4:
@@ -1,5 +1,5 @@
 class RallyVersion:
-    VERSION = 4
+    VERSION = 5
 
     def __init__(self):
         pass
@@ -0,0 +1,180 @@
+import os
+import struct
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None  # Before Python 3.8, the status is sent to the sub clients in the messages instead
+
+from rally.protocol import clientprotocol_pb2
+
+
+class StatusBus:
+    """ The latest status of the team in shared memory, written by the main client and read by its sub clients.
+        The position is kept in fixed fields that are read without parsing anything. The rest of the status is a full
+        ServerStatusUpdate that the readers only parse when its version has changed.
+        There is a single writer. The sequence number is odd while it writes, a reader that sees it change reads again. """
+
+    SIZE = 4 * 1024 * 1024
+    # seq, pos_version, force_update_count, status_version, speed, distance, current_section, rally_stage, flags, status_size
+    HEADER = struct.Struct("<QQQQddiiII")
+    SEQ = struct.Struct("<Q")
+    # Sent to the sub clients instead of the status, an empty message
+    DOORBELL = (0).to_bytes(4, "big")
+
+    STOPPED = 1
+    LOOKING_FOR_REBUS = 2
+    RALLY_STARTED = 4
+    AFTERNOON_STARTED = 8
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        # Writer
+        self.seq = 0
+        self.pos_version = 0
+        self.force_update_count = 0
+        self.status_version = 0
+        self.status_size = 0
+        # Reader
+        self.read_pos_version = 0
+        self.read_force_update_count = 0
+        self.read_status_version = 0
+
+    @staticmethod
+    def name_for_port(port):
+        """ The port of the main client is passed to all sub clients, and it is unique on this computer """
+        return "rally_status_{0}".format(port)
+
+    @staticmethod
+    def create(port):
+        """ Returns a new bus for the main client, or None if shared memory isn't available """
+        if shared_memory is None:
+            return None
+        name = StatusBus.name_for_port(port)
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name=name, create=True, size=StatusBus.SIZE)
+            except FileExistsError:
+                # Left behind by a client that crashed
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                shm = shared_memory.SharedMemory(name=name, create=True, size=StatusBus.SIZE)
+        except (OSError, ValueError) as e:
+            print("Unable to create the status bus, sending the status in the messages: {0}".format(e))
+            return None
+        shm.buf[0:StatusBus.HEADER.size] = bytes(StatusBus.HEADER.size)
+        return StatusBus(shm, True)
+
+    @staticmethod
+    def attach(port):
+        """ Returns the bus of the main client at port, or None if there isn't one """
+        if shared_memory is None:
+            return None
+        name = StatusBus.name_for_port(port)
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Before Python 3.13 the resource tracker would remove the main client's memory when this process exits
+                shm = shared_memory.SharedMemory(name=name)
+                if os.name == "posix":
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(shm._name, "shared_memory")
+        except (OSError, ValueError):
+            return None
+        return StatusBus(shm, False)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except OSError:
+                pass
+
+    def write(self, status_information, has_pos, status_changed):
+        """ Publishes status_information, the full status is only packed again if it has changed. NOT mutex protected. """
+        if has_pos:
+            self.pos_version += 1
+            if status_information.force_update:
+                self.force_update_count += 1
+        packed = None
+        if status_changed:
+            status_update = clientprotocol_pb2.ServerStatusUpdate()
+            status_information.fill_full_status(status_update)
+            packed = status_update.SerializeToString()
+            if StatusBus.HEADER.size + len(packed) > StatusBus.SIZE:
+                print("ERROR! The status ({0} bytes) doesn't fit in the status bus".format(len(packed)))
+                packed = None
+            else:
+                self.status_version += 1
+                self.status_size = len(packed)
+
+        flags = 0
+        if status_information.stopped:
+            flags |= StatusBus.STOPPED
+        if status_information.looking_for_rebus:
+            flags |= StatusBus.LOOKING_FOR_REBUS
+        if status_information.rally_is_started:
+            flags |= StatusBus.RALLY_STARTED
+        if status_information.afternoon_is_started:
+            flags |= StatusBus.AFTERNOON_STARTED
+
+        buf = self.shm.buf
+        self.seq += 1
+        StatusBus.SEQ.pack_into(buf, 0, self.seq)
+        if packed is not None:
+            buf[StatusBus.HEADER.size:StatusBus.HEADER.size + len(packed)] = packed
+        StatusBus.HEADER.pack_into(buf, 0, self.seq, self.pos_version, self.force_update_count, self.status_version,
+                                   status_information.speed, status_information.distance,
+                                   status_information.current_section, status_information.rally_stage,
+                                   flags, self.status_size)
+        self.seq += 1
+        StatusBus.SEQ.pack_into(buf, 0, self.seq)
+
+    def _read(self, parse_status):
+        """ Returns a consistent header, and the packed status if it is wanted and newer than the one already read """
+        buf = self.shm.buf
+        while True:
+            seq = StatusBus.SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                time.sleep(0)
+                continue
+            header = StatusBus.HEADER.unpack_from(buf, 0)
+            packed = None
+            if parse_status and header[3] != self.read_status_version:
+                packed = bytes(buf[StatusBus.HEADER.size:StatusBus.HEADER.size + header[9]])
+            if StatusBus.SEQ.unpack_from(buf, 0)[0] == seq:
+                return header, packed
+
+    def read(self, status_information, parse_status=True):
+        """ Updates status_information from the bus, returns if the position and the status have changed.
+            Without parse_status only the position is read. """
+        header, packed = self._read(parse_status)
+        _seq, pos_version, force_update_count, status_version, speed, distance, current_section, rally_stage, flags, _size = header
+
+        pos_changed = pos_version != self.read_pos_version
+        self.read_pos_version = pos_version
+        if pos_changed:
+            status_information.speed = speed
+            status_information.distance = distance
+            status_information.current_section = current_section
+            status_information.rally_stage = rally_stage
+            status_information.stopped = (flags & StatusBus.STOPPED) != 0
+            status_information.looking_for_rebus = (flags & StatusBus.LOOKING_FOR_REBUS) != 0
+            status_information.rally_is_started = (flags & StatusBus.RALLY_STARTED) != 0
+            status_information.afternoon_is_started = (flags & StatusBus.AFTERNOON_STARTED) != 0
+            # Updates that were written over before this reader got to them still force an update
+            status_information.force_update = force_update_count != self.read_force_update_count
+            self.read_force_update_count = force_update_count
+
+        status_changed = packed is not None
+        if status_changed:
+            self.read_status_version = status_version
+            status_update = clientprotocol_pb2.ServerStatusUpdate()
+            status_update.ParseFromString(packed)
+            status_information.update_status(status_update)
+        return pos_changed, status_changed
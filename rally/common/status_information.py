@@ -67,6 +67,17 @@ class StatusInformation:
         self.extra_puzzles = {}
         self.driving_message = ""
 
+        # The server only sends what has changed since the previous version, after an initial full status
+        self.status_version = None
+        self.needs_full_status = True
+
+    def clear_status(self):
+        self.rebus_statuses = RebusStatuses()
+        self.rebus_answers = {}
+        self.rebus_solutions = {}
+        self.extra_puzzles = {}
+        self.driving_message = ""
+
     def get_my_seat(self):
         for i in range(1, 10):
             if self.seating[i] is not None:
@@ -96,16 +107,34 @@ class StatusInformation:
             self.force_update = pos_update.force_update
 
     def update_status(self, status_update):
+        """ The position is always applied. The rest is only applied if it follows on the version we already have,
+            otherwise needs_full_status is set and the status is left as it is until a full status arrives. """
         if status_update.HasField("pos_update"):
             self.update_pos(status_update.pos_update)
+
+        full = True # Older servers always send everything
+        if status_update.HasField("version"):
+            full = status_update.full_state
+            if full:
+                self.clear_status()
+            elif self.status_version is not None and status_update.version <= self.status_version:
+                # Nothing new, or changes that were already included in a full status that got here first
+                return
+            elif self.status_version is None or not status_update.HasField("base_version") or \
+                    status_update.base_version != self.status_version:
+                self.needs_full_status = True
+                return
+            self.status_version = status_update.version
+            self.needs_full_status = False
+
         if status_update.HasField("bus_seating"):
             self.update_seating(status_update.bus_seating)
         if status_update.HasField("rebus_list"):
             self.update_rebus_list(status_update.rebus_list)
         if status_update.HasField("photo_answers"):
-            self.update_photo_status(status_update.photo_answers)
+            self.update_photo_status(status_update.photo_answers, full)
         if status_update.HasField("plate_answers"):
-            self.update_plate_status(status_update.plate_answers)
+            self.update_plate_status(status_update.plate_answers, full)
         if status_update.HasField("rebus_answers"):
             self.update_rebus_status(status_update.rebus_answers)
         if status_update.HasField("rebus_solutions"):
@@ -115,6 +144,64 @@ class StatusInformation:
         if status_update.HasField("driving_message"):
             self.update_driving_message(status_update.driving_message)
 
+    def fill_full_status(self, status_update):
+        """ Fills in everything but the position, as a full status that update_status can apply """
+        status_update.version = self.status_version if self.status_version is not None else 0
+        status_update.full_state = True
+        status_update.bus_seating.SetInParent()
+        for i in range(1, 10):
+            player = self.seating[i]
+            if player.name != "" or player.user_id != 0:
+                seat = clientprotocol_pb2.BusSeatAllocation()
+                seat.seat_index = i
+                seat.player_id = player.user_id
+                seat.player_name = player.name
+                status_update.bus_seating.bus_seat_allocations.extend([seat])
+        status_update.rebus_list.SetInParent()
+        self.rebus_statuses.fill_rebus_list(status_update.rebus_list)
+        status_update.plate_answers.SetInParent()
+        for plate in self.plate_answers:
+            answer = clientprotocol_pb2.PlateAnswer()
+            answer.section_number = plate.section
+            answer.section_index = plate.index
+            if plate.answer is not None:
+                answer.answer = plate.answer
+            status_update.plate_answers.plate_answers.extend([answer])
+        status_update.photo_answers.SetInParent()
+        for photo in self.photo_answers:
+            answer = clientprotocol_pb2.PhotoAnswer()
+            answer.section_number = photo.section
+            answer.section_index = photo.index
+            if photo.answer is not None:
+                answer.answer = photo.answer
+            status_update.photo_answers.photo_answers.extend([answer])
+        status_update.rebus_answers.SetInParent()
+        for section, rebus_answer in self.rebus_answers.items():
+            answer = clientprotocol_pb2.RebusAnswer()
+            answer.section_number = section
+            answer.answer = rebus_answer
+            status_update.rebus_answers.rebus_answers.extend([answer])
+        status_update.rebus_solutions.locked = self.rebus_solutions_locked
+        for rs in self.rebus_solutions.values():
+            solution = clientprotocol_pb2.RebusSolution()
+            solution.section = rs.section
+            solution.solution = rs.solution
+            solution.east = rs.east
+            solution.north = rs.north
+            solution.target_description = rs.target_description
+            solution.target_east = rs.target_east
+            solution.target_north = rs.target_north
+            solution.target_picture = rs.target_picture
+            status_update.rebus_solutions.rebus_solutions.extend([solution])
+        status_update.extra_puzzles.SetInParent()
+        for puzzle_id, instructions in self.extra_puzzles.items():
+            extra_puzzle = clientprotocol_pb2.ExtraPuzzle()
+            extra_puzzle.puzzle_id = puzzle_id
+            extra_puzzle.opened = True
+            extra_puzzle.instructions = instructions
+            status_update.extra_puzzles.extra_puzzles.extend([extra_puzzle])
+        status_update.driving_message.message = self.driving_message
+
     def update_seating(self, seating_update):
         for i in range(0, 10):
             self.seating[i] = Player("", 0)
@@ -146,30 +233,53 @@ class StatusInformation:
                 extra = rebus.extra_text
             rs.give_rebus(rebus.type, txt, extra)
 
-    def update_plate_status(self, plate_answers_up):
+    def update_plate_status(self, plate_answers_up, full=True):
         plate_answers = []
-        for plate in plate_answers_up.plate_answers:
-            s = None
-            if plate.HasField("answer"):
-                s = plate.answer
-            p = Plate(plate.section_number, plate.section_index, s)
-            plate_answers.append(p)
+        if not full:
+            plate_answers = self.patch_plate_or_photo_list(self.plate_answers, plate_answers_up.plate_answers)
+        else:
+            for plate in plate_answers_up.plate_answers:
+                s = None
+                if plate.HasField("answer"):
+                    s = plate.answer
+                p = Plate(plate.section_number, plate.section_index, s)
+                plate_answers.append(p)
         if not self.compare_plate_or_photo_lists(self.plate_answers, plate_answers):
             self.plate_answers_seq += 1
             self.plate_answers = plate_answers
 
-    def update_photo_status(self, photo_answers_up):
+    def update_photo_status(self, photo_answers_up, full=True):
         photo_answers = []
-        for photo in photo_answers_up.photo_answers:
-            s = None
-            if photo.HasField("answer"):
-                s = photo.answer
-            p = Photo(photo.section_number, photo.section_index, s)
-            photo_answers.append(p)
+        if not full:
+            photo_answers = self.patch_plate_or_photo_list(self.photo_answers, photo_answers_up.photo_answers)
+        else:
+            for photo in photo_answers_up.photo_answers:
+                s = None
+                if photo.HasField("answer"):
+                    s = photo.answer
+                p = Photo(photo.section_number, photo.section_index, s)
+                photo_answers.append(p)
         if not self.compare_plate_or_photo_lists(self.photo_answers, photo_answers):
             self.photo_answers_seq += 1
             self.photo_answers = photo_answers
 
+    @staticmethod
+    def patch_plate_or_photo_list(old_list, changes):
+        """ Returns a new list with the changed answers replaced, an answer without a value has been removed """
+        answers = {}
+        for answer in old_list:
+            answers[(answer.section, answer.index)] = answer
+        for change in changes:
+            key = (change.section_number, change.section_index)
+            if change.HasField("answer"):
+                if isinstance(change, clientprotocol_pb2.PhotoAnswer):
+                    answers[key] = Photo(key[0], key[1], change.answer)
+                else:
+                    answers[key] = Plate(key[0], key[1], change.answer)
+            elif key in answers:
+                del answers[key]
+        return list(answers.values())
+
     def update_rebus_status(self, rebus_answers):
         for answer in rebus_answers.rebus_answers:
             section = answer.section_number
@@ -0,0 +1,50 @@
+from rally.protocol import clientprotocol_pb2
+
+
+class StatusSubscriptions:
+    """ The parts of the status that a sub client wants, sent as a mask in SubClientRegister.subscriptions.
+        The main client only passes on the status updates that have a wanted part, trimmed to the wanted parts. """
+
+    POSITION = 1 << 1
+    SEATING = 1 << 2
+    PHOTO_ANSWERS = 1 << 3
+    REBUS_ANSWERS = 1 << 4
+    PHOTO_SHEETS = 1 << 5
+    REBUS_LIST = 1 << 6
+    PLATE_ANSWERS = 1 << 7
+    REBUS_SOLUTIONS = 1 << 8
+    EXTRA_PUZZLES = 1 << 9
+    DRIVING_MESSAGE = 1 << 10
+    ALL = POSITION | SEATING | PHOTO_ANSWERS | REBUS_ANSWERS | PHOTO_SHEETS | REBUS_LIST | PLATE_ANSWERS | \
+          REBUS_SOLUTIONS | EXTRA_PUZZLES | DRIVING_MESSAGE
+
+    # ServerStatusUpdate field -> part. The version fields aren't parts, they are always passed on.
+    FIELDS = {"pos_update": POSITION,
+              "bus_seating": SEATING,
+              "photo_answers": PHOTO_ANSWERS,
+              "rebus_answers": REBUS_ANSWERS,
+              "photo_sheet_allocations": PHOTO_SHEETS,
+              "rebus_list": REBUS_LIST,
+              "plate_answers": PLATE_ANSWERS,
+              "rebus_solutions": REBUS_SOLUTIONS,
+              "extra_puzzles": EXTRA_PUZZLES,
+              "driving_message": DRIVING_MESSAGE}
+
+    @staticmethod
+    def parts(status_update):
+        """ Returns the mask of the parts in status_update """
+        mask = 0
+        for field, _value in status_update.ListFields():
+            mask |= StatusSubscriptions.FIELDS.get(field.name, 0)
+        return mask
+
+    @staticmethod
+    def trim(status_update, subscriptions):
+        """ Returns a copy of status_update with only the parts in subscriptions """
+        trimmed = clientprotocol_pb2.ServerStatusUpdate()
+        trimmed.CopyFrom(status_update)
+        for field, _value in status_update.ListFields():
+            part = StatusSubscriptions.FIELDS.get(field.name, 0)
+            if part != 0 and (part & subscriptions) == 0:
+                trimmed.ClearField(field.name)
+        return trimmed
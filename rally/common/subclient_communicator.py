@@ -1,20 +1,27 @@
+import queue
+import select
 import socket
 import threading
+import time
 
 import rally.common.protobuf_utils as protobuf_utils
+from rally.common.status_bus import StatusBus
 from rally.common.status_information import StatusInformation
+from rally.common.status_subscriptions import StatusSubscriptions
 from rally.protocol import clientprotocol_pb2
 
 
 class SubClientCommunicator(threading.Thread):
-    def __init__(self, program_arguments, receiver=None, raw_receiver=None, pos_receiver=None, status_receiver=None, raw_pos_receiver=None, raw_status_receiver=None):
+    FULL_STATUS_REQUEST_INTERVAL = 2 # seconds
+
+    def __init__(self, program_arguments, receiver=None, raw_receiver=None, pos_receiver=None, status_receiver=None, raw_pos_receiver=None, raw_status_receiver=None, subscriptions=None):
         threading.Thread.__init__(self)
         self.terminate = False
-        self.udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.udp_sock.bind(("127.0.0.1", 0))
-        self.receive_port = self.udp_sock.getsockname()[1]
-        self.udp_sock.settimeout(1)
         self.client_port = program_arguments.port
+        # A stream to the main client, the messages from the other threads are sent while run() waits for messages
+        self.sock = None
+        self.send_lock = threading.Lock()
+        self.connect()
         self.client_index = program_arguments.client_index
         self.receiver = receiver
         self.raw_receiver = raw_receiver
@@ -22,59 +29,204 @@ class SubClientCommunicator(threading.Thread):
         self.status_receiver = status_receiver
         self.raw_pos_receiver = raw_pos_receiver
         self.raw_status_receiver = raw_status_receiver
+        # The StatusSubscriptions parts that are wanted, None for everything
+        self.subscriptions = subscriptions
         self.status_information = None
+        self.latest_full_status_request = None
+        self.status_bus = None
         if receiver is not None or pos_receiver is not None or status_receiver is not None:
             self.status_information = StatusInformation()
 
+    @staticmethod
+    def create(program_arguments, window=None, **receivers):
+        """ Returns a communicator for a window, in the main client's process if it was opened there.
+            The receivers of a window in the main client's process are called from the Tk loop of window. """
+        if getattr(program_arguments, "subprocess_communicator", None) is not None:
+            return LocalSubClientCommunicator(program_arguments, window, **receivers)
+        return SubClientCommunicator(program_arguments, **receivers)
+
+    def connect(self):
+        try:
+            self.sock = socket.create_connection(("127.0.0.1", self.client_port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            print("Subclient: Unable to connect to the rally client at port {0}: {1}".format(self.client_port, e))
+
     def run(self):
+        # The raw receivers need the messages from the server, the others can read the status from the status bus
+        if self.status_information is not None and self.raw_receiver is None and \
+                self.raw_pos_receiver is None and self.raw_status_receiver is None:
+            self.status_bus = StatusBus.attach(self.client_port)
+
         # Register with the client
-        client_to_server = clientprotocol_pb2.ClientToServer()
-        client_to_server.counter = 0
-        client_to_server.sub_client_register.SetInParent()
-        client_to_server.sub_client_register.udp_port = self.receive_port
-        client_to_server.sub_client_register.client_index = self.client_index
-        self.send(client_to_server)
+        register = clientprotocol_pb2.SubClientRegister()
+        register.client_id = self.sock.getsockname()[1] if self.sock is not None else 0
+        register.client_index = self.client_index
+        register.status_bus = self.status_bus is not None
+        if self.subscriptions is not None:
+            register.subscriptions = self.subscriptions
+        self.send_frame(protobuf_utils.pack_frame(register.SerializeToString(), control=True))
+        if self.status_bus is None:
+            self.request_full_status()
 
-        while not self.terminate:
+        received = bytearray()
+        while not self.terminate and self.sock is not None:
             try:
-                data, addr = self.udp_sock.recvfrom(65536)
-                #print("Received data to sub client {1}: {0}".format(data, self.client_index))
-                size = int.from_bytes(data[0:4], "big")
-                if len(data) != size + 4:
-                    print("Invalid subprocess data: {0}".format(data))
+                readable, _, _ = select.select([self.sock], [], [], 1)
+                if len(readable) == 0:
                     continue
-
-                server_to_client = clientprotocol_pb2.ServerToClient()
-                unpack_result = server_to_client.ParseFromString(data[4:])
-                if unpack_result > 0:
-                    if self.raw_receiver is not None:
-                        self.raw_receiver(server_to_client)
-                    if server_to_client.HasField("status_update"):
-                        if self.status_information is not None:
-                            self.status_information.update_status(server_to_client.status_update)
-                        if self.receiver is not None:
-                            self.receiver(self.status_information)
-                        if server_to_client.HasField("status_update"):
-                            if server_to_client.status_update.HasField("pos_update"):
-                                if self.raw_pos_receiver is not None:
-                                    self.raw_pos_receiver(server_to_client.status_update.pos_update)
-                                if self.pos_receiver is not None:
-                                    self.pos_receiver(self.status_information)
-                            if self.raw_status_receiver is not None:
-                                self.raw_status_receiver(server_to_client.status_update)
-                            if self.status_receiver is not None:
-                                self.status_receiver(self.status_information)
-            except socket.timeout:
-                continue
+                data = self.sock.recv(65536)
+                if not data:
+                    print("Subclient: Lost connection to the rally client")
+                    break
+                # All the messages that have arrived are handled together, and the status bus is read once for them
+                received += data
+                doorbell = False
+                for _control, frame in protobuf_utils.take_frames(received):
+                    if len(frame) == 0 and self.status_bus is not None:
+                        doorbell = True
+                    else:
+                        self.handle_message(frame)
+                if doorbell:
+                    self.read_status_bus()
             except (ConnectionResetError, ConnectionAbortedError):
-                print("Subclient: Lost connection to a the rally client")
-                continue
+                print("Subclient: Lost connection to the rally client")
+                break
             except Exception as e:
                 print("Subclient communications error: {0}".format(e))
                 continue
+        if self.status_bus is not None:
+            self.status_bus.close()
+        if self.sock is not None:
+            self.sock.close()
+
+    def handle_message(self, data):
+        """ A ServerToClient, for the sub clients that don't read the status from the status bus """
+        server_to_client = clientprotocol_pb2.ServerToClient()
+        unpack_result = server_to_client.ParseFromString(data)
+        if unpack_result > 0:
+            self.handle_server_to_client(server_to_client)
+
+    def handle_server_to_client(self, server_to_client):
+        if self.raw_receiver is not None:
+            self.raw_receiver(server_to_client)
+        if server_to_client.HasField("status_update"):
+            if self.status_information is not None:
+                self.status_information.update_status(server_to_client.status_update)
+                if self.status_information.needs_full_status:
+                    self.request_full_status()
+            if self.receiver is not None:
+                self.receiver(self.status_information)
+            if server_to_client.HasField("status_update"):
+                if server_to_client.status_update.HasField("pos_update"):
+                    if self.raw_pos_receiver is not None:
+                        self.raw_pos_receiver(server_to_client.status_update.pos_update)
+                    if self.pos_receiver is not None:
+                        self.pos_receiver(self.status_information)
+                if self.raw_status_receiver is not None:
+                    self.raw_status_receiver(server_to_client.status_update)
+                if self.status_receiver is not None:
+                    self.status_receiver(self.status_information)
+
+    def read_status_bus(self):
+        """ The main client has published a new status on the status bus """
+        parse_status = self.subscriptions is None or (self.subscriptions & ~StatusSubscriptions.POSITION) != 0
+        pos_changed, status_changed = self.status_bus.read(self.status_information, parse_status)
+        if not pos_changed and not status_changed:
+            return
+        if self.receiver is not None:
+            self.receiver(self.status_information)
+        if pos_changed and self.pos_receiver is not None:
+            self.pos_receiver(self.status_information)
+        if self.status_receiver is not None:
+            self.status_receiver(self.status_information)
 
     def stop(self):
         self.terminate = True
 
+    def request_full_status(self):
+        """ Asks the server for the complete status, since only the changes are sent after that """
+        if self.status_information is None:
+            return
+        now = time.monotonic()
+        if self.latest_full_status_request is not None and now - self.latest_full_status_request < SubClientCommunicator.FULL_STATUS_REQUEST_INTERVAL:
+            return
+        self.latest_full_status_request = now
+        client_to_server = clientprotocol_pb2.ClientToServer()
+        client_to_server.counter = 0
+        client_to_server.request_full_status.SetInParent()
+        client_to_server.request_full_status.client_index = self.client_index
+        self.send(client_to_server)
+
+    def send(self, client_to_server):
+        """ The main client forwards the message to the server as it is, after adding its own counter """
+        try:
+            packed = protobuf_utils.pack_without_counter(client_to_server)
+        except Exception as e:
+            return False, e
+        return self.send_frame(protobuf_utils.pack_frame(packed))
+
+    def send_frame(self, frame):
+        """ Blocks while the main client is behind with reading """
+        if self.sock is None:
+            return False, None
+        try:
+            with self.send_lock:
+                self.sock.sendall(frame)
+            return True, None
+        except Exception as e:
+            return False, e
+
+
+class LocalSubClientCommunicator(SubClientCommunicator):
+    """ For a window that was opened in the main client's process. The main client puts the status updates in a
+        queue, as they are, and the messages to the server are handed straight to the server connection.
+        No thread is started, the queue is emptied from the window's Tk loop, since the window's widgets belong to
+        the main client's Tk. """
+
+    MAX_QUEUED = 1000
+    POLL_INTERVAL = 20 # milliseconds
+
+    def __init__(self, program_arguments, window, **receivers):
+        self.subprocess_communicator = program_arguments.subprocess_communicator
+        self.messages = queue.Queue(LocalSubClientCommunicator.MAX_QUEUED)
+        self.window = window
+        SubClientCommunicator.__init__(self, program_arguments, **receivers)
+
+    def connect(self):
+        pass
+
+    def start(self):
+        self.subprocess_communicator.add_local_client(self)
+        self.request_full_status()
+        self.window.after(LocalSubClientCommunicator.POLL_INTERVAL, self.poll)
+
+    def stop(self):
+        if not self.terminate:
+            self.subprocess_communicator.remove_local_client(self)
+        self.terminate = True
+
+    def poll(self):
+        """ Handles the queued messages, called from the window's Tk loop """
+        while not self.terminate:
+            try:
+                server_to_client = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self.handle_server_to_client(server_to_client)
+            except Exception as e:
+                print("Subclient communications error: {0}".format(e))
+        if not self.terminate:
+            self.window.after(LocalSubClientCommunicator.POLL_INTERVAL, self.poll)
+
+    def queue_message(self, server_to_client):
+        """ Returns False if the window is too far behind, it then notices the missing versions """
+        try:
+            self.messages.put_nowait(server_to_client)
+            return True
+        except queue.Full:
+            return False
+
     def send(self, client_to_server):
-        return protobuf_utils.protobuf_sendto(self.udp_sock, self.client_port, client_to_server)
+        return self.subprocess_communicator.server_connection.send_message_to_server(client_to_server)
@@ -1,7 +1,13 @@
+import bisect
 import os
 import sys
 import xml.etree.ElementTree as ET
 
+try:
+    import numpy
+except ImportError:
+    numpy = None # The dense frame -> distance tables are only built when numpy is available
+
 
 class Turn:
     TURN_MISSED = -1
@@ -50,10 +56,43 @@ class RebusPlace:
         if "next_section" in rebus_xml.attrib:
             self.next_section = int(rebus_xml.attrib["next_section"])
 
+    def get_first_frame(self):
+        return self.frame_offset - self.find_frame_before
+
+    def get_last_frame(self):
+        return self.frame_offset + self.find_frame_after
+
     def is_close_to(self, frame):
-        first_frame = self.frame_offset - self.find_frame_before
-        last_frame = self.frame_offset + self.find_frame_after
-        return first_frame < frame < last_frame
+        return self.get_first_frame() < frame < self.get_last_frame()
+
+
+class RebusPlaceIndex:
+    """ The rebus places of a section sorted on the first frame where they can be found, for binary searches.
+        The places may overlap, so the highest last frame up to each place is kept to know when to stop searching. """
+
+    def __init__(self, rebus_places):
+        # The position in the configuration decides which place is found when they overlap
+        self.places = sorted(enumerate(rebus_places), key=lambda p: p[1].get_first_frame())
+        self.first_frames = [rebus_place.get_first_frame() for _, rebus_place in self.places]
+        self.max_last_frames = []
+        max_last_frame = None
+        for _, rebus_place in self.places:
+            if max_last_frame is None or rebus_place.get_last_frame() > max_last_frame:
+                max_last_frame = rebus_place.get_last_frame()
+            self.max_last_frames.append(max_last_frame)
+
+    def find(self, frame):
+        best_match = None
+        # Only the places starting before the frame can match
+        i = bisect.bisect_left(self.first_frames, frame) - 1
+        while i >= 0 and self.max_last_frames[i] > frame:
+            order, rebus_place = self.places[i]
+            if rebus_place.is_close_to(frame) and (best_match is None or order < best_match[0]):
+                best_match = (order, rebus_place)
+            i -= 1
+        if best_match is None:
+            return None
+        return best_match[1]
 
 
 class LatLon:
@@ -127,6 +166,9 @@ class Segment:
 
 
 class Segments:
+    # Frames per section in the dense frame -> distance table, longer sections only use the binary search
+    MAX_DENSE_FRAMES = 500000
+
     def __init__(self, segments_xml, default_video):
         self.default_video = default_video
         segments = []
@@ -143,7 +185,35 @@ class Segments:
         prev_segment = None
         for seg in self.segments:
             seg.init_distances(prev_segment)
-            prev_segment = segment
+            prev_segment = seg
+
+        # For binary searches, the segments are sorted on both
+        self.start_frames = [seg.start_frame for seg in self.segments]
+        self.start_distances = [seg.start_distance for seg in self.segments]
+        self.distance_table = self._build_distance_table()
+
+    def _build_distance_table(self):
+        """ The distance for every frame in the video, calculated the same way as Segment.calculate_distance() """
+        if numpy is None:
+            return None
+        last_frame = self.last_segment.end_frame
+        if self.default_video.end_frame is not None:
+            last_frame = min(last_frame, self.default_video.end_frame)
+        frame_count = last_frame - self.first_segment.start_frame + 1
+        if frame_count <= 0 or frame_count > Segments.MAX_DENSE_FRAMES:
+            return None
+        frames = numpy.arange(self.first_segment.start_frame, last_frame + 1)
+        indexes = numpy.searchsorted(numpy.array(self.start_frames), frames, side="right") - 1
+        start_frames = numpy.array(self.start_frames)[indexes]
+        start_distances = numpy.array(self.start_distances)[indexes]
+        distances_per_frame = numpy.array([seg.distance_per_frame for seg in self.segments])[indexes]
+        return start_distances + (frames - start_frames) * distances_per_frame
+
+    def _segment_from_frame(self, frame_number):
+        return self.segments[bisect.bisect_right(self.start_frames, frame_number) - 1]
+
+    def _segment_from_distance(self, distance):
+        return self.segments[bisect.bisect_right(self.start_distances, distance) - 1]
 
     def calculate_default_video_distance(self, frame_number):
         if frame_number <= self.first_segment.start_frame:
@@ -151,33 +221,26 @@ class Segments:
         if frame_number >= self.last_segment.end_frame:
             return self.last_segment.end_distance
 
-        for segment in self.segments:
-            # TODO: Now that segments is sorted, it should be ok to just check against the start frame
-            if segment.start_frame <= frame_number <= segment.end_frame:
-                return segment.calculate_distance(frame_number)
-        return 0.0
+        if self.distance_table is not None and isinstance(frame_number, int):
+            index = frame_number - self.first_segment.start_frame
+            if index < len(self.distance_table):
+                return float(self.distance_table[index])
+        # A frame in the gap after a segment belongs to that segment
+        return self._segment_from_frame(frame_number).calculate_distance(frame_number)
 
     def calculate_default_video_frame_from_distance(self, distance):
         if distance < self.first_segment.start_distance:
             return self.first_segment.start_frame
         if distance > self.last_segment.end_distance:
             return self.last_segment.end_frame
-
-        for segment in self.segments:
-            if segment.start_distance <= distance <= segment.end_distance:
-                return segment.calculate_frame_from_distance(distance)
-        return 0
+        return self._segment_from_distance(distance).calculate_frame_from_distance(distance)
 
     def get_current_video_speed(self, distance):
         if distance < self.first_segment.start_distance:
             return self.first_segment.speed
         if distance > self.last_segment.end_distance:
             return self.last_segment.speed
-
-        for segment in self.segments:
-            if segment.start_distance <= distance <= segment.end_distance:
-                return segment.speed
-        return 0.0
+        return self._segment_from_distance(distance).speed
 
     def calculate_default_video_time_from_distance(self, distance):
         frame = self.calculate_default_video_frame_from_distance(distance)
@@ -241,6 +304,8 @@ class Section:
         for rebus_places in section.findall("rebus_places"):
             for rebus_place_xml in rebus_places.findall("rebus_place"):
                 self.rebus_places.append(RebusPlace(rebus_place_xml))
+        self.rebus_place_index = RebusPlaceIndex(self.rebus_places)
+        self.rebus_place_ids = frozenset([rebus_place.id for rebus_place in self.rebus_places])
 
         for videos in section.findall("videos"):
             for video_xml in videos.findall("video"):
@@ -253,11 +318,27 @@ class Section:
 
         self.default_end_distance = self.calculate_default_video_distance_from_frame(self.default_video.end_frame)
 
-    def get_correct_turn(self):
+        # The turns never change, so they are looked up once instead of for every position update
+        self.correct_turn = self._find_correct_turn()
+        self.correct_turn_distance = None
+        if self.correct_turn is not None:
+            self.correct_turn_distance = self.calculate_default_video_distance_from_frame(self.correct_turn.frame_offset)
+        self.last_turn = self._find_last_turn()
+        self.last_turn_distance = None
+        if self.last_turn is not None:
+            self.last_turn_distance = self.calculate_default_video_distance_from_frame(self.last_turn.frame_offset)
+
+    def _find_correct_turn(self):
         for turn in self.turns:
             if turn.next_section is not None and turn.next_section > 0 and turn.direction != Turn.TURN_WRONG and turn.direction != Turn.TURN_MISSED:
                 return turn
 
+    def get_correct_turn(self):
+        return self.correct_turn
+
+    def get_correct_turn_distance(self):
+        return self.correct_turn_distance
+
     def get_closest_turn(self, frame):
         best_match = None
         best_diff = sys.maxsize
@@ -268,7 +349,7 @@ class Section:
                 best_match = turn
         return best_match
 
-    def get_last_turn(self):
+    def _find_last_turn(self):
         highest_frame = 0
         latest_turn = None
         for turn in self.turns:
@@ -277,14 +358,13 @@ class Section:
                 latest_turn = turn
         return latest_turn
 
+    def get_last_turn(self):
+        return self.last_turn
+
     def missed_all_turns(self, distance):
         """ Returns True if the driver has passed the last turn and it is a "MISSED" turn. """
-        last_turn = self.get_last_turn()
-        if last_turn is not None:
-            if last_turn.direction == Turn.TURN_MISSED:
-                last_turn_distance = self.calculate_default_video_distance_from_frame(last_turn.frame_offset)
-                if distance >= last_turn_distance:
-                    return True
+        if self.last_turn is not None and self.last_turn.direction == Turn.TURN_MISSED:
+            return distance >= self.last_turn_distance
         return False
 
     def get_start_distance(self):
@@ -342,11 +422,7 @@ class Section:
     def find_nearby_rebus_place(self, distance):
         frame = self.calculate_default_video_frame_from_distance(distance)
         # print("Looking for rebus at frame {0} / distance {1}".format(frame, distance))
-        for rebus_place in self.rebus_places:
-            # print("  {0}".format(rebus.frame_offset))
-            if rebus_place.is_close_to(frame):
-                return rebus_place
-        return None
+        return self.rebus_place_index.find(frame)
 
     def build_client_config_xml(self, rally_sections):
         xml_section = ET.SubElement(rally_sections, "section",
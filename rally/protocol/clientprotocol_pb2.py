@@ -18,7 +18,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   package='client',
   syntax='proto2',
   serialized_options=None,
-  serialized_pb=b'\n\x14\x63lientprotocol.proto\x12\x06\x63lient\"\xef\x02\n\x14ServerPositionUpdate\x12\x0f\n\x07stopped\x18\x01 \x02(\x08\x12\r\n\x05speed\x18\x02 \x02(\x02\x12\x17\n\x0f\x63urrent_section\x18\x03 \x02(\x05\x12\x10\n\x08\x64istance\x18\x04 \x02(\x01\x12I\n\x0brally_stage\x18\x05 \x01(\x0e\x32\'.client.ServerPositionUpdate.RallyStage:\x0bNOT_STARTED\x12\x19\n\x11looking_for_rebus\x18\x06 \x01(\x08\x12\x15\n\rrally_started\x18\x07 \x01(\x08\x12\x14\n\x0c\x66orce_update\x18\x08 \x01(\x08\x12\x19\n\x11\x61\x66ternoon_started\x18\t \x01(\x08\"^\n\nRallyStage\x12\x0f\n\x0bNOT_STARTED\x10\x00\x12\x0b\n\x07MORNING\x10\x01\x12\x0c\n\x08\x41T_LUNCH\x10\x02\x12\r\n\tAFTERNOON\x10\x03\x12\n\n\x06\x41T_END\x10\x04\x12\t\n\x05\x45NDED\x10\x05\"O\n\x11\x42usSeatAllocation\x12\x12\n\nseat_index\x18\x01 \x02(\x05\x12\x11\n\tplayer_id\x18\x02 \x01(\x05\x12\x13\n\x0bplayer_name\x18\x03 \x01(\t\"E\n\nBusSeating\x12\x37\n\x14\x62us_seat_allocations\x18\x01 \x03(\x0b\x32\x19.client.BusSeatAllocation\"L\n\x0bPhotoAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x15\n\rsection_index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x01(\x05\":\n\x0cPhotoAnswers\x12*\n\rphoto_answers\x18\x01 \x03(\x0b\x32\x13.client.PhotoAnswer\"L\n\x0bPlateAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x15\n\rsection_index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x01(\t\":\n\x0cPlateAnswers\x12*\n\rplate_answers\x18\x01 \x03(\x0b\x32\x13.client.PlateAnswer\"5\n\x0bRebusAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x01(\t\":\n\x0cRebusAnswers\x12*\n\rrebus_answers\x18\x01 \x03(\x0b\x32\x13.client.RebusAnswer\"]\n\x14PhotoSheetAllocation\x12\x14\n\x0csheet_number\x18\x01 \x02(\x05\x12\x18\n\x10\x61llocation_place\x18\x02 \x02(\x05\x12\x15\n\rup_for_switch\x18\x03 \x01(\x08\"U\n\x15PhotoSheetAllocations\x12<\n\x16photo_sheet_allocation\x18\x01 \x03(\x0b\x32\x1c.client.PhotoSheetAllocation\"\xa0\x01\n\x05Rebus\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12-\n\x04type\x18\x02 \x02(\x0e\x32\x17.client.Rebus.RebusType:\x06NORMAL\x12\x12\n\nrebus_text\x18\x03 \x01(\t\x12\x12\n\nextra_text\x18\x04 \x01(\t\"/\n\tRebusType\x12\n\n\x06NORMAL\x10\x00\x12\x08\n\x04HELP\x10\x01\x12\x0c\n\x08SOLUTION\x10\x02\"+\n\tRebusList\x12\x1e\n\x07rebuses\x18\x01 \x03(\x0b\x32\r.client.Rebus\"\xae\x01\n\rRebusSolution\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x10\n\x08solution\x18\x02 \x02(\t\x12\x0c\n\x04\x65\x61st\x18\x03 \x02(\x05\x12\r\n\x05north\x18\x04 \x02(\x05\x12\x1a\n\x12target_description\x18\x05 \x02(\t\x12\x13\n\x0btarget_east\x18\x06 \x02(\x05\x12\x14\n\x0ctarget_north\x18\x07 \x02(\x05\x12\x16\n\x0etarget_picture\x18\x08 \x02(\t\"P\n\x0eRebusSolutions\x12\x0e\n\x06locked\x18\x01 \x01(\x08\x12.\n\x0frebus_solutions\x18\x02 \x03(\x0b\x32\x15.client.RebusSolution\"F\n\x0b\x45xtraPuzzle\x12\x11\n\tpuzzle_id\x18\x01 \x01(\t\x12\x0e\n\x06opened\x18\x02 \x01(\x08\x12\x14\n\x0cinstructions\x18\x03 \x01(\t\":\n\x0c\x45xtraPuzzles\x12*\n\rextra_puzzles\x18\x01 \x03(\x0b\x32\x13.client.ExtraPuzzle\"!\n\x0e\x44rivingMessage\x12\x0f\n\x07message\x18\x01 \x01(\t\"\xec\x03\n\x12ServerStatusUpdate\x12\x30\n\npos_update\x18\x01 \x01(\x0b\x32\x1c.client.ServerPositionUpdate\x12\'\n\x0b\x62us_seating\x18\x02 \x01(\x0b\x32\x12.client.BusSeating\x12+\n\rphoto_answers\x18\x03 \x01(\x0b\x32\x14.client.PhotoAnswers\x12+\n\rrebus_answers\x18\x04 \x01(\x0b\x32\x14.client.RebusAnswers\x12>\n\x17photo_sheet_allocations\x18\x05 \x01(\x0b\x32\x1d.client.PhotoSheetAllocations\x12%\n\nrebus_list\x18\x06 \x01(\x0b\x32\x11.client.RebusList\x12+\n\rplate_answers\x18\x07 \x01(\x0b\x32\x14.client.PlateAnswers\x12/\n\x0frebus_solutions\x18\x08 \x01(\x0b\x32\x16.client.RebusSolutions\x12+\n\rextra_puzzles\x18\t \x01(\x0b\x32\x14.client.ExtraPuzzles\x12/\n\x0f\x64riving_message\x18\n \x01(\x0b\x32\x16.client.DrivingMessage\"(\n\x15ServerRequestResponse\x12\x0f\n\x07success\x18\x01 \x02(\x08\"G\n\x10\x42roadcastMessage\x12\x0f\n\x07message\x18\x01 \x02(\t\x12\x11\n\tdate_time\x18\x02 \x02(\t\x12\x0f\n\x07urgency\x18\x03 \x01(\x05\"\xd4\x01\n\x0eServerToClient\x12\x0f\n\x07\x63ounter\x18\x01 \x02(\x03\x12\x33\n\rstatus_update\x18\x03 \x01(\x0b\x32\x1a.client.ServerStatusUpdateH\x00\x12\x39\n\x10request_response\x18\x04 \x01(\x0b\x32\x1d.client.ServerRequestResponseH\x00\x12\x35\n\x11\x62roadcast_message\x18\x05 \x01(\x0b\x32\x18.client.BroadcastMessageH\x00\x42\n\n\x08messages\"\xcb\x01\n\x14\x43lientPositionUpdate\x12\r\n\x05speed\x18\x01 \x02(\x02\x12\x16\n\x0e\x64\x65lta_distance\x18\x02 \x02(\x01\x12\x17\n\x0f\x63urrent_section\x18\x03 \x02(\x05\x12\x43\n\tindicator\x18\x04 \x01(\x0e\x32*.client.ClientPositionUpdate.DirectionType:\x04NONE\".\n\rDirectionType\x12\x08\n\x04NONE\x10\x00\x12\x08\n\x04LEFT\x10\x01\x12\t\n\x05RIGHT\x10\x02\"+\n\x13ReachedEndOfSection\x12\x14\n\x0csection_name\x18\x01 \x02(\t\"P\n\tMakeATurn\x12.\n\x08position\x18\x01 \x02(\x0b\x32\x1c.client.ClientPositionUpdate\x12\x13\n\x0bnew_section\x18\x02 \x02(\x05\"E\n\x17SetPhotoSheetSwitchable\x12\x16\n\x0esheet_number_1\x18\x01 \x02(\x05\x12\x12\n\nswitchable\x18\x02 \x02(\x08\"B\n\x10SwitchPhotoSheet\x12\x16\n\x0esheet_number_1\x18\x01 \x02(\x05\x12\x16\n\x0esheet_number_2\x18\x02 \x02(\x05\"1\n\nSelectSeat\x12\x0f\n\x07user_id\x18\x01 \x02(\x05\x12\x12\n\nseat_index\x18\x02 \x02(\x05\";\n\x11SubClientRegister\x12\x14\n\x0c\x63lient_index\x18\x01 \x02(\x05\x12\x10\n\x08udp_port\x18\x02 \x02(\x05\"_\n\x11OpenRebusSolution\x12\x0f\n\x07user_id\x18\x01 \x02(\x05\x12\x0f\n\x07section\x18\x02 \x02(\x05\x12\x11\n\topen_help\x18\x03 \x01(\x08\x12\x15\n\ropen_solution\x18\x04 \x01(\x08\"@\n\x0eSetPhotoAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\r\n\x05index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x02(\x05\"@\n\x0eSetPlateAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\r\n\x05index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x02(\t\"1\n\x0eSetRebusAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x02(\t\"\x1f\n\x0eSearchForRebus\x12\r\n\x05\x64ummy\x18\x01 \x02(\x05\"Y\n\x11TestRebusSolution\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x02(\t\x12\x10\n\x08map_east\x18\x03 \x02(\x05\x12\x11\n\tmap_north\x18\x04 \x02(\x05\"$\n\x0fOpenExtraPuzzle\x12\x11\n\tpuzzle_id\x18\x01 \x02(\t\"\xa0\x06\n\x0e\x43lientToServer\x12\x0f\n\x07\x63ounter\x18\x01 \x02(\x03\x12\x32\n\npos_update\x18\x02 \x01(\x0b\x32\x1c.client.ClientPositionUpdateH\x00\x12\x35\n\x0e\x65nd_of_section\x18\x03 \x01(\x0b\x32\x1b.client.ReachedEndOfSectionH\x00\x12(\n\x0bmake_a_turn\x18\x04 \x01(\x0b\x32\x11.client.MakeATurnH\x00\x12\x45\n\x1aset_photo_sheet_switchable\x18\x05 \x01(\x0b\x32\x1f.client.SetPhotoSheetSwitchableH\x00\x12\x36\n\x12switch_photo_sheet\x18\x06 \x01(\x0b\x32\x18.client.SwitchPhotoSheetH\x00\x12)\n\x0bselect_seat\x18\x07 \x01(\x0b\x32\x12.client.SelectSeatH\x00\x12\x38\n\x13sub_client_register\x18\x08 \x01(\x0b\x32\x19.client.SubClientRegisterH\x00\x12\x38\n\x13open_rebus_solution\x18\t \x01(\x0b\x32\x19.client.OpenRebusSolutionH\x00\x12\x32\n\x10set_photo_answer\x18\n \x01(\x0b\x32\x16.client.SetPhotoAnswerH\x00\x12\x32\n\x10set_plate_answer\x18\x0b \x01(\x0b\x32\x16.client.SetPlateAnswerH\x00\x12\x32\n\x10set_rebus_answer\x18\x0c \x01(\x0b\x32\x16.client.SetRebusAnswerH\x00\x12\x32\n\x10search_for_rebus\x18\r \x01(\x0b\x32\x16.client.SearchForRebusH\x00\x12\x38\n\x13test_rebus_solution\x18\x0e \x01(\x0b\x32\x19.client.TestRebusSolutionH\x00\x12\x34\n\x11open_extra_puzzle\x18\x0f \x01(\x0b\x32\x17.client.OpenExtraPuzzleH\x00\x42\n\n\x08messages'
+  serialized_pb=b'\n\x14\x63lientprotocol.proto\x12\x06\x63lient\"\xef\x02\n\x14ServerPositionUpdate\x12\x0f\n\x07stopped\x18\x01 \x02(\x08\x12\r\n\x05speed\x18\x02 \x02(\x02\x12\x17\n\x0f\x63urrent_section\x18\x03 \x02(\x05\x12\x10\n\x08\x64istance\x18\x04 \x02(\x01\x12I\n\x0brally_stage\x18\x05 \x01(\x0e\x32\'.client.ServerPositionUpdate.RallyStage:\x0bNOT_STARTED\x12\x19\n\x11looking_for_rebus\x18\x06 \x01(\x08\x12\x15\n\rrally_started\x18\x07 \x01(\x08\x12\x14\n\x0c\x66orce_update\x18\x08 \x01(\x08\x12\x19\n\x11\x61\x66ternoon_started\x18\t \x01(\x08\"^\n\nRallyStage\x12\x0f\n\x0bNOT_STARTED\x10\x00\x12\x0b\n\x07MORNING\x10\x01\x12\x0c\n\x08\x41T_LUNCH\x10\x02\x12\r\n\tAFTERNOON\x10\x03\x12\n\n\x06\x41T_END\x10\x04\x12\t\n\x05\x45NDED\x10\x05\"O\n\x11\x42usSeatAllocation\x12\x12\n\nseat_index\x18\x01 \x02(\x05\x12\x11\n\tplayer_id\x18\x02 \x01(\x05\x12\x13\n\x0bplayer_name\x18\x03 \x01(\t\"E\n\nBusSeating\x12\x37\n\x14\x62us_seat_allocations\x18\x01 \x03(\x0b\x32\x19.client.BusSeatAllocation\"L\n\x0bPhotoAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x15\n\rsection_index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x01(\x05\":\n\x0cPhotoAnswers\x12*\n\rphoto_answers\x18\x01 \x03(\x0b\x32\x13.client.PhotoAnswer\"L\n\x0bPlateAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x15\n\rsection_index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x01(\t\":\n\x0cPlateAnswers\x12*\n\rplate_answers\x18\x01 \x03(\x0b\x32\x13.client.PlateAnswer\"5\n\x0bRebusAnswer\x12\x16\n\x0esection_number\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x01(\t\":\n\x0cRebusAnswers\x12*\n\rrebus_answers\x18\x01 \x03(\x0b\x32\x13.client.RebusAnswer\"]\n\x14PhotoSheetAllocation\x12\x14\n\x0csheet_number\x18\x01 \x02(\x05\x12\x18\n\x10\x61llocation_place\x18\x02 \x02(\x05\x12\x15\n\rup_for_switch\x18\x03 \x01(\x08\"U\n\x15PhotoSheetAllocations\x12<\n\x16photo_sheet_allocation\x18\x01 \x03(\x0b\x32\x1c.client.PhotoSheetAllocation\"\xa0\x01\n\x05Rebus\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12-\n\x04type\x18\x02 \x02(\x0e\x32\x17.client.Rebus.RebusType:\x06NORMAL\x12\x12\n\nrebus_text\x18\x03 \x01(\t\x12\x12\n\nextra_text\x18\x04 \x01(\t\"/\n\tRebusType\x12\n\n\x06NORMAL\x10\x00\x12\x08\n\x04HELP\x10\x01\x12\x0c\n\x08SOLUTION\x10\x02\"+\n\tRebusList\x12\x1e\n\x07rebuses\x18\x01 \x03(\x0b\x32\r.client.Rebus\"\xae\x01\n\rRebusSolution\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x10\n\x08solution\x18\x02 \x02(\t\x12\x0c\n\x04\x65\x61st\x18\x03 \x02(\x05\x12\r\n\x05north\x18\x04 \x02(\x05\x12\x1a\n\x12target_description\x18\x05 \x02(\t\x12\x13\n\x0btarget_east\x18\x06 \x02(\x05\x12\x14\n\x0ctarget_north\x18\x07 \x02(\x05\x12\x16\n\x0etarget_picture\x18\x08 \x02(\t\"P\n\x0eRebusSolutions\x12\x0e\n\x06locked\x18\x01 \x01(\x08\x12.\n\x0frebus_solutions\x18\x02 \x03(\x0b\x32\x15.client.RebusSolution\"F\n\x0b\x45xtraPuzzle\x12\x11\n\tpuzzle_id\x18\x01 \x01(\t\x12\x0e\n\x06opened\x18\x02 \x01(\x08\x12\x14\n\x0cinstructions\x18\x03 \x01(\t\":\n\x0c\x45xtraPuzzles\x12*\n\rextra_puzzles\x18\x01 \x03(\x0b\x32\x13.client.ExtraPuzzle\"!\n\x0e\x44rivingMessage\x12\x0f\n\x07message\x18\x01 \x01(\t\"\xa7\x04\n\x12ServerStatusUpdate\x12\x30\n\npos_update\x18\x01 \x01(\x0b\x32\x1c.client.ServerPositionUpdate\x12\'\n\x0b\x62us_seating\x18\x02 \x01(\x0b\x32\x12.client.BusSeating\x12+\n\rphoto_answers\x18\x03 \x01(\x0b\x32\x14.client.PhotoAnswers\x12+\n\rrebus_answers\x18\x04 \x01(\x0b\x32\x14.client.RebusAnswers\x12>\n\x17photo_sheet_allocations\x18\x05 \x01(\x0b\x32\x1d.client.PhotoSheetAllocations\x12%\n\nrebus_list\x18\x06 \x01(\x0b\x32\x11.client.RebusList\x12+\n\rplate_answers\x18\x07 \x01(\x0b\x32\x14.client.PlateAnswers\x12/\n\x0frebus_solutions\x18\x08 \x01(\x0b\x32\x16.client.RebusSolutions\x12+\n\rextra_puzzles\x18\t \x01(\x0b\x32\x14.client.ExtraPuzzles\x12/\n\x0f\x64riving_message\x18\n \x01(\x0b\x32\x16.client.DrivingMessage\x12\x0f\n\x07version\x18\x0b \x01(\x03\x12\x14\n\x0c\x62\x61se_version\x18\x0c \x01(\x03\x12\x12\n\nfull_state\x18\r \x01(\x08\"(\n\x15ServerRequestResponse\x12\x0f\n\x07success\x18\x01 \x02(\x08\"G\n\x10\x42roadcastMessage\x12\x0f\n\x07message\x18\x01 \x02(\t\x12\x11\n\tdate_time\x18\x02 \x02(\t\x12\x0f\n\x07urgency\x18\x03 \x01(\x05\"\xd4\x01\n\x0eServerToClient\x12\x0f\n\x07\x63ounter\x18\x01 \x02(\x03\x12\x33\n\rstatus_update\x18\x03 \x01(\x0b\x32\x1a.client.ServerStatusUpdateH\x00\x12\x39\n\x10request_response\x18\x04 \x01(\x0b\x32\x1d.client.ServerRequestResponseH\x00\x12\x35\n\x11\x62roadcast_message\x18\x05 \x01(\x0b\x32\x18.client.BroadcastMessageH\x00\x42\n\n\x08messages\"\xcb\x01\n\x14\x43lientPositionUpdate\x12\r\n\x05speed\x18\x01 \x02(\x02\x12\x16\n\x0e\x64\x65lta_distance\x18\x02 \x02(\x01\x12\x17\n\x0f\x63urrent_section\x18\x03 \x02(\x05\x12\x43\n\tindicator\x18\x04 \x01(\x0e\x32*.client.ClientPositionUpdate.DirectionType:\x04NONE\".\n\rDirectionType\x12\x08\n\x04NONE\x10\x00\x12\x08\n\x04LEFT\x10\x01\x12\t\n\x05RIGHT\x10\x02\"+\n\x13ReachedEndOfSection\x12\x14\n\x0csection_name\x18\x01 \x02(\t\"P\n\tMakeATurn\x12.\n\x08position\x18\x01 \x02(\x0b\x32\x1c.client.ClientPositionUpdate\x12\x13\n\x0bnew_section\x18\x02 \x02(\x05\"E\n\x17SetPhotoSheetSwitchable\x12\x16\n\x0esheet_number_1\x18\x01 \x02(\x05\x12\x12\n\nswitchable\x18\x02 \x02(\x08\"B\n\x10SwitchPhotoSheet\x12\x16\n\x0esheet_number_1\x18\x01 \x02(\x05\x12\x16\n\x0esheet_number_2\x18\x02 \x02(\x05\"1\n\nSelectSeat\x12\x0f\n\x07user_id\x18\x01 \x02(\x05\x12\x12\n\nseat_index\x18\x02 \x02(\x05\"y\n\x11SubClientRegister\x12\x14\n\x0c\x63lient_index\x18\x01 \x02(\x05\x12\x10\n\x08udp_port\x18\x02 \x01(\x05\x12\x12\n\nstatus_bus\x18\x03 \x01(\x08\x12\x15\n\rsubscriptions\x18\x04 \x01(\x03\x12\x11\n\tclient_id\x18\x05 \x01(\x05\"_\n\x11OpenRebusSolution\x12\x0f\n\x07user_id\x18\x01 \x02(\x05\x12\x0f\n\x07section\x18\x02 \x02(\x05\x12\x11\n\topen_help\x18\x03 \x01(\x08\x12\x15\n\ropen_solution\x18\x04 \x01(\x08\"@\n\x0eSetPhotoAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\r\n\x05index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x02(\x05\"@\n\x0eSetPlateAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\r\n\x05index\x18\x02 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x03 \x02(\t\"1\n\x0eSetRebusAnswer\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x02(\t\"\x1f\n\x0eSearchForRebus\x12\r\n\x05\x64ummy\x18\x01 \x02(\x05\"Y\n\x11TestRebusSolution\x12\x0f\n\x07section\x18\x01 \x02(\x05\x12\x0e\n\x06\x61nswer\x18\x02 \x02(\t\x12\x10\n\x08map_east\x18\x03 \x02(\x05\x12\x11\n\tmap_north\x18\x04 \x02(\x05\"$\n\x0fOpenExtraPuzzle\x12\x11\n\tpuzzle_id\x18\x01 \x02(\t\")\n\x11RequestFullStatus\x12\x14\n\x0c\x63lient_index\x18\x01 \x01(\x05\"\xda\x06\n\x0e\x43lientToServer\x12\x0f\n\x07\x63ounter\x18\x01 \x02(\x03\x12\x32\n\npos_update\x18\x02 \x01(\x0b\x32\x1c.client.ClientPositionUpdateH\x00\x12\x35\n\x0e\x65nd_of_section\x18\x03 \x01(\x0b\x32\x1b.client.ReachedEndOfSectionH\x00\x12(\n\x0bmake_a_turn\x18\x04 \x01(\x0b\x32\x11.client.MakeATurnH\x00\x12\x45\n\x1aset_photo_sheet_switchable\x18\x05 \x01(\x0b\x32\x1f.client.SetPhotoSheetSwitchableH\x00\x12\x36\n\x12switch_photo_sheet\x18\x06 \x01(\x0b\x32\x18.client.SwitchPhotoSheetH\x00\x12)\n\x0bselect_seat\x18\x07 \x01(\x0b\x32\x12.client.SelectSeatH\x00\x12\x38\n\x13sub_client_register\x18\x08 \x01(\x0b\x32\x19.client.SubClientRegisterH\x00\x12\x38\n\x13open_rebus_solution\x18\t \x01(\x0b\x32\x19.client.OpenRebusSolutionH\x00\x12\x32\n\x10set_photo_answer\x18\n \x01(\x0b\x32\x16.client.SetPhotoAnswerH\x00\x12\x32\n\x10set_plate_answer\x18\x0b \x01(\x0b\x32\x16.client.SetPlateAnswerH\x00\x12\x32\n\x10set_rebus_answer\x18\x0c \x01(\x0b\x32\x16.client.SetRebusAnswerH\x00\x12\x32\n\x10search_for_rebus\x18\r \x01(\x0b\x32\x16.client.SearchForRebusH\x00\x12\x38\n\x13test_rebus_solution\x18\x0e \x01(\x0b\x32\x19.client.TestRebusSolutionH\x00\x12\x34\n\x11open_extra_puzzle\x18\x0f \x01(\x0b\x32\x17.client.OpenExtraPuzzleH\x00\x12\x38\n\x13request_full_status\x18\x10 \x01(\x0b\x32\x19.client.RequestFullStatusH\x00\x42\n\n\x08messages'
 )
 
 
@@ -108,8 +108,8 @@ _CLIENTPOSITIONUPDATE_DIRECTIONTYPE = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   serialized_options=None,
-  serialized_start=2744,
-  serialized_end=2790,
+  serialized_start=2803,
+  serialized_end=2849,
 )
 _sym_db.RegisterEnumDescriptor(_CLIENTPOSITIONUPDATE_DIRECTIONTYPE)
 
@@ -961,6 +961,27 @@ _SERVERSTATUSUPDATE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='client.ServerStatusUpdate.version', index=10,
+      number=11, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='base_version', full_name='client.ServerStatusUpdate.base_version', index=11,
+      number=12, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='full_state', full_name='client.ServerStatusUpdate.full_state', index=12,
+      number=13, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -974,7 +995,7 @@ _SERVERSTATUSUPDATE = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=1762,
-  serialized_end=2254,
+  serialized_end=2313,
 )
 
 
@@ -1004,8 +1025,8 @@ _SERVERREQUESTRESPONSE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2256,
-  serialized_end=2296,
+  serialized_start=2315,
+  serialized_end=2355,
 )
 
 
@@ -1049,8 +1070,8 @@ _BROADCASTMESSAGE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2298,
-  serialized_end=2369,
+  serialized_start=2357,
+  serialized_end=2428,
 )
 
 
@@ -1104,8 +1125,8 @@ _SERVERTOCLIENT = _descriptor.Descriptor(
       name='messages', full_name='client.ServerToClient.messages',
       index=0, containing_type=None, fields=[]),
   ],
-  serialized_start=2372,
-  serialized_end=2584,
+  serialized_start=2431,
+  serialized_end=2643,
 )
 
 
@@ -1157,8 +1178,8 @@ _CLIENTPOSITIONUPDATE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2587,
-  serialized_end=2790,
+  serialized_start=2646,
+  serialized_end=2849,
 )
 
 
@@ -1188,8 +1209,8 @@ _REACHEDENDOFSECTION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2792,
-  serialized_end=2835,
+  serialized_start=2851,
+  serialized_end=2894,
 )
 
 
@@ -1226,8 +1247,8 @@ _MAKEATURN = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2837,
-  serialized_end=2917,
+  serialized_start=2896,
+  serialized_end=2976,
 )
 
 
@@ -1264,8 +1285,8 @@ _SETPHOTOSHEETSWITCHABLE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2919,
-  serialized_end=2988,
+  serialized_start=2978,
+  serialized_end=3047,
 )
 
 
@@ -1302,8 +1323,8 @@ _SWITCHPHOTOSHEET = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2990,
-  serialized_end=3056,
+  serialized_start=3049,
+  serialized_end=3115,
 )
 
 
@@ -1340,8 +1361,8 @@ _SELECTSEAT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3058,
-  serialized_end=3107,
+  serialized_start=3117,
+  serialized_end=3166,
 )
 
 
@@ -1361,7 +1382,28 @@ _SUBCLIENTREGISTER = _descriptor.Descriptor(
       serialized_options=None, file=DESCRIPTOR),
     _descriptor.FieldDescriptor(
       name='udp_port', full_name='client.SubClientRegister.udp_port', index=1,
-      number=2, type=5, cpp_type=1, label=2,
+      number=2, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='status_bus', full_name='client.SubClientRegister.status_bus', index=2,
+      number=3, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='subscriptions', full_name='client.SubClientRegister.subscriptions', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='client.SubClientRegister.client_id', index=4,
+      number=5, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -1378,8 +1420,8 @@ _SUBCLIENTREGISTER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3109,
-  serialized_end=3168,
+  serialized_start=3168,
+  serialized_end=3289,
 )
 
 
@@ -1430,8 +1472,8 @@ _OPENREBUSSOLUTION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3170,
-  serialized_end=3265,
+  serialized_start=3291,
+  serialized_end=3386,
 )
 
 
@@ -1475,8 +1517,8 @@ _SETPHOTOANSWER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3267,
-  serialized_end=3331,
+  serialized_start=3388,
+  serialized_end=3452,
 )
 
 
@@ -1520,8 +1562,8 @@ _SETPLATEANSWER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3333,
-  serialized_end=3397,
+  serialized_start=3454,
+  serialized_end=3518,
 )
 
 
@@ -1558,8 +1600,8 @@ _SETREBUSANSWER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3399,
-  serialized_end=3448,
+  serialized_start=3520,
+  serialized_end=3569,
 )
 
 
@@ -1589,8 +1631,8 @@ _SEARCHFORREBUS = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3450,
-  serialized_end=3481,
+  serialized_start=3571,
+  serialized_end=3602,
 )
 
 
@@ -1641,8 +1683,8 @@ _TESTREBUSSOLUTION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3483,
-  serialized_end=3572,
+  serialized_start=3604,
+  serialized_end=3693,
 )
 
 
@@ -1672,8 +1714,39 @@ _OPENEXTRAPUZZLE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=3574,
-  serialized_end=3610,
+  serialized_start=3695,
+  serialized_end=3731,
+)
+
+
+_REQUESTFULLSTATUS = _descriptor.Descriptor(
+  name='RequestFullStatus',
+  full_name='client.RequestFullStatus',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='client_index', full_name='client.RequestFullStatus.client_index', index=0,
+      number=1, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=3733,
+  serialized_end=3774,
 )
 
 
@@ -1789,6 +1862,13 @@ _CLIENTTOSERVER = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='request_full_status', full_name='client.ClientToServer.request_full_status', index=15,
+      number=16, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -1804,8 +1884,8 @@ _CLIENTTOSERVER = _descriptor.Descriptor(
       name='messages', full_name='client.ClientToServer.messages',
       index=0, containing_type=None, fields=[]),
   ],
-  serialized_start=3613,
-  serialized_end=4413,
+  serialized_start=3777,
+  serialized_end=4635,
 )
 
 _SERVERPOSITIONUPDATE.fields_by_name['rally_stage'].enum_type = _SERVERPOSITIONUPDATE_RALLYSTAGE
@@ -1859,6 +1939,7 @@ _CLIENTTOSERVER.fields_by_name['set_rebus_answer'].message_type = _SETREBUSANSWE
 _CLIENTTOSERVER.fields_by_name['search_for_rebus'].message_type = _SEARCHFORREBUS
 _CLIENTTOSERVER.fields_by_name['test_rebus_solution'].message_type = _TESTREBUSSOLUTION
 _CLIENTTOSERVER.fields_by_name['open_extra_puzzle'].message_type = _OPENEXTRAPUZZLE
+_CLIENTTOSERVER.fields_by_name['request_full_status'].message_type = _REQUESTFULLSTATUS
 _CLIENTTOSERVER.oneofs_by_name['messages'].fields.append(
   _CLIENTTOSERVER.fields_by_name['pos_update'])
 _CLIENTTOSERVER.fields_by_name['pos_update'].containing_oneof = _CLIENTTOSERVER.oneofs_by_name['messages']
@@ -1901,6 +1982,9 @@ _CLIENTTOSERVER.fields_by_name['test_rebus_solution'].containing_oneof = _CLIENT
 _CLIENTTOSERVER.oneofs_by_name['messages'].fields.append(
   _CLIENTTOSERVER.fields_by_name['open_extra_puzzle'])
 _CLIENTTOSERVER.fields_by_name['open_extra_puzzle'].containing_oneof = _CLIENTTOSERVER.oneofs_by_name['messages']
+_CLIENTTOSERVER.oneofs_by_name['messages'].fields.append(
+  _CLIENTTOSERVER.fields_by_name['request_full_status'])
+_CLIENTTOSERVER.fields_by_name['request_full_status'].containing_oneof = _CLIENTTOSERVER.oneofs_by_name['messages']
 DESCRIPTOR.message_types_by_name['ServerPositionUpdate'] = _SERVERPOSITIONUPDATE
 DESCRIPTOR.message_types_by_name['BusSeatAllocation'] = _BUSSEATALLOCATION
 DESCRIPTOR.message_types_by_name['BusSeating'] = _BUSSEATING
@@ -1937,6 +2021,7 @@ DESCRIPTOR.message_types_by_name['SetRebusAnswer'] = _SETREBUSANSWER
 DESCRIPTOR.message_types_by_name['SearchForRebus'] = _SEARCHFORREBUS
 DESCRIPTOR.message_types_by_name['TestRebusSolution'] = _TESTREBUSSOLUTION
 DESCRIPTOR.message_types_by_name['OpenExtraPuzzle'] = _OPENEXTRAPUZZLE
+DESCRIPTOR.message_types_by_name['RequestFullStatus'] = _REQUESTFULLSTATUS
 DESCRIPTOR.message_types_by_name['ClientToServer'] = _CLIENTTOSERVER
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -2192,6 +2277,13 @@ OpenExtraPuzzle = _reflection.GeneratedProtocolMessageType('OpenExtraPuzzle', (_
   })
 _sym_db.RegisterMessage(OpenExtraPuzzle)
 
+RequestFullStatus = _reflection.GeneratedProtocolMessageType('RequestFullStatus', (_message.Message,), {
+  'DESCRIPTOR' : _REQUESTFULLSTATUS,
+  '__module__' : 'clientprotocol_pb2'
+  # @@protoc_insertion_point(class_scope:client.RequestFullStatus)
+  })
+_sym_db.RegisterMessage(RequestFullStatus)
+
 ClientToServer = _reflection.GeneratedProtocolMessageType('ClientToServer', (_message.Message,), {
   'DESCRIPTOR' : _CLIENTTOSERVER,
   '__module__' : 'clientprotocol_pb2'
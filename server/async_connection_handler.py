@@ -0,0 +1,175 @@
+import asyncio
+import concurrent.futures
+import threading
+from functools import partial
+
+from server.incoming_connection_handler import IncomingConnectionHandler
+from server.serverside_client import ServerSideClient
+
+
+class AsyncServerSideClient(ServerSideClient):
+    """ A client that is driven by the event loop instead of running a receive loop in a thread of its own """
+
+    def stop(self):
+        ServerSideClient.stop(self)
+        connection = self.connection
+        if connection is not None:
+            connection.close()
+
+
+class AsyncConnection(asyncio.Protocol):
+    """ Handles the length prefixed protobuf framing for ONE client connection on the event loop.
+        The first message is always a LoginRequest, after that all messages are ClientToServer. """
+
+    # A client that doesn't read its data is disconnected instead of letting the server buffer it forever
+    MAX_WRITE_BUFFER = 4 * 1024 * 1024
+    # The clients only send small messages, a larger size means a broken or hostile client
+    MAX_FRAME_SIZE = 1024 * 1024
+
+    def __init__(self, loop, main_server, login_executor):
+        self.loop = loop
+        self.main_server = main_server
+        self.login_executor = login_executor
+        self.transport = None
+        self.addr = None
+        self.buffer = bytearray()
+        self.client = None
+        self.logging_in = False
+        self.login_response_sent = False
+        self.pending_writes = []
+        self.closed = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info("peername")
+
+    def connection_lost(self, exc):
+        self.closed = True
+        if self.client is not None:
+            print("{0} disconnected from {1}".format(self.client.username, self.client.team_server.teamname))
+            self.client.disconnected()
+            self.client = None
+
+    def data_received(self, data):
+        self.buffer.extend(data)
+        self._process_buffer()
+
+    def sendall(self, data):
+        """ Same signature as socket.sendall() so that protobuf_utils can be used as is.
+            Can be called from any thread. The data is always written from the event loop, and it always goes through
+            call_soon_threadsafe(), so the frames are written in the order they were sent, whichever thread sent them. """
+        if self.closed:
+            raise ConnectionAbortedError("The connection to {0} is closed".format(self.addr))
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def close(self):
+        # Scheduled after any pending writes, so they will be sent before the connection is closed
+        self.loop.call_soon_threadsafe(self.transport.close)
+
+    def _write(self, data):
+        if self.closed or self.transport.is_closing():
+            return
+        if not self.login_response_sent:
+            # The team server can start sending to a new client before the login response has been sent
+            self.pending_writes.append(data)
+            return
+        self.transport.write(data)
+        if self.transport.get_write_buffer_size() > AsyncConnection.MAX_WRITE_BUFFER:
+            print("{0} isn't reading any data, closing the connection".format(self.addr))
+            self.transport.abort()
+
+    def _process_buffer(self):
+        while not self.logging_in and not self.closed:
+            if len(self.buffer) < 4:
+                return
+            size = int.from_bytes(self.buffer[0:4], "big")
+            if size <= 0 or size > AsyncConnection.MAX_FRAME_SIZE:
+                print("Error in communications with {0}, size: {1}".format(self.addr, size))
+                self.transport.close()
+                return
+            if len(self.buffer) < 4 + size:
+                return
+            data = bytes(self.buffer[4:4 + size])
+            del self.buffer[0:4 + size]
+
+            if self.client is None:
+                self._start_login(data)
+            elif not self.client.handle_message(data):
+                self.transport.close()
+                return
+
+    def _start_login(self, data):
+        # Creating a team server reads the backup from disk, so don't do that on the event loop.
+        # Further data from the client is kept in the buffer until the login has been handled.
+        self.logging_in = True
+        create_client = partial(AsyncServerSideClient, connection=self)
+        future = self.loop.run_in_executor(self.login_executor, IncomingConnectionHandler.handle_login, self.main_server, data, create_client)
+        future.add_done_callback(self._login_done)
+
+    def _login_done(self, future):
+        self.logging_in = False
+        loginresponse, client = future.result()
+
+        if self.closed:
+            print("Connection from {0} was lost during the login".format(self.addr))
+            if client is not None:
+                client.disconnected()
+            return
+
+        if loginresponse is None:
+            self.transport.close()
+            return
+
+        # Written directly, the writes that are already scheduled must come after it
+        try:
+            data = loginresponse.SerializeToString()
+            self.transport.write(len(data).to_bytes(4, "big") + data)
+        except Exception as e:
+            print("Unable to send login response to client, closing connection. {0}".format(e))
+            self.transport.close()
+            return
+        self.login_response_sent = True
+        pending_writes = self.pending_writes
+        self.pending_writes = []
+        for data in pending_writes:
+            self._write(data)
+
+        if not loginresponse.success or client is None:
+            print("Incorrect login attempt, closing connection")
+            self.transport.close()
+            return
+
+        self.client = client
+        self.client.send_welcome_messages()
+        self._process_buffer()
+
+
+class AsyncConnectionListener(threading.Thread):
+    """ Serves all client connections from ONE thread running an asyncio event loop """
+
+    def __init__(self, host, port, main_server):
+        threading.Thread.__init__(self)
+        self.host = host
+        self.port = port
+        self.main_server = main_server
+        self.loop = None
+
+    def run(self):
+        print("Serving a rally at {0}:{1} using asyncio".format(self.host, self.port))
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        # Logins are handled one at a time, so that two team members logging in at the same time can't create two team servers
+        login_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        server = self.loop.run_until_complete(
+            self.loop.create_server(partial(AsyncConnection, self.loop, self.main_server, login_executor), self.host, self.port))
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+            self.loop.close()
+            login_executor.shutdown()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
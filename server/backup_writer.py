@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import threading
+import time
+
+
+class BackupSnapshot:
+    def __init__(self, backup_path, filename, state, force, on_written):
+        self.backup_path = backup_path
+        self.filename = filename
+        self.state = state
+        self.force = force
+        self.on_written = on_written
+
+
+class BackupWriter(threading.Thread):
+    """ Writes the team backups to disk in a thread of its own, so that the threads serving the teams never wait for the disk.
+        Only the newest snapshot of each team is kept while waiting to be written. Each file is written to a temporary
+        file and renamed when it is complete, so a backup file is never half written. The snapshots that are ready
+        at the same time are written as one batch: all the temporary files are written, then synced, then renamed,
+        and then each directory is synced once for the renames.
+        A manifest in each directory points at the latest backup, so it can be found without listing the directory. """
+
+    MANIFEST = "manifest.json"
+
+    BATCH_INTERVAL = 1.0 # seconds to collect snapshots before writing them
+    KEEP_LATEST = 10 # backups to keep for each team, besides the latest one from every hour
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.condition = threading.Condition()
+        self.pending = {} # backup path -> BackupSnapshot
+        self.latest_contents = {} # backup path -> the json that was last written
+        self.writing = False
+        self.terminate = False
+
+    def write(self, backup_path, filename, state, force=False, on_written=None):
+        """ state must not be changed after this, make copies of everything that can change in the team server.
+            on_written is called from the writer thread when the file is on disk. """
+        with self.condition:
+            previous = self.pending.get(backup_path)
+            force = force or (previous is not None and previous.force)
+            self.pending[backup_path] = BackupSnapshot(backup_path, filename, state, force, on_written)
+            self.condition.notify()
+
+    def flush(self):
+        """ Waits until everything that was handed over before this call has been written """
+        with self.condition:
+            while (len(self.pending) > 0 or self.writing) and self.is_alive():
+                self.condition.notify()
+                self.condition.wait(0.1)
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while len(self.pending) == 0 and not self.terminate:
+                    self.condition.wait()
+                if len(self.pending) == 0:
+                    break
+            # Let more snapshots arrive, so they can share the fsyncs
+            time.sleep(BackupWriter.BATCH_INTERVAL)
+            with self.condition:
+                batch = list(self.pending.values())
+                self.pending = {}
+                self.writing = True
+            self.write_batch(batch)
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def write_batch(self, batch):
+        # (snapshot, json, [(temporary path, path)]), the backup comes before the manifest that points at it
+        prepared = []
+        for snapshot in batch:
+            try:
+                json_str = json.dumps(snapshot.state)
+                if json_str == self.latest_contents.get(snapshot.backup_path) and not snapshot.force:
+                    continue
+                manifest = {"latest-backup": snapshot.filename, "journal-seq": snapshot.state.get("journal-seq", 0)}
+                files = [BackupWriter.write_tmp_file(snapshot.backup_path, snapshot.filename, json_str),
+                         BackupWriter.write_tmp_file(snapshot.backup_path, BackupWriter.MANIFEST, json.dumps(manifest))]
+                prepared.append((snapshot, json_str, files))
+            except (IOError, OSError, TypeError, ValueError) as e:
+                print("Unable to write backup to {0}: {1}".format(snapshot.backup_path, e))
+
+        synced = []
+        for snapshot, json_str, files in prepared:
+            try:
+                for tmp_path, _path in files:
+                    BackupWriter.fsync_file(tmp_path)
+                synced.append((snapshot, json_str, files))
+            except (IOError, OSError) as e:
+                print("Unable to write backup to {0}: {1}".format(snapshot.backup_path, e))
+
+        written = []
+        for snapshot, json_str, files in synced:
+            try:
+                for tmp_path, path in files:
+                    os.replace(tmp_path, path)
+                self.latest_contents[snapshot.backup_path] = json_str
+                written.append(snapshot)
+            except (IOError, OSError) as e:
+                print("Unable to write backup to {0}: {1}".format(snapshot.backup_path, e))
+
+        for backup_path in set([snapshot.backup_path for snapshot in written]):
+            BackupWriter.fsync_directory(backup_path)
+            self.remove_old_backups(backup_path)
+
+        for snapshot in written:
+            if snapshot.on_written is not None:
+                try:
+                    snapshot.on_written(snapshot)
+                except Exception as e:
+                    print("ERROR! Failed to handle a written backup: {0}".format(e))
+
+    @staticmethod
+    def read_manifest(backup_path):
+        """ Returns the manifest of a backup directory, or None if there isn't any valid one """
+        try:
+            with open(os.path.join(backup_path, BackupWriter.MANIFEST), "r") as f:
+                manifest = json.loads(f.read())
+            if "latest-backup" in manifest:
+                return manifest
+        except (IOError, OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def write_tmp_file(backup_path, filename, contents):
+        """ Returns the temporary path and the path it shall be renamed to, when it has been synced """
+        path = os.path.join(backup_path, filename)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(contents)
+        return tmp_path, path
+
+    @staticmethod
+    def fsync_file(path):
+        # Opened for writing, Windows can't sync a file that is only open for reading
+        with open(path, "ab") as f:
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def fsync_directory(path):
+        # Makes the renames durable, directories can't be opened like this on Windows
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print("Unable to sync the backup directory {0}: {1}".format(path, e))
+
+    def remove_old_backups(self, backup_path):
+        """ Keeps the KEEP_LATEST newest backups and the newest backup from each hour """
+        files = sorted([f for f in os.listdir(backup_path) if re.match(r'.*\.srb$', f)])
+        keep = set(files[-BackupWriter.KEEP_LATEST:])
+        hourly = {}
+        for f in files:
+            # The file names start with %Y-%m-%d_%H
+            hourly[f[:13]] = f
+        keep.update(hourly.values())
+        for f in files:
+            if f not in keep:
+                try:
+                    os.remove(os.path.join(backup_path, f))
+                except OSError as e:
+                    print("Unable to remove old backup {0}: {1}".format(f, e))
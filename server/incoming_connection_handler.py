@@ -1,5 +1,6 @@
 import socket
 import threading
+from functools import partial
 
 from rally.common.rally_version import RallyVersion
 from rally.protocol import serverprotocol_pb2
@@ -45,6 +46,72 @@ class IncomingConnectionHandler(threading.Thread):
                 return False, None
         return False, None
 
+    @staticmethod
+    def handle_login(main_server, data, create_client):
+        """ Validates a login request and creates a client for the team, shared by the threaded and the asyncio transports.
+            create_client(team_server, username, main_server) is called when the login is accepted.
+            Returns the login response to send and the created client, or (None, None) if the connection shall be closed """
+        login_result = False
+        error_message = "Unknown error"
+        client = None
+        try:
+            loginrequest = serverprotocol_pb2.LoginRequest()
+
+            unpack_result = loginrequest.ParseFromString(data)
+
+            if unpack_result > 0:
+                if (not loginrequest.HasField("name") or
+                        not loginrequest.HasField("teamname") or
+                        not loginrequest.HasField("password") or
+                        not loginrequest.HasField("version")):
+                    login_result = False
+                    error_message = "Missing data"
+                elif (len(loginrequest.teamname) == 0 or
+                      len(loginrequest.name) == 0 or
+                      len(loginrequest.password) == 0):
+                    login_result = False
+                    error_message = "A string is too short"
+                elif loginrequest.version != RallyVersion.VERSION:
+                    login_result = False
+                    error_message = "Incorrect version, the server is running version {0} and you {1}".format(RallyVersion.VERSION, loginrequest.version)
+                else:
+                    teamname = loginrequest.teamname.casefold()
+                    team = main_server.rally_configuration.find_team(teamname)
+                    if team is not None:
+                        if team.team_password == loginrequest.password:
+                            login_result = True
+                            print("{0} connected to {1}".format(loginrequest.name, teamname))
+                            difficulty = serverprotocol_pb2.LoginRequest.NORMAL
+                            if main_server.rally_configuration.has_difficulty:
+                                if loginrequest.HasField("difficulty"):
+                                    difficulty = loginrequest.difficulty
+                            team_server = main_server.find_team_server(teamname)
+                            if team_server is None:
+                                team_server = main_server.create_team_server(teamname, team.team_number, difficulty)
+                            client = create_client(team_server, loginrequest.name, main_server=main_server)
+                        else:
+                            error_message = "Incorrect password"
+                    else:
+                        error_message = "Unknown team"
+        except google.protobuf.message.DecodeError as e:
+            error_message = "Protocol error"
+            # Allow this error to be sent back to the client
+        except Exception as e:
+            print("Unknown error when accepting a connection: {0}".format(e))
+            return None, None
+
+        try:
+            loginresponse = serverprotocol_pb2.LoginResponse()
+            loginresponse.success = login_result
+            if client is not None:
+                loginresponse.user_id = client.user_id
+                loginresponse.configuration = main_server.rally_configuration.get_client_config_xml()
+            loginresponse.message = error_message
+        except Exception as e:
+            print("Unknown exception when building the login response, closing connection. {0}".format(e))
+            return None, None
+        return loginresponse, client
+
     def run(self):
         with self.connection:
             success, size_bytes = self._receive_data(4)
@@ -58,63 +125,11 @@ class IncomingConnectionHandler(threading.Thread):
                 print("Unidentified connection from {0} didn't send expected data and will be closed".format(self.addr))
                 return
 
-            login_result = False
-            error_message = "Unknown error"
-            client = None
-            try:
-                loginrequest = serverprotocol_pb2.LoginRequest()
-
-                unpack_result = loginrequest.ParseFromString(data)
-
-                if unpack_result > 0:
-                    if (not loginrequest.HasField("name") or
-                            not loginrequest.HasField("teamname") or
-                            not loginrequest.HasField("password") or
-                            not loginrequest.HasField("version")):
-                        login_result = False
-                        error_message = "Missing data"
-                    elif (len(loginrequest.teamname) == 0 or
-                          len(loginrequest.name) == 0 or
-                          len(loginrequest.password) == 0):
-                        login_result = False
-                        error_message = "A string is too short"
-                    elif loginrequest.version != RallyVersion.VERSION:
-                        login_result = False
-                        error_message = "Incorrect version, the server is running version {0} and you {1}".format(RallyVersion.VERSION, loginrequest.version)
-                    else:
-                        teamname = loginrequest.teamname.casefold()
-                        team = self.main_server.rally_configuration.find_team(teamname)
-                        if team is not None:
-                            if team.team_password == loginrequest.password:
-                                login_result = True
-                                print("{0} connected to {1}".format(loginrequest.name, teamname))
-                                difficulty = serverprotocol_pb2.LoginRequest.NORMAL
-                                if self.main_server.rally_configuration.has_difficulty:
-                                    if loginrequest.HasField("difficulty"):
-                                        difficulty = loginrequest.difficulty
-                                team_server = self.main_server.find_team_server(teamname)
-                                if team_server is None:
-                                    team_server = self.main_server.create_team_server(teamname, team.team_number, difficulty)
-                                client = ServerSideClient(team_server, loginrequest.name, self.connection, self.main_server)
-                            else:
-                                error_message = "Incorrect password"
-                        else:
-                            error_message = "Unknown team"
-            except google.protobuf.message.DecodeError as e:
-                error_message = "Protocol error"
-                # Allow this error to be sent back to the client
-            except Exception as e:
-                print("Unknown error when accepting a connection: {0}".format(e))
+            loginresponse, client = IncomingConnectionHandler.handle_login(self.main_server, data, partial(ServerSideClient, connection=self.connection))
+            if loginresponse is None:
                 return
 
             try:
-                loginresponse = serverprotocol_pb2.LoginResponse()
-                loginresponse.success = login_result
-                if client is not None:
-                    loginresponse.user_id = client.user_id
-                    loginresponse.configuration = self.main_server.rally_configuration.get_client_config_xml()
-                loginresponse.message = error_message
-
                 send_success = protobuf_utils.protobuf_send(self.connection, loginresponse)
                 if not send_success:
                     print("Unable to send login response to client, closing connection")
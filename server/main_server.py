@@ -2,77 +2,74 @@ import datetime
 import threading
 import time
 
+import rally.common.protobuf_utils as protobuf_utils
 from rally.protocol import clientprotocol_pb2
 from server.server_config import RebusConfig
 from server.team_server import TeamServer
+from server.backup_writer import BackupWriter
+from server.team_journal import JournalWriter
 from server.flask_server import WebHandler
+from server.scheduler import Scheduler
 
 
-class ScheduledAction:
-    def __init__(self, seconds, action):
-        self.seconds = seconds
-        self.action = action
+class StatusBroadcaster(threading.Thread):
+    """ Sends the status to a team as soon as something has changed, but at most max_rate times per second.
+        Without changes a moving bus still gets an update every second and a stopped bus every idle_interval seconds. """
 
-    def decrease_time(self):
-        self.seconds -= 1
-        if self.seconds <= 0:
-            self.action()
-            self.action = None
+    MOVING_INTERVAL = 1.0
 
-    def done(self):
-        return self.action is None
-
-
-class TimeScheduledAction(ScheduledAction):
-    def __init__(self, schedule_time, action):
-        ScheduledAction.__init__(self, 1, action)
-        self.time = schedule_time
-
-    def decrease_time(self):
-        current_time = datetime.datetime.now().time()
-        if current_time >= self.time:
-            self.action()
-            # Mark ourselves as done
-            self.action = None
-
-
-class ClientUpdateScheduler(threading.Thread):
-    BACKUP_INTERVAL = 60
-
-    def __init__(self, main_server):
+    def __init__(self, main_server, max_rate, idle_interval):
         threading.Thread.__init__(self)
         self.main_server = main_server
-        self.actions = []
-        self.backup_counter = 0
+        self.min_interval = 1.0 / max_rate
+        self.idle_interval = idle_interval
+        self.condition = threading.Condition()
+        self.changed_teams = set()
+        self.latest_sent = {} # team server -> time.monotonic()
+        self.terminate = False
+
+    def team_changed(self, team_server):
+        with self.condition:
+            self.changed_teams.add(team_server)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify()
 
     def run(self):
-        while True:
-            time.sleep(1)
-
-            fired_actions = []
-            for action in self.actions:
-                action.decrease_time()
-                if action.done():
-                    fired_actions.append(action)
-
-            for action in fired_actions:
-                self.actions.remove(action)
-
-            for team_server in self.main_server.team_servers.values():
+        while not self.terminate:
+            with self.condition:
+                now = time.monotonic()
+                next_time = now + self.idle_interval
+                latest_sent = {}
+                due = []
+                for team_server in list(self.main_server.team_servers.values()):
+                    latest = self.latest_sent.get(team_server, 0)
+                    latest_sent[team_server] = latest
+                    if team_server in self.changed_teams:
+                        send_time = latest + self.min_interval
+                    elif team_server.minibus.stopped:
+                        send_time = latest + self.idle_interval
+                    else:
+                        send_time = latest + StatusBroadcaster.MOVING_INTERVAL
+                    if send_time <= now:
+                        due.append(team_server)
+                        self.changed_teams.discard(team_server)
+                        latest_sent[team_server] = now
+                    else:
+                        next_time = min(next_time, send_time)
+                # Teams that have been terminated are forgotten
+                self.latest_sent = latest_sent
+                self.changed_teams.intersection_update(latest_sent.keys())
+                if len(due) == 0:
+                    self.condition.wait(next_time - now)
+                    continue
+
+            for team_server in due:
                 team_server.send_updates_to_clients()
 
-            self.backup_counter += 1
-            if self.backup_counter >= ClientUpdateScheduler.BACKUP_INTERVAL:
-                self.backup_counter = 0
-                for team_server in self.main_server.team_servers.values():
-                    team_server.backup_status_to_disk()
-
-    def schedule_action(self, seconds_from_now, action):
-        self.actions.append(ScheduledAction(seconds_from_now, action))
-
-    def schedule_action_obj(self, action_obj):
-        self.actions.append(action_obj)
-
 
 class BroadcastMessage:
     def __init__(self, message):
@@ -81,42 +78,63 @@ class BroadcastMessage:
 
 
 class MainServer:
+    BACKUP_INTERVAL = 60 # seconds
+
     def __init__(self, rally_configuration, backup_path):
         self.backup_path = backup_path
         self.team_servers = {}
+        self.team_servers_by_number = {}
         self.messages = []
         self.rally_is_started = False
         self.afternoon_is_started = False
         self.rally_configuration = rally_configuration
         self.track_information = self.rally_configuration.track_information
 
-        self.scheduler = ClientUpdateScheduler(self)
+        self.backup_writer = BackupWriter()
+        self.backup_writer.start()
+
+        self.journal_writer = JournalWriter()
+        self.journal_writer.start()
+
+        self.broadcaster = StatusBroadcaster(self, rally_configuration.status_max_rate, rally_configuration.status_idle_interval)
+        self.broadcaster.start()
+
+        self.scheduler = Scheduler()
         if rally_configuration.autostart_rally is not None:
             print("Scheduling autostart of rally at {0}".format(rally_configuration.autostart_rally))
-            self.scheduler.schedule_action_obj(TimeScheduledAction(rally_configuration.autostart_rally, self.start_rally))
+            self.scheduler.schedule_action_at_time_of_day(rally_configuration.autostart_rally, self.start_rally)
         if rally_configuration.autostart_lunch is not None:
             print("Scheduling autostart of afternoon at {0}".format(rally_configuration.autostart_lunch))
-            self.scheduler.schedule_action_obj(TimeScheduledAction(rally_configuration.autostart_lunch, self.start_afternoon))
+            self.scheduler.schedule_action_at_time_of_day(rally_configuration.autostart_lunch, self.start_afternoon)
+        self.scheduler.schedule_action(MainServer.BACKUP_INTERVAL, self.backup_all_teams)
 
         self.scheduler.start()
 
         self.web_handler = WebHandler(self, self.rally_configuration.web_host, self.rally_configuration.web_port)
         self.web_handler.start()
 
+    def backup_all_teams(self):
+        try:
+            for team_server in list(self.team_servers.values()):
+                try:
+                    team_server.backup_status_to_disk()
+                except Exception as e:
+                    print("ERROR! Unable to back up team {0}: {1}".format(team_server.teamname, e))
+        finally:
+            self.scheduler.schedule_action(MainServer.BACKUP_INTERVAL, self.backup_all_teams)
+
     def find_team_server(self, team_name):
         if team_name in self.team_servers:
             return self.team_servers[team_name]
         return None
 
     def find_team_server_from_id(self, team_id):
-        for team in self.team_servers.values():
-            if team.team_number == team_id:
-                return team
-        return None
+        return self.team_servers_by_number.get(team_id)
 
     def create_team_server(self, team_name, team_number, difficulty):
         ts = TeamServer(team_name, team_number, self.rally_configuration, self, difficulty, self.backup_path)
         self.team_servers[team_name] = ts
+        self.team_servers_by_number[team_number] = ts
         if self.rally_is_started:
             self.start_rally_for_team_server(ts)
         if self.afternoon_is_started:
@@ -161,8 +179,9 @@ class MainServer:
         bc_message.message = message.message
         bc_message.date_time = message.date_time.strftime("%Y-%m-%d, %H:%M:%S")
 
+        packed = protobuf_utils.pack_without_counter(server_to_client)
         for team_server in self.team_servers.values():
-            team_server.send(server_to_client)
+            team_server.send_packed(packed)
 
     def send_all_messages_to_client(self, client):
         for message in self.messages:
@@ -180,20 +199,21 @@ class MainServer:
         return json
 
     def get_team_json(self, team_number):
-        for team_server in self.team_servers.values():
-            if team_server.team_number == team_number:
-                return team_server.to_json()
+        team_server = self.find_team_server_from_id(team_number)
+        if team_server is not None:
+            return team_server.to_json()
         return None
 
     def set_team_goal_time(self, team_number):
-        for team_server in self.team_servers.values():
-            if team_server.team_number == team_number:
-                team_server.set_goal_time()
+        team_server = self.find_team_server_from_id(team_number)
+        if team_server is not None:
+            team_server.set_goal_time()
 
     def terminate_team(self, team_id):
         team_server = self.find_team_server_from_id(team_id)
         if team_server is not None:
             self.team_servers.pop(team_server.teamname, None)
+            self.team_servers_by_number.pop(team_server.team_number, None)
             team_server.stop()
 
     def force_backup_team(self, team_id):
@@ -25,7 +25,7 @@ class MiniBus:
         json = {}
         json["current_section"] = self.current_section
         json["distance"] = self.distance
-        json["incorrect_turns"] = self.incorrect_turns
+        json["incorrect_turns"] = dict(self.incorrect_turns)
         if verbose:
             json["speed"] = self.speed
             # Skip seating when reading back, people will have to reconnect
@@ -73,7 +73,7 @@ class MiniBus:
         turning_handled = False
         self.driving_message = ""
         if turn is not None:
-            turn_distance = section.calculate_default_video_distance_from_frame(turn.frame_offset)
+            turn_distance = section.get_correct_turn_distance()
             if turn_distance <= self.distance <= turn_distance+100: # TODO: possibly less than 100 meters
                 # TODO: Handle when the driver is signalling a turn but it is a wrong turn (TURN_WRONG)
                 turning_handled = True
@@ -111,14 +111,7 @@ class MiniBus:
                 # No need to do anything else here, the steering GUI will also tell the driver that he's gone too far
 
     def found_all_checkpoints_in_section(self, section):
-        checkpoints_in_section = []
-        for rp in section.rebus_places:
-            checkpoints_in_section.append(rp.id)
-        found_checkpoints = []
-        for team_found in self.teamserver.found_rebus_checkpoints:
-            if team_found in checkpoints_in_section:
-                found_checkpoints.append(team_found)
-        return len(found_checkpoints) == len(checkpoints_in_section)
+        return section.rebus_place_ids <= self.teamserver.found_rebus_checkpoints
 
     def mark_missed_turn(self, section_number, turn):
         # Type is TURN_WRONG or TURN_MISSED
@@ -0,0 +1,85 @@
+import datetime
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledAction:
+    """ Returned when scheduling an action, can be used to cancel it before it has been run """
+
+    def __init__(self, deadline, action):
+        self.deadline = deadline # time.monotonic()
+        self.action = action
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def done(self):
+        return self.action is None or self.cancelled
+
+
+class Scheduler(threading.Thread):
+    """ Runs actions when their time has come, in deadline order from a heap using the monotonic clock.
+        Actions can be scheduled and cancelled from any thread, they are run in the scheduler thread. """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.condition = threading.Condition()
+        self.heap = []
+        # Keeps actions with the same deadline in order, and makes sure that the actions themselves are never compared
+        self.sequence = itertools.count()
+        self.terminate = False
+
+    def schedule_action(self, seconds_from_now, action):
+        return self.schedule_action_at(time.monotonic() + seconds_from_now, action)
+
+    def schedule_action_at_time_of_day(self, time_of_day, action):
+        """ Runs the action at a time of the day (datetime.time), right away if that time has already passed today """
+        now = datetime.datetime.now()
+        seconds_from_now = (datetime.datetime.combine(now.date(), time_of_day) - now).total_seconds()
+        return self.schedule_action(max(0.0, seconds_from_now), action)
+
+    def schedule_action_at(self, deadline, action):
+        scheduled_action = ScheduledAction(deadline, action)
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.sequence), scheduled_action))
+            # Only the first action decides how long the scheduler thread sleeps
+            if self.heap[0][2] is scheduled_action:
+                self.condition.notify()
+        return scheduled_action
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify()
+
+    def _next_action(self):
+        with self.condition:
+            while not self.terminate:
+                if len(self.heap) == 0:
+                    self.condition.wait()
+                    continue
+                deadline, _, scheduled_action = self.heap[0]
+                if scheduled_action.cancelled:
+                    heapq.heappop(self.heap)
+                    continue
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    heapq.heappop(self.heap)
+                    return scheduled_action
+                self.condition.wait(timeout)
+        return None
+
+    def run(self):
+        while not self.terminate:
+            scheduled_action = self._next_action()
+            if scheduled_action is None:
+                break
+            action = scheduled_action.action
+            scheduled_action.action = None
+            try:
+                action()
+            except Exception as e:
+                print("ERROR! Scheduled action failed: {0}".format(e))
@@ -133,6 +133,14 @@ class ServerRallyConfig(BaseRallyConfig):
         self.web_port = None
         self.autostart_rally = None
         self.autostart_lunch = None
+        self.status_max_rate = 10.0 # status updates per second and team, at most
+        self.status_idle_interval = 5.0 # seconds between status updates when the bus is stopped and nothing happens
+        self.teams_by_name = {} # casefolded login name -> AllowedTeam
+        self.teams_by_number = {}
+        self.rebus_configs_by_section = {}
+        self.start_rebus_config = None
+        self.lunch_rebus_config = None
+        self.goal_rebus_config = None
         BaseRallyConfig.__init__(self, config_file)
 
     def parse_xml(self, root):
@@ -154,6 +162,10 @@ class ServerRallyConfig(BaseRallyConfig):
             self.web_port = int(root.attrib["web_port"])
         if self.web_port is None:
             self.web_port = 61333
+        if "status_max_rate" in root.attrib:
+            self.status_max_rate = float(root.attrib["status_max_rate"])
+        if "status_idle_interval" in root.attrib:
+            self.status_idle_interval = float(root.attrib["status_idle_interval"])
         if "autostart_rally" in root.attrib:
             self.autostart_rally = ServerRallyConfig.time_from_string(root.attrib["autostart_rally"])
         if "autostart_lunch" in root.attrib:
@@ -185,6 +197,30 @@ class ServerRallyConfig(BaseRallyConfig):
                 teams_file = self.replace_locations(teams.attrib["file"])
                 self.allowed_teams = AllowedTeam.read_file(teams_file)
 
+        self.build_indexes()
+
+    def build_indexes(self):
+        """ Lookup tables for what the server looks up on every login and rebus action, the first match wins as before """
+        self.teams_by_name = {}
+        self.teams_by_number = {}
+        for team in self.allowed_teams:
+            if team.team_name is not None:
+                self.teams_by_name.setdefault(team.team_name.casefold(), team)
+            self.teams_by_number.setdefault(team.team_number, team)
+
+        self.rebus_configs_by_section = {}
+        self.start_rebus_config = None
+        self.lunch_rebus_config = None
+        self.goal_rebus_config = None
+        for rebus_config in self.rebus_configs:
+            self.rebus_configs_by_section.setdefault(rebus_config.section, rebus_config)
+            if rebus_config.is_start and self.start_rebus_config is None:
+                self.start_rebus_config = rebus_config
+            if rebus_config.is_lunch and self.lunch_rebus_config is None:
+                self.lunch_rebus_config = rebus_config
+            if rebus_config.is_goal and self.goal_rebus_config is None:
+                self.goal_rebus_config = rebus_config
+
     @staticmethod
     def time_from_string(s):
         try:
@@ -200,40 +236,22 @@ class ServerRallyConfig(BaseRallyConfig):
         return team is not None
 
     def find_team(self, team_name):
-        for team in self.allowed_teams:
-            if team.compare_name(team_name):
-                return team
-        return None
+        return self.teams_by_name.get(team_name.casefold())
 
     def find_team_from_id(self, team_id):
-        for team in self.allowed_teams:
-            if team.team_number == team_id:
-                return team
-        return None
+        return self.teams_by_number.get(team_id)
 
     def get_rebus_config(self, section):
-        for rebus_config in self.rebus_configs:
-            if rebus_config.section == section:
-                return rebus_config
-        return None
+        return self.rebus_configs_by_section.get(section)
 
     def get_start_rebus_config(self):
-        for rebus_config in self.rebus_configs:
-            if rebus_config.is_start:
-                return rebus_config
-        return None
+        return self.start_rebus_config
 
     def get_lunch_rebus_config(self):
-        for rebus_config in self.rebus_configs:
-            if rebus_config.is_lunch:
-                return rebus_config
-        return None
+        return self.lunch_rebus_config
 
     def get_goal_rebus_config(self):
-        for rebus_config in self.rebus_configs:
-            if rebus_config.is_goal:
-                return rebus_config
-        return None
+        return self.goal_rebus_config
 
     def get_client_config_xml(self):
         root = ET.Element("rally", id=self.rally_id, title=self.title)
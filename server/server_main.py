@@ -7,6 +7,7 @@ import threading
 
 from flask import Flask
 
+from server.async_connection_handler import AsyncConnectionListener
 from server.incoming_connection_handler import IncomingConnectionHandler
 from server.main_server import MainServer
 
@@ -25,6 +26,7 @@ parser.add_argument("-l", "--start_locally", action='store_true', help="Start th
 parser.add_argument("-i", "--rally_id", type=str, help="ID of the rally configuration to use", required=False)
 parser.add_argument("-b", "--backup_path", type=str, help="Folder to store team status backups in", required=False)
 parser.add_argument("-a", "--add_date", action='store_true', help="Add a date to the backup folder", required=False, default=False)
+parser.add_argument("-t", "--thread_per_connection", action='store_true', help="Serve each client connection from a thread of its own instead of using asyncio", required=False, default=False)
 args = parser.parse_args()
 
 config_finder = ServerConfigFinder(args.rally_configuration)
@@ -109,6 +111,9 @@ else:
 print("Using {0} as backup dir".format(backup_path))
 
 main_server = MainServer(configuration, backup_path)
-normal = ConnectionListener(configuration.server_host, configuration.server_port, main_server)
+if args.thread_per_connection:
+    normal = ConnectionListener(configuration.server_host, configuration.server_port, main_server)
+else:
+    normal = AsyncConnectionListener(configuration.server_host, configuration.server_port, main_server)
 normal.start()
 normal.join()
@@ -1,5 +1,7 @@
 import datetime
 import socket
+import threading
+from collections import deque
 
 import google
 
@@ -7,6 +9,68 @@ from rally.protocol import clientprotocol_pb2
 import rally.common.protobuf_utils as protobuf_utils
 
 
+class ConnectionWriter(threading.Thread):
+    """ Writes the messages to ONE client's socket from a thread of its own, so that the team server never waits for a
+        slow client. The messages are written in the order they were queued. """
+
+    # A client that doesn't read its data is disconnected instead of letting the server buffer it forever
+    MAX_QUEUED = 4 * 1024 * 1024
+
+    def __init__(self, connection):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.connection = connection
+        self.condition = threading.Condition()
+        self.queued = deque()
+        self.queued_size = 0
+        self.terminate = False
+
+    def sendall(self, data):
+        """ Same signature as socket.sendall() so that protobuf_utils can be used as is, but it only queues the data """
+        with self.condition:
+            if self.terminate:
+                raise ConnectionAbortedError("The connection is closed")
+            if self.queued_size + len(data) > ConnectionWriter.MAX_QUEUED:
+                print("A client isn't reading any data, closing the connection")
+                self.terminate = True
+                self.condition.notify()
+                try:
+                    # Makes the receiving thread notice it
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                raise ConnectionAbortedError("The client isn't reading its data")
+            self.queued.append(data)
+            self.queued_size += len(data)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while len(self.queued) == 0 and not self.terminate:
+                    self.condition.wait()
+                if self.terminate:
+                    return
+                data = memoryview(b"".join(self.queued))
+                self.queued.clear()
+                self.queued_size = 0
+            # The socket has a timeout for the receiving, so send() is used to know how much was written before it
+            while len(data) > 0 and not self.terminate:
+                try:
+                    sent = self.connection.send(data)
+                    data = data[sent:]
+                except socket.timeout:
+                    continue
+                except OSError:
+                    self.stop()
+                    return
+
+
 class ServerSideClient:
     """ Handles the connection with ONE client and all the communication """
 
@@ -20,21 +84,33 @@ class ServerSideClient:
         self.team_server = team_server
         self.username = username
         self.connection = connection
-        team_server.addClient(self)
+        # Where the messages are written, see run()
+        self.output = connection
+        # The counter and the send have to be in the same order, messages are sent from several threads
+        self.send_lock = threading.Lock()
         self.counter = 1
+        # Set when the client has got the full status, it gets no status updates before that
+        self.welcomed = False
+        team_server.addClient(self)
         self.terminate = False
 
     def stop(self):
         self.terminate = True
 
     def send(self, server_to_client):
-        server_to_client.counter = self.counter
-        self.counter += 1
-        #try:
-        # self.connection.sendall(server_to_client.SerializeToString())
-        protobuf_utils.protobuf_send(self.connection, server_to_client)
-        # except:
-        #     pass
+        try:
+            self.send_packed(protobuf_utils.pack_without_counter(server_to_client))
+        except google.protobuf.message.EncodeError as e:
+            print("ERROR! Unable to send a message to {0}: {1}".format(self.username, e))
+
+    def send_packed(self, packed):
+        """ Sends a ServerToClient that was serialized without its counter, see protobuf_utils.pack_without_counter().
+            The same bytes can be sent to several clients, only the counter differs.
+            The message is only queued, so the team server can send with its lock held to keep the messages in order. """
+        with self.send_lock:
+            counter = protobuf_utils.pack_varint_field(1, self.counter) # ServerToClient.counter
+            self.counter += 1
+            protobuf_utils.protobuf_send_packed(self.output, packed, counter)
 
     def _remove_client(self):
         self.team_server.remove_client(self.user_id)
@@ -61,7 +137,7 @@ class ServerSideClient:
                 return False, e
         return False, None
 
-    def run(self):
+    def send_welcome_messages(self):
         self.main_server.send_all_messages_to_client(self)
 
         server_to_client = clientprotocol_pb2.ServerToClient()
@@ -72,6 +148,49 @@ class ServerSideClient:
             welcome_message.date_time = datetime.datetime.now().strftime("%Y-%m-%d, %H:%M:%S")
             self.send(server_to_client)
 
+        # After this only the changes are sent
+        self.team_server.send_full_status(self)
+        # The full status doesn't include the position
+        self.team_server.request_status_update()
+
+    def handle_message(self, data):
+        """ Unpacks one ClientToServer message and hands it over to the team server.
+            Returns False if the connection shall be closed. """
+        try:
+            client_to_server = clientprotocol_pb2.ClientToServer()
+            unpack_result = client_to_server.ParseFromString(data)
+            if unpack_result > 0:
+                if client_to_server.HasField("select_seat"):
+                    self.team_server.select_seat(client_to_server.select_seat)
+                if client_to_server.HasField("pos_update"):
+                    self.team_server.update_pos_from_driver(client_to_server.pos_update)
+                if client_to_server.HasField("search_for_rebus"):
+                    self.team_server.search_for_rebus()
+                # Answers, rebus tests and the other messages that change the team state
+                self.team_server.handle_action(client_to_server)
+                if client_to_server.HasField("request_full_status"):
+                    self.team_server.send_full_status(self)
+
+        except google.protobuf.message.DecodeError as e:
+            print("Incorrect message from {0} disconnected from {1}: {2}".format(self.username, self.team_server.teamname, e))
+            return False
+        except Exception as e:
+            print("Unknown error in communication from {0} disconnected from {1}: {2}".format(self.username, self.team_server.teamname, e))
+            return False
+        return True
+
+    def disconnected(self):
+        self.terminate = True # We exited the loop, so might as well set terminate to true
+        self._remove_client()
+        self.connection = None
+        self.main_server = None
+
+    def run(self):
+        # The connection is served from this thread, the messages are written from a thread of their own
+        self.output = ConnectionWriter(self.connection)
+        self.output.start()
+        self.send_welcome_messages()
+
         while not self.terminate:
             success, size_bytes = self._receive_data(4)
             if not success:
@@ -87,38 +206,8 @@ class ServerSideClient:
                 print("{0} disconnected from {1}".format(self.username, self.team_server.teamname))
                 break
 
-            try:
-                client_to_server = clientprotocol_pb2.ClientToServer()
-                unpack_result = client_to_server.ParseFromString(data)
-                if unpack_result > 0:
-                    if client_to_server.HasField("select_seat"):
-                        self.team_server.select_seat(client_to_server.select_seat)
-                    if client_to_server.HasField("pos_update"):
-                        self.team_server.update_pos_from_driver(client_to_server.pos_update)
-                    if client_to_server.HasField("open_rebus_solution"):
-                        self.team_server.open_rebus_solution(client_to_server.open_rebus_solution)
-                    if client_to_server.HasField("set_photo_answer"):
-                        self.team_server.set_photo_answer(client_to_server.set_photo_answer)
-                    if client_to_server.HasField("set_plate_answer"):
-                        self.team_server.set_plate_answer(client_to_server.set_plate_answer)
-                    if client_to_server.HasField("set_rebus_answer"):
-                        self.team_server.set_rebus_answer(client_to_server.set_rebus_answer)
-                    if client_to_server.HasField("search_for_rebus"):
-                        self.team_server.search_for_rebus()
-                    if client_to_server.HasField("test_rebus_solution"):
-                        self.team_server.test_rebus_solution(client_to_server.test_rebus_solution)
-                    if client_to_server.HasField("open_extra_puzzle"):
-                        self.team_server.open_extra_puzzle(client_to_server.open_extra_puzzle)
-
-            except google.protobuf.message.DecodeError as e:
-                print("Incorrect message from {0} disconnected from {1}: {2}".format(self.username, self.team_server.teamname, e))
+            if not self.handle_message(data):
                 break
-            except Exception as e:
-                print("Unknown error in communication from {0} disconnected from {1}: {2}".format(self.username, self.team_server.teamname, e))
-                break
-
-        self.terminate = True # We exited the loop, so might as well set terminate to true
-        self._remove_client()
-        self.connection = None
-        self.main_server = None
 
+        self.output.stop()
+        self.disconnected()
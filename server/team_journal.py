@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+
+class TeamJournal:
+    """ Append-only journal of the actions that change the state of a team, stored next to the team backups.
+        Each record is an 8 byte sequence number, an 8 byte time in milliseconds since the epoch (to be able to replay
+        time dependent actions correctly), a 4 byte size and a serialized ClientToServer message.
+        A record is handed to the operating system when it is appended, and the JournalWriter syncs it to the disk
+        shortly after, without making the thread that appended it wait. The team server doesn't show an action to the
+        clients before its record is on disk, so a crashed server or computer loses nothing that a client has seen.
+        The backups remember the latest sequence number they include, records up to there can be compacted away. """
+
+    FILENAME = "journal.bin"
+    HEADER_SIZE = 20
+
+    def __init__(self, backup_path, journal_writer, on_synced=None):
+        """ on_synced() is called from the journal writer when records have been synced to disk """
+        self.path = os.path.join(backup_path, TeamJournal.FILENAME)
+        self.journal_writer = journal_writer
+        self.on_synced = on_synced
+        self.lock = threading.Lock()
+        self.seq = 0
+        for seq, _, _ in self.read_records():
+            self.seq = seq
+        self.synced_seq = self.seq # The records up to here are on disk
+        self.file = open(self.path, "ab")
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.synced_seq = self.seq
+                self.file.close()
+                self.file = None
+
+    def continue_after(self, seq):
+        """ The journal can have been compacted up to a backup, the following records shall come after it """
+        with self.lock:
+            self.seq = max(self.seq, seq)
+            self.synced_seq = max(self.synced_seq, seq)
+
+    def is_synced(self, seq):
+        return self.synced_seq >= seq
+
+    @staticmethod
+    def pack_record(seq, timestamp, data):
+        return seq.to_bytes(8, "big") + int(timestamp * 1000).to_bytes(8, "big") + len(data).to_bytes(4, "big") + data
+
+    def append(self, data):
+        """ Writes one serialized message and returns its sequence number """
+        with self.lock:
+            self.seq += 1
+            self.file.write(TeamJournal.pack_record(self.seq, time.time(), data))
+            self.file.flush()
+            seq = self.seq
+        self.journal_writer.sync(self)
+        return seq
+
+    def sync(self):
+        """ Syncs the appended records to disk, called from the journal writer """
+        with self.lock:
+            if self.file is None or self.synced_seq >= self.seq:
+                return
+            seq = self.seq
+            # A copy of the file descriptor, so that the file can be appended to, or compacted, while it is synced
+            fd = os.dup(self.file.fileno())
+        try:
+            os.fsync(fd)
+        except OSError as e:
+            print("Unable to sync the journal {0}: {1}".format(self.path, e))
+            return
+        finally:
+            os.close(fd)
+        with self.lock:
+            self.synced_seq = max(self.synced_seq, seq)
+        if self.on_synced is not None:
+            self.on_synced()
+
+    def read_records(self, after_seq=0):
+        """ Yields (seq, timestamp, data) for the records after after_seq, stops at a record that wasn't completely written """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            contents = f.read()
+        pos = 0
+        while pos + TeamJournal.HEADER_SIZE <= len(contents):
+            seq = int.from_bytes(contents[pos:pos + 8], "big")
+            timestamp = int.from_bytes(contents[pos + 8:pos + 16], "big") / 1000.0
+            size = int.from_bytes(contents[pos + 16:pos + TeamJournal.HEADER_SIZE], "big")
+            start = pos + TeamJournal.HEADER_SIZE
+            if start + size > len(contents):
+                print("Ignoring an incomplete record at the end of {0}".format(self.path))
+                break
+            if seq > after_seq:
+                yield seq, timestamp, contents[start:start + size]
+            pos = start + size
+
+    def compact(self, snapshot_seq):
+        """ Removes the records that are included in a backup that is safely on disk """
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.flush()
+            records = list(self.read_records(snapshot_seq))
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for seq, timestamp, data in records:
+                    f.write(TeamJournal.pack_record(seq, timestamp, data))
+                f.flush()
+                os.fsync(f.fileno())
+            self.file.close()
+            os.replace(tmp_path, self.path)
+            self.file = open(self.path, "ab")
+            # Everything that is left was synced with the new file
+            self.synced_seq = self.seq
+
+
+class JournalWriter(threading.Thread):
+    """ Syncs the team journals to disk in a thread of its own, so that the threads serving the teams never wait for
+        the disk. The records that are appended while a sync is running are synced together by the next one. """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.condition = threading.Condition()
+        self.pending = [] # journals with records that aren't synced, in the order they were appended to
+        self.terminate = False
+
+    def sync(self, journal):
+        with self.condition:
+            if journal not in self.pending:
+                self.pending.append(journal)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.terminate = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while len(self.pending) == 0 and not self.terminate:
+                    self.condition.wait()
+                if len(self.pending) == 0:
+                    break
+                journals = self.pending
+                self.pending = []
+            for journal in journals:
+                try:
+                    journal.sync()
+                except Exception as e:
+                    print("ERROR! Failed to sync a journal: {0}".format(e))
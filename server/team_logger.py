@@ -7,6 +7,7 @@ class TeamLoggerBase:
         self.team_id = team_id
         self.logger_id = logger_id
         self.log_path = log_path
+        self.muted = False # Set while replaying old actions that have already been logged
         self.formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
 
         self.handler = logging.FileHandler(os.path.join(log_path, filename))
@@ -17,14 +18,20 @@ class TeamLoggerBase:
         self.logger.addHandler(self.handler)
 
     def info(self, message):
+        if self.muted:
+            return
         self.add_to_server_log("INFO", message)
         self.logger.info(message)
 
     def error(self, message):
+        if self.muted:
+            return
         self.add_to_server_log("ERROR", message)
         self.logger.error(message)
 
     def warning(self, message):
+        if self.muted:
+            return
         self.add_to_server_log("WARNING", message)
         self.logger.warning(message)
 
@@ -3,15 +3,24 @@ import json
 import os
 import random
 import re
+import threading
 from functools import partial
 
+import google
+
+import rally.common.protobuf_utils as protobuf_utils
 from rally.common.rebuses import RebusStatuses
 from rally.common.status_information import Plate, Photo
 from rally.protocol import clientprotocol_pb2
+from server.backup_writer import BackupWriter
 from server.minibus import MiniBus
 from server.server_config import RebusConfig
+from server.team_journal import TeamJournal
 from server.team_logger import TeamLogger, TeamActionLogger
 
+# ServerToClient.status_update, the status updates are encoded piece by piece and wrapped in a ServerToClient last
+STATUS_UPDATE_FIELD = clientprotocol_pb2.ServerToClient.DESCRIPTOR.fields_by_name["status_update"].number
+
 
 class RebusSolution:
     def __init__(self, rc):
@@ -105,10 +114,61 @@ class RebusSolution:
         return rs
 
 
+class StatusDelta:
+    """ Keeps track of what has changed in the team state since the latest status update was sent to the clients.
+        The attributes are named as the ServerStatusUpdate fields they end up in. """
+
+    def __init__(self):
+        self.bus_seating = False
+        self.plate_answers = set() # (section, index)
+        self.photo_answers = set() # (section, index)
+        self.rebus_list = set() # sections
+        self.rebus_answers = set() # sections
+        self.rebus_solutions = set() # sections
+        self.extra_puzzles = set() # puzzle ids
+
+    def is_empty(self):
+        return not self.bus_seating and \
+               len(self.plate_answers) == 0 and \
+               len(self.photo_answers) == 0 and \
+               len(self.rebus_list) == 0 and \
+               len(self.rebus_answers) == 0 and \
+               len(self.rebus_solutions) == 0 and \
+               len(self.extra_puzzles) == 0
+
+
+class StatusFieldCache:
+    """ Keeps the encoded ServerStatusUpdate sub messages, each one is only rebuilt when its own data has changed """
+
+    def __init__(self):
+        self.generations = {}
+        self.packed = {} # field name -> ((generation, variant), bytes)
+
+    def changed(self, field_name):
+        self.generations[field_name] = self.generations.get(field_name, 0) + 1
+
+    def get(self, field_name, fill, variant=None):
+        """ Returns the field encoded as a ServerStatusUpdate with only that field set, messages encoded like this
+            can simply be concatenated. variant is for data that isn't tracked by changed(), like the time based lock. """
+        key = (self.generations.get(field_name, 0), variant)
+        cached = self.packed.get(field_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        status_update = clientprotocol_pb2.ServerStatusUpdate()
+        field = getattr(status_update, field_name)
+        field.SetInParent()
+        fill(field)
+        data = status_update.SerializeToString()
+        self.packed[field_name] = (key, data)
+        return data
+
+
 class TeamServer:
     """ Keeps track of the progress of each team """
 
     FILE_VERSION = 1
+    # The ClientToServer messages that change the team state, they are journaled and named as the methods handling them
+    JOURNALED_ACTIONS = ["open_rebus_solution", "set_photo_answer", "set_plate_answer", "set_rebus_answer", "test_rebus_solution", "open_extra_puzzle"]
 
     def __init__(self, teamname, team_number, rally_configuration, main_server, difficulty, backup_path):
         self.terminate = False
@@ -126,18 +186,28 @@ class TeamServer:
         self.action_logger = TeamActionLogger(team_number, self.backup_path)
         self.action_logger.info("Starting server for {0} / {1}".format(team_number, teamname))
         self.clients = []
-        self.changed = True
-        self.update_counter = 0
+        # The clients get the full state when they connect, after that only what has changed
+        self.lock = threading.RLock()
+        self.status_version = 0
+        self.status_delta = StatusDelta()
+        self.status_cache = StatusFieldCache()
+        self.sent_rebus_lock = False
+        self.sent_driving_message = ""
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.NOT_STARTED
         self.looking_for_rebus = False
+        self.search_action = None
         self.lock_time = None
         self.start_time = datetime.datetime.now() # TODO: make sure to restore when reading from json
         self.lunch_time = None
         self.found_goal_time = None
         self.goal_time = None
-        self.latest_backup_contents = ""
+        self.backup_writer = main_server.backup_writer
+        # The actions are shown to the clients when their records are on disk
+        self.journal = TeamJournal(self.backup_path, main_server.journal_writer, self.request_status_update)
+        self.journal_seq = 0 # The latest journal record that is included in the state
+        self.replay_time = None # The time of the action that is being replayed from the journal
         self.latest_action = datetime.datetime.now()
-        self.found_rebus_checkpoints = []
+        self.found_rebus_checkpoints = set()
 
         #self.status_information = StatusInformation(rally_configuration.track_information)
         # TODO: use StatusInformation for seating and other position info?
@@ -145,18 +215,32 @@ class TeamServer:
         self.rebus_statuses = RebusStatuses()
 
         self.minibus = MiniBus(rally_configuration.track_information, self.difficulty, self)
-        self.plate_answers = []
-        self.photo_answers = []
+        self.plate_answers = {} # (section, index) -> Plate
+        self.photo_answers = {} # (section, index) -> Photo
         self.rebus_answers = {}
         self.rebus_solutions = {}
         self.opened_extra_puzzles = {}
 
         self.try_to_restore_from_backup()
-
-    def try_to_restore_from_backup(self):
+        self.replay_journal()
+
+    def find_latest_backup(self):
+        manifest = BackupWriter.read_manifest(self.backup_path)
+        if manifest is not None:
+            latest_backup = os.path.join(self.backup_path, manifest["latest-backup"])
+            if os.path.exists(latest_backup):
+                return latest_backup
+            print("The backup manifest points at {0} that doesn't exist, looking for the latest backup".format(latest_backup))
+        # Backups from before there was a manifest
         files = sorted([f for f in os.listdir(self.backup_path) if re.match(r'.*\.srb$', f)])
         if len(files) > 0:
-            restore_file = os.path.abspath(os.path.join(self.backup_path, files[-1]))
+            return os.path.join(self.backup_path, files[-1])
+        return None
+
+    def try_to_restore_from_backup(self):
+        latest_backup = self.find_latest_backup()
+        if latest_backup is not None:
+            restore_file = os.path.abspath(latest_backup)
             print("Trying to restore team server state from {0}".format(restore_file))
             try:
                 with open(restore_file, 'r') as f:
@@ -178,12 +262,20 @@ class TeamServer:
 
     def stop(self):
         self.terminate = True
+        if self.search_action is not None:
+            self.search_action.cancel()
+        self.journal.close()
         for client in self.clients:
             client.stop()
         self.clients.clear()
         self.main_server = None
         self.rally_configuration = None
 
+    def now(self):
+        """ The current time, or the time of the original action when replaying the journal """
+        if self.replay_time is not None:
+            return self.replay_time
+        return datetime.datetime.now()
 
     @staticmethod
     def date_to_json(date):
@@ -204,6 +296,11 @@ class TeamServer:
         return None
 
     def to_json(self, verbose=True):
+        """ Everything mutable is copied, the result is written to disk from another thread """
+        with self.lock:
+            return self._to_json(verbose)
+
+    def _to_json(self, verbose):
         _json = {}
         _json["version"] = TeamServer.FILE_VERSION
         _json["team-name"] = self.teamname
@@ -215,8 +312,12 @@ class TeamServer:
         _json["lunch-time"] = TeamServer.date_to_json(self.lunch_time) # can be None
         _json["found-goal-time"] = TeamServer.date_to_json(self.found_goal_time) # can be None
         _json["goal-time"] = TeamServer.date_to_json(self.goal_time) # can be None
-        _json["opened-extra-puzzles"] = self.opened_extra_puzzles
-        _json["found-rebus-checkpoints"] = self.found_rebus_checkpoints
+        _json["opened-extra-puzzles"] = dict(self.opened_extra_puzzles)
+        _json["found-rebus-checkpoints"] = sorted(self.found_rebus_checkpoints)
+        _json["plate-answers"] = [[plate.section, plate.index, plate.answer] for plate in self.plate_answers.values()]
+        _json["photo-answers"] = [[photo.section, photo.index, photo.answer] for photo in self.photo_answers.values()]
+        _json["rebus-answers"] = {str(section): answer for section, answer in self.rebus_answers.items()}
+        _json["journal-seq"] = self.journal_seq
         solution_json = {}
         for section in self.rebus_solutions:
             rebus_solution = self.rebus_solutions[section]
@@ -253,7 +354,18 @@ class TeamServer:
         if "opened-extra-puzzles" in _json:
             self.opened_extra_puzzles = _json["opened-extra-puzzles"]
         if "found-rebus-checkpoints" in _json:
-            self.found_rebus_checkpoints = _json["found-rebus-checkpoints"]
+            self.found_rebus_checkpoints = set(_json["found-rebus-checkpoints"])
+        if "plate-answers" in _json:
+            for section, index, answer in _json["plate-answers"]:
+                self.plate_answers[(section, index)] = Plate(section, index, answer)
+        if "photo-answers" in _json:
+            for section, index, answer in _json["photo-answers"]:
+                self.photo_answers[(section, index)] = Photo(section, index, answer)
+        if "rebus-answers" in _json:
+            for section_str, answer in _json["rebus-answers"].items():
+                self.rebus_answers[int(section_str)] = answer
+        if "journal-seq" in _json:
+            self.journal_seq = _json["journal-seq"]
         if "rebus-solutions" in _json:
             rebus_solutions = _json["rebus-solutions"]
             for section_str in rebus_solutions:
@@ -263,14 +375,50 @@ class TeamServer:
         self.backup_status_to_disk()
 
     def backup_status_to_disk(self, force=False):
-        json_str = json.dumps(self.to_json(False))
-        if json_str != self.latest_backup_contents or force:
-            self.latest_backup_contents = json_str
-            filename = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".srb"
-            new_backup_file = os.path.join(self.backup_path, filename)
-            with open(new_backup_file, "w") as f:
-                f.write(json_str)
-                #f.write(json_str.replace(",", ",\n"))
+        """ Hands a snapshot over to the backup writer, it is only written if something has changed or when forced """
+        filename = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".srb"
+        self.backup_writer.write(self.backup_path, filename, self.to_json(False), force, self.backup_written)
+
+    def backup_written(self, snapshot):
+        # Called from the backup writer, the journal only has to keep what came after the backup
+        self.journal.compact(snapshot.state["journal-seq"])
+
+    def handle_action(self, client_to_server):
+        """ Journals and runs a message that changes the team state, returns False for all other messages """
+        action = client_to_server.WhichOneof("messages")
+        if action not in TeamServer.JOURNALED_ACTIONS:
+            return False
+        with self.lock:
+            self.journal_seq = self.journal.append(client_to_server.SerializeToString())
+            getattr(self, action)(getattr(client_to_server, action))
+        return True
+
+    def replay_journal(self):
+        """ Runs the journaled actions that came after the restored backup again, without logging them a second time """
+        replayed = 0
+        self.logger.muted = True
+        self.action_logger.muted = True
+        try:
+            for seq, timestamp, data in self.journal.read_records(self.journal_seq):
+                self.replay_time = datetime.datetime.fromtimestamp(timestamp)
+                client_to_server = clientprotocol_pb2.ClientToServer()
+                client_to_server.ParseFromString(data)
+                action = client_to_server.WhichOneof("messages")
+                if action in TeamServer.JOURNALED_ACTIONS:
+                    getattr(self, action)(getattr(client_to_server, action))
+                self.journal_seq = seq
+                replayed += 1
+        except google.protobuf.message.DecodeError as e:
+            print("Unable to replay the journal after record {0}: {1}".format(self.journal_seq, e))
+        finally:
+            self.replay_time = None
+            self.logger.muted = False
+            self.action_logger.muted = False
+        # The journal can have been compacted up to the backup
+        self.journal.continue_after(self.journal_seq)
+        if replayed > 0:
+            self.logger.info("Replayed {0} actions from the journal".format(replayed))
+            self.backup_status_to_disk()
 
     def set_goal_time(self):
         self.goal_time = datetime.datetime.now()
@@ -286,6 +434,7 @@ class TeamServer:
 
     def remove_client(self, user_id):
         self.minibus.remove_user(user_id)
+        self.seating_changed()
         client = self.findClient(user_id)
         if client is not None:
             self.clients.remove(client)
@@ -299,21 +448,51 @@ class TeamServer:
         self.send(server_to_client)
 
     def send(self, server_to_client):
+        # Serialized once for the whole team, each client only adds its own counter
+        try:
+            self.send_packed(protobuf_utils.pack_without_counter(server_to_client))
+        except google.protobuf.message.EncodeError as e:
+            print("ERROR! Unable to send a message to team {0}: {1}".format(self.teamname, e))
+
+    def send_packed(self, packed):
         for client in self.clients:
-            client.send(server_to_client)
+            # The updates continue from the full status, the login response and the welcome messages come before it
+            if client.welcomed:
+                client.send_packed(packed)
+
+    def seating_changed(self):
+        with self.lock:
+            self.status_delta.bus_seating = True
+            self.status_cache.changed("bus_seating")
+        self.request_status_update()
+
+    def status_changed(self, field_name, key):
+        """ Remembers that an item in one of the StatusDelta sets has to be sent in the next status update """
+        with self.lock:
+            getattr(self.status_delta, field_name).add(key)
+            self.status_cache.changed(field_name)
+        self.request_status_update()
+
+    def request_status_update(self):
+        """ Makes the status broadcaster send an update to the clients as soon as the max rate allows """
+        main_server = self.main_server
+        if main_server is not None:
+            main_server.broadcaster.team_changed(self)
 
     def select_seat(self, select_seat_message):
         self.latest_action = datetime.datetime.now()
         if self.minibus.select_seat(select_seat_message, self):
-            self.changed = True
+            self.seating_changed()
 
     def update_pos_from_driver(self, pos_update):
         self.latest_action = datetime.datetime.now()
         self.minibus.update_pos_from_driver(pos_update)
+        self.request_status_update()
 
     def give_rebus_data(self, section, rebus_type, txt, extra):
-        self.rebus_statuses.give_rebus(section, rebus_type, txt, extra)
-        self.changed = True
+        with self.lock:
+            self.rebus_statuses.give_rebus(section, rebus_type, txt, extra)
+            self.status_changed("rebus_list", section)
 
     def open_rebus_solution(self, client_message):
         self.latest_action = datetime.datetime.now()
@@ -336,23 +515,14 @@ class TeamServer:
         index = answer_message.index
         # TODO: validate section based on configuration
         if 0 < section < 9 and 0 <= index < 10:
-            if answer_message.HasField("answer") and answer_message.answer > 0:
-                obj = None
-                for photo in self.photo_answers:
-                    if photo.section == section and photo.index == index:
-                        obj = photo
-                        break
-                if obj is None:
-                    obj = Photo(section, index, "")
-                    self.photo_answers.append(obj)
-                obj.answer = answer_message.answer
-                self.changed = True
-            else:
-                for photo in self.photo_answers:
-                    if photo.section == section and photo.index == index:
-                        self.photo_answers.remove(photo)
-                        self.changed = True
-                        break
+            key = (section, index)
+            with self.lock:
+                if answer_message.HasField("answer") and answer_message.answer > 0:
+                    self.photo_answers[key] = Photo(section, index, answer_message.answer)
+                    self.status_changed("photo_answers", key)
+                elif key in self.photo_answers:
+                    del self.photo_answers[key]
+                    self.status_changed("photo_answers", key)
 
     def set_plate_answer(self, answer_message):
         self.latest_action = datetime.datetime.now()
@@ -360,36 +530,26 @@ class TeamServer:
         index = answer_message.index
         # TODO: validate section based on configuration
         if 0 < section < 9 and 0 <= index < 10:
-            if answer_message.HasField("answer") and len(answer_message.answer.strip()) > 0:
-                obj = None
-                for plate in self.plate_answers:
-                    if plate.section == section and plate.index == index:
-                        obj = plate
-                        break
-                if obj is None:
-                    obj = Plate(section, index, "")
-                    self.plate_answers.append(obj)
-                obj.answer = answer_message.answer.strip().upper()
-                self.changed = True
-            else:
-                for plate in self.plate_answers:
-                    if plate.section == section and plate.index == index:
-                        self.plate_answers.remove(plate)
-                        self.changed = True
-                        break
+            key = (section, index)
+            with self.lock:
+                if answer_message.HasField("answer") and len(answer_message.answer.strip()) > 0:
+                    self.plate_answers[key] = Plate(section, index, answer_message.answer.strip().upper())
+                    self.status_changed("plate_answers", key)
+                elif key in self.plate_answers:
+                    del self.plate_answers[key]
+                    self.status_changed("plate_answers", key)
 
     def set_rebus_answer(self, answer_message):
         self.latest_action = datetime.datetime.now()
         section = answer_message.section
         # TODO: validate section based on configuration
         if 0 < section < 9:
+            txt = ""
             if answer_message.HasField("answer") and len(answer_message.answer.strip()) > 0:
                 txt = answer_message.answer
+            with self.lock:
                 self.rebus_answers[section] = txt
-                self.changed = True
-            else:
-                self.rebus_answers[section] = ""
-                self.changed = True
+                self.status_changed("rebus_answers", section)
 
     def handle_found_lunch(self, rebus_place, rc):
         self.latest_action = datetime.datetime.now()
@@ -397,6 +557,7 @@ class TeamServer:
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.AT_LUNCH
         if self.minibus.current_section != rebus_place.next_section:
             self.minibus.warp(rebus_place.next_section, 0)
+        self.request_status_update()
         for message in self.rally_configuration.lunch_messages:
             self.send_messages(message)
 
@@ -406,6 +567,7 @@ class TeamServer:
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.AT_END
         if self.minibus.current_section != rebus_place.next_section:
             self.minibus.warp(rebus_place.next_section, 0)
+        self.request_status_update()
         for message in self.rally_configuration.at_end_messages:
             self.send_messages(message)
 
@@ -413,6 +575,7 @@ class TeamServer:
         self.latest_action = datetime.datetime.now()
         self.goal_time = datetime.datetime.now()
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.ENDED
+        self.request_status_update()
         for message in self.rally_configuration.end_messages:
             self.send_messages(message)
 
@@ -422,6 +585,7 @@ class TeamServer:
     def search_for_rebus_result(self, rebus):
         print("Team {0} rebus result arrived".format(self.teamname))
         self.looking_for_rebus = False
+        self.request_status_update()
         if rebus is not None:
             print("Get rebus {0}".format(rebus.number))
             rc = self.rally_configuration.get_rebus_config(rebus.number)
@@ -443,6 +607,7 @@ class TeamServer:
         if abs(self.minibus.speed) > 0.001:
             return
         self.looking_for_rebus = True
+        self.request_status_update()
         section = self.rally_configuration.track_information.get_section(self.minibus.current_section)
         if section is not None:
             rebus_place = section.find_nearby_rebus_place(self.minibus.distance)
@@ -454,8 +619,7 @@ class TeamServer:
                 print("Warning: no rebus at that place...")
             else:
                 # The team has found a checkpoint, remember that!
-                if rebus_place.id not in self.found_rebus_checkpoints:
-                    self.found_rebus_checkpoints.append(rebus_place.id)
+                self.found_rebus_checkpoints.add(rebus_place.id)
                 rc = self.rally_configuration.get_rebus_config(rebus_place.number)
                 if rc is None:
                     self.send_messages("Error in configuration, can't find rebus {0}!".format(rebus_place.number))
@@ -474,13 +638,13 @@ class TeamServer:
                     return
 
             print("Team {0} looking for a rebus with timeout {1}".format(self.teamname, search_time))
-            self.main_server.scheduler.schedule_action(search_time, partial(self.search_for_rebus_result, rebus_place))
+            self.search_action = self.main_server.scheduler.schedule_action(search_time, partial(self.search_for_rebus_result, rebus_place))
             self.send_messages("Har skickat ut en spanare för att leta efter en rebus här, det kan ta upp till en minut...")
 
     def is_rebus_testing_locked(self):
         if self.lock_time is None:
             return False
-        diff = datetime.datetime.now() - self.lock_time
+        diff = self.now() - self.lock_time
         return int(diff.total_seconds()) < 60
 
     def open_extra_puzzle(self, message):
@@ -490,32 +654,35 @@ class TeamServer:
                 extra_puzzle = self.rally_configuration.extra_puzzles[id]
                 if id not in self.opened_extra_puzzles:
                     self.action_logger.log_penalty(extra_puzzle.cost, "Opened extra puzzle: {0}".format(extra_puzzle.title))
-                    self.opened_extra_puzzles[id] = extra_puzzle.cost
+                    with self.lock:
+                        self.opened_extra_puzzles[id] = extra_puzzle.cost
+                        self.status_changed("extra_puzzles", id)
                     self.backup_status_to_disk()
 
     def test_rebus_solution(self, solution_req):
         self.latest_action = datetime.datetime.now()
         ok_to_continue = not self.is_rebus_testing_locked()
         if not ok_to_continue:
-            self.action_logger.log_warning("Asking to test rebus solution at {0} but is locked from {1}+60 seconds".format(datetime.datetime.now(), self.lock_time))
+            self.action_logger.log_warning("Asking to test rebus solution at {0} but is locked from {1}+60 seconds".format(self.now(), self.lock_time))
             return
-        self.lock_time = datetime.datetime.now()
+        self.lock_time = self.now()
         rc = self.rally_configuration.get_rebus_config(solution_req.section)
         if rc is None:
             print("ERROR! No rebus for section {0}".format(solution_req.section))
             return
 
-        rebus_solution = None
-        if solution_req.section in self.rebus_solutions:
-            rebus_solution = self.rebus_solutions[solution_req.section]
-        else:
-            rebus_solution = RebusSolution(rc)
-            self.rebus_solutions[solution_req.section] = rebus_solution
+        with self.lock:
+            rebus_solution = None
+            if solution_req.section in self.rebus_solutions:
+                rebus_solution = self.rebus_solutions[solution_req.section]
+            else:
+                rebus_solution = RebusSolution(rc)
+                self.rebus_solutions[solution_req.section] = rebus_solution
 
-        result = rebus_solution.compare(solution_req)
+            result = rebus_solution.compare(solution_req)
         self.action_logger.info("Testing rebus {0} with proposed solution '{3}' at E{4}N{5} for the {1} time with result: {2}".format(rebus_solution.rc.section, rebus_solution.test_count, result, solution_req.answer, solution_req.map_east, solution_req.map_north))
         print("Team {0} tested rebus {1} for the {2} time with result: {3}".format(self.teamname, rebus_solution.rc.section, rebus_solution.test_count, result))
-        self.changed = True
+        self.status_changed("rebus_solutions", solution_req.section)
 
         if result:
             self.lock_time = None
@@ -527,92 +694,164 @@ class TeamServer:
 
     def handle_solved_morning_rebus(self):
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.MORNING
+        self.request_status_update()
 
     def handle_solved_lunch_rebus(self):
         self.rally_stage = clientprotocol_pb2.ServerPositionUpdate.AFTERNOON
+        self.request_status_update()
 
-    def fill_plate_update(self, plate_up):
-        for plate in self.plate_answers:
+    def fill_plate_update(self, plate_up, keys=None):
+        """ Fills in all plate answers, or only the ones in keys. A removed answer is sent without an answer. """
+        if keys is None:
+            keys = self.plate_answers.keys()
+        for key in keys:
             answer = clientprotocol_pb2.PlateAnswer()
-            answer.section_number = plate.section
-            answer.section_index = plate.index
-            answer.answer = plate.answer
+            answer.section_number, answer.section_index = key
+            if key in self.plate_answers:
+                answer.answer = self.plate_answers[key].answer
             plate_up.plate_answers.extend([answer])
 
-    def fill_photo_update(self, photo_up):
-        for photo in self.photo_answers:
+    def fill_photo_update(self, photo_up, keys=None):
+        if keys is None:
+            keys = self.photo_answers.keys()
+        for key in keys:
             answer = clientprotocol_pb2.PhotoAnswer()
-            answer.section_number = photo.section
-            answer.section_index = photo.index
-            answer.answer = photo.answer
+            answer.section_number, answer.section_index = key
+            if key in self.photo_answers:
+                answer.answer = self.photo_answers[key].answer
             photo_up.photo_answers.extend([answer])
 
-    def fill_rebus_update(self, rebus_up):
-        for section in self.rebus_answers:
+    def fill_rebus_update(self, rebus_up, sections=None):
+        if sections is None:
+            sections = self.rebus_answers.keys()
+        for section in sections:
             answer = clientprotocol_pb2.RebusAnswer()
             answer.section_number = section
             answer.answer = self.rebus_answers[section]
             rebus_up.rebus_answers.extend([answer])
 
-    def fill_rebus_solutions(self, rs):
+    def fill_rebus_list(self, rebus_list, sections=None):
+        if sections is None:
+            self.rebus_statuses.fill_rebus_list(rebus_list)
+            return
+        for section in sections:
+            self.rebus_statuses.get_rebus_number(section).fill_rebus_list(rebus_list)
+
+    def fill_rebus_solutions(self, rs, sections=None):
         rs.locked = self.is_rebus_testing_locked()
-        for solution in self.rebus_solutions.values():
-            obj = solution.pack()
+        if sections is None:
+            sections = self.rebus_solutions.keys()
+        for section in sections:
+            obj = self.rebus_solutions[section].pack()
             rs.rebus_solutions.extend([obj])
 
-    def fill_extra_puzzles(self, extra_puzzles):
-        for extra_puzzle_id in self.opened_extra_puzzles:
+    def fill_extra_puzzles(self, extra_puzzles, puzzle_ids=None):
+        if puzzle_ids is None:
+            puzzle_ids = self.opened_extra_puzzles.keys()
+        for extra_puzzle_id in puzzle_ids:
             ep = clientprotocol_pb2.ExtraPuzzle()
             ep.puzzle_id = extra_puzzle_id
             ep.opened = True
             ep.instructions = self.rally_configuration.extra_puzzles[extra_puzzle_id].instructions
             extra_puzzles.extra_puzzles.extend([ep])
 
-    def send_updates_to_clients(self):
-        if self.terminate:
-            return
-        # print("Send updates to clients")
-        # Always send position update
-        server_to_client = clientprotocol_pb2.ServerToClient()
-        server_to_client.status_update.SetInParent()
-        status_update = server_to_client.status_update
-        status_update.pos_update.SetInParent()
-        pu = status_update.pos_update
-        self.minibus.fill_pos_update(pu)
-        pu.rally_stage = self.rally_stage
-        pu.looking_for_rebus = self.looking_for_rebus
-        pu.rally_started = self.main_server.rally_is_started
-        pu.afternoon_started = self.main_server.afternoon_is_started
+    def pack_full_status(self):
+        """ Returns the complete team state, except the position, as an encoded ServerStatusUpdate.
+            Call with the lock held. """
+        status_update = clientprotocol_pb2.ServerStatusUpdate()
+        status_update.full_state = True
+        status_update.version = self.status_version
+        parts = [status_update.SerializeToString(),
+                 self.status_cache.get("bus_seating", self.minibus.fill_seating_update),
+                 self.status_cache.get("rebus_list", self.fill_rebus_list),
+                 self.status_cache.get("plate_answers", self.fill_plate_update),
+                 self.status_cache.get("photo_answers", self.fill_photo_update),
+                 self.status_cache.get("rebus_answers", self.fill_rebus_update),
+                 self.status_cache.get("rebus_solutions", self.fill_rebus_solutions, self.is_rebus_testing_locked()),
+                 self.status_cache.get("extra_puzzles", self.fill_extra_puzzles),
+                 self.pack_driving_message()]
+        return b"".join(parts)
+
+    def pack_driving_message(self):
+        message = self.minibus.driving_message
+        return self.status_cache.get("driving_message", partial(TeamServer.fill_driving_message, message), message)
 
-        self.update_counter += 1
-        send_more_updates = self.changed or self.update_counter > 10
-        if send_more_updates:
-            self.changed = False
-            self.update_counter = 0
-
-            status_update.bus_seating.SetInParent()
-            bus_seating = status_update.bus_seating
-            self.minibus.fill_seating_update(bus_seating)
+    @staticmethod
+    def fill_driving_message(message, driving_message):
+        driving_message.message = message
 
+    def fill_status_delta(self, status_update, delta, rebus_lock_changed):
+        """ Fills in the items that have changed since the previous version.
+            Seating and the driving message are always sent whole, see send_updates_to_clients(). """
+        if len(delta.rebus_list) > 0:
             status_update.rebus_list.SetInParent()
-            self.rebus_statuses.fill_rebus_list(status_update.rebus_list)
+            self.fill_rebus_list(status_update.rebus_list, delta.rebus_list)
 
+        if len(delta.plate_answers) > 0:
             status_update.plate_answers.SetInParent()
-            self.fill_plate_update(status_update.plate_answers)
+            self.fill_plate_update(status_update.plate_answers, delta.plate_answers)
 
+        if len(delta.photo_answers) > 0:
             status_update.photo_answers.SetInParent()
-            self.fill_photo_update(status_update.photo_answers)
+            self.fill_photo_update(status_update.photo_answers, delta.photo_answers)
 
+        if len(delta.rebus_answers) > 0:
             status_update.rebus_answers.SetInParent()
-            self.fill_rebus_update(status_update.rebus_answers)
+            self.fill_rebus_update(status_update.rebus_answers, delta.rebus_answers)
 
+        if len(delta.rebus_solutions) > 0 or rebus_lock_changed:
             status_update.rebus_solutions.SetInParent()
-            self.fill_rebus_solutions(status_update.rebus_solutions)
+            self.fill_rebus_solutions(status_update.rebus_solutions, delta.rebus_solutions)
 
+        if len(delta.extra_puzzles) > 0:
             status_update.extra_puzzles.SetInParent()
-            self.fill_extra_puzzles(status_update.extra_puzzles)
+            self.fill_extra_puzzles(status_update.extra_puzzles, delta.extra_puzzles)
 
-            status_update.driving_message.SetInParent()
-            status_update.driving_message.message = self.minibus.driving_message
+    def send_full_status(self, client):
+        """ Sends the complete team state to one client, when it connects or when it has lost track of the changes.
+            Queued with the lock held, so that it can't pass an update to another version on its way to the client. """
+        with self.lock:
+            packed = self.pack_full_status()
+            client.send_packed(protobuf_utils.pack_message_field(STATUS_UPDATE_FIELD, packed))
+            client.welcomed = True
 
-        self.send(server_to_client)
+    def send_updates_to_clients(self):
+        if self.terminate:
+            return
+        # print("Send updates to clients")
+        # Always send position update
+        status_update = clientprotocol_pb2.ServerStatusUpdate()
+        status_update.pos_update.SetInParent()
+        pu = status_update.pos_update
+        self.minibus.fill_pos_update(pu)
+        pu.rally_stage = self.rally_stage
+        pu.looking_for_rebus = self.looking_for_rebus
+        pu.rally_started = self.main_server.rally_is_started
+        pu.afternoon_started = self.main_server.afternoon_is_started
+
+        with self.lock:
+            rebus_lock = self.is_rebus_testing_locked()
+            rebus_lock_changed = rebus_lock != self.sent_rebus_lock
+            driving_message_changed = self.minibus.driving_message != self.sent_driving_message
+            # The changes wait until the journal records of the actions behind them are on disk, the journal writer
+            # asks for another update then
+            changes_synced = self.journal.is_synced(self.journal_seq)
+            delta = StatusDelta()
+            if changes_synced:
+                delta = self.status_delta
+                self.status_delta = StatusDelta()
+            cached_parts = []
+            if changes_synced and (not delta.is_empty() or rebus_lock_changed or driving_message_changed):
+                status_update.base_version = self.status_version
+                self.status_version += 1
+                self.sent_rebus_lock = rebus_lock
+                self.sent_driving_message = self.minibus.driving_message
+                self.fill_status_delta(status_update, delta, rebus_lock_changed)
+                if delta.bus_seating:
+                    cached_parts.append(self.status_cache.get("bus_seating", self.minibus.fill_seating_update))
+                if driving_message_changed:
+                    cached_parts.append(self.pack_driving_message())
+            status_update.version = self.status_version
+            packed = status_update.SerializeToString() + b"".join(cached_parts)
+            # Queued with the lock held, the clients must get the versions in order
+            self.send_packed(protobuf_utils.pack_message_field(STATUS_UPDATE_FIELD, packed))